@@ -0,0 +1,188 @@
+"""工繳明細批次產生器（命令列，不開 Tk 視窗）。
+
+月底一次替所有客戶/月份產生明細：
+    python batch_export.py 五月.json -o 輸出 -j 4
+    python batch_export.py 五月.csv --year 113
+    python batch_export.py 五月.json --packet 五月合併.pdf                # 全部合併成一份（每位客戶一個書籤）
+    python batch_export.py 五月.json --trace 耗時.jsonl --profile 剖析   # 分段計時 / cProfile（見 render_trace）
+
+輸入檔每筆資料的欄位與 WageApp.export_pdf 相同
+（month, date, order, type, color, quantity, unit_price, weight, remark），
+再加上 customer 與 year（year 可改用 --year 指定）。
+JSON 亦可直接給工作清單：[{"customer", "year", "month", "records": [...]}, ...]。
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from pdf_generator import default_pdf_name, pdf_size, render_packet, render_pdf
+from render_trace import enable as enable_trace
+from wage_record import WageRecord
+
+# (客戶, 年份, 標題月份, 資料列)
+Job = Tuple[str, str, str, List[WageRecord]]
+
+
+class SizeReport(NamedTuple):
+    """同一份明細在記憶體中各產生一次：compact（沿用字型解析結果）與 FPDF 原本做法。"""
+    size: int
+    secs: float
+    plain_size: int
+    plain_secs: float
+
+# (檔案路徑, 筆數, 秒數, 檔案大小, 比較結果（未量測為 None）, 錯誤訊息)
+JobResult = Tuple[str, int, float, int, Optional[SizeReport], Optional[str]]
+
+
+# ======================== 讀檔 ========================
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """讀取 JSON / CSV；CSV 以第一列為欄名（utf-8，可含 BOM）。"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return [dict(row) for row in csv.DictReader(f)]
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = [data]
+    return list(data)
+
+def group_jobs(items: List[Dict[str, Any]], default_year: str = "") -> List[Job]:
+    """依 (客戶, 年份, 月份) 分組成多份明細，保留輸入順序。"""
+    groups: Dict[Tuple[str, str, str], List[WageRecord]] = {}
+    for item in items:
+        customer = str(item.get("customer", "")).strip()
+        year = str(item.get("year") or default_year).strip()
+        month = str(item.get("month", "")).strip()
+        if not (customer and year and month):
+            raise ValueError(f"資料缺少客戶/年份/月份：{item}")
+        rows = item["records"] if "records" in item else [item]
+        groups.setdefault((customer, year, month), []).extend(WageRecord.from_mapping(r) for r in rows)
+    return [(c, y, m, recs) for (c, y, m), recs in groups.items()]
+
+
+# ======================== 執行 ========================
+def _run_job(job: Job, out_dir: str, compact: bool = True, size_report: bool = False) -> JobResult:
+    """在子行程中產生一份 PDF（計時不含 size_report 的額外比較）。"""
+    customer, year, month, records = job
+    save_path = os.path.join(out_dir, default_pdf_name(customer, year, month))
+    t0 = time.perf_counter()
+    size = 0
+    report = None
+    try:
+        size = render_pdf(customer, year, month, records, save_path, compact=compact)
+        err = None
+    except Exception as e:
+        err = f"{type(e).__name__}: {e}"
+    secs = time.perf_counter() - t0
+    if size_report and err is None:
+        report = _compare(customer, year, month, records)
+    return save_path, len(records), secs, size, report, err
+
+def _compare(customer: str, year: str, month: str, records: List[WageRecord]) -> SizeReport:
+    t0 = time.perf_counter()
+    size = pdf_size(customer, year, month, records, compact=True)
+    t1 = time.perf_counter()
+    plain_size = pdf_size(customer, year, month, records, compact=False)
+    return SizeReport(size, t1 - t0, plain_size, time.perf_counter() - t1)
+
+def run_jobs(jobs: List[Job], out_dir: str, workers: int = 0,
+             compact: bool = True, size_report: bool = False) -> List[JobResult]:
+    """以行程池平行產生；workers <= 1 時在目前行程依序執行。"""
+    os.makedirs(out_dir, exist_ok=True)
+    if workers <= 1 or len(jobs) <= 1:
+        return [_run_job(job, out_dir, compact, size_report) for job in jobs]
+    results: List[JobResult] = [None] * len(jobs)  # type: ignore[list-item]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = {ex.submit(_run_job, job, out_dir, compact, size_report): i for i, job in enumerate(jobs)}
+        for fut in as_completed(futures):
+            results[futures[fut]] = fut.result()
+    return results
+
+def _write_packet(jobs: List[Job], path: str, compact: bool = True, workers: int = 1) -> int:
+    """合併成一份；頁數多的明細以 workers 個子行程平行繪製頁面。"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    t0 = time.perf_counter()
+    try:
+        size = render_packet(jobs, path, compact=compact, workers=workers)
+    except Exception as e:
+        print(f"[失敗] {os.path.basename(path)}  {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    n_rows = sum(len(recs) for *_key, recs in jobs)
+    print(f"[完成] {os.path.basename(path)}  {len(jobs)} 份 / {n_rows} 筆  "
+          f"{time.perf_counter() - t0:.2f}s  {size / 1024:.1f} KB")
+    return 0
+
+def _change(value: float, plain: float) -> str:
+    return f"{(value - plain) / plain * 100:+.1f}%" if plain else "-"
+
+def _report_text(size: int, secs: float, plain_size: int, plain_secs: float) -> str:
+    return (f"（比較：{size / 1024:.1f} KB / {secs:.2f}s，原本做法 {plain_size / 1024:.1f} KB / "
+            f"{plain_secs:.2f}s；大小 {_change(size, plain_size)}，耗時 {_change(secs, plain_secs)}）")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="批次產生工繳明細 PDF（每個客戶/月份一份）")
+    parser.add_argument("input", help="資料檔（.json 或 .csv）")
+    parser.add_argument("-o", "--out-dir", default=".", help="PDF 輸出資料夾（預設：目前資料夾）")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="平行行程數（預設：CPU 核心數；1 = 不開子行程）")
+    parser.add_argument("--year", default="", help="資料未含 year 欄位時使用的年份（民國）")
+    parser.add_argument("--no-compact", dest="compact", action="store_false",
+                        help="每份重新解析整個字型（FPDF 原本做法；輸出相同，只是較慢。除錯用）")
+    parser.add_argument("--size-report", action="store_true",
+                        help="每份另外在記憶體中以兩種做法各產生一次，列出大小與耗時（大小應相同）")
+    parser.add_argument("--packet", metavar="PDF",
+                        help="改為全部合併成一份 PDF（放在輸出資料夾，字型只嵌入一次）")
+    parser.add_argument("--trace", metavar="LOG",
+                        help="每份 PDF 的分段耗時寫入此 JSON Lines 檔（- 表示 stderr）")
+    parser.add_argument("--profile", metavar="DIR", help="每份 PDF 以 cProfile 剖析，.prof 存到此資料夾")
+    args = parser.parse_args(argv)
+    if args.trace or args.profile:
+        enable_trace(args.trace, args.profile)
+
+    try:
+        jobs = group_jobs(load_records(args.input), args.year)
+    except (OSError, ValueError) as e:
+        print(f"讀取失敗：{e}", file=sys.stderr)
+        return 2
+    if not jobs:
+        print("沒有資料。", file=sys.stderr)
+        return 1
+
+    if args.packet:
+        return _write_packet(jobs, os.path.join(args.out_dir, args.packet), args.compact, args.workers)
+
+    t0 = time.perf_counter()
+    results = run_jobs(jobs, args.out_dir, args.workers, args.compact, args.size_report)
+    wall = time.perf_counter() - t0
+
+    failed = 0
+    total_size = 0
+    reports: List[SizeReport] = []
+    for path, n_rows, secs, size, report, err in results:
+        if err:
+            failed += 1
+            print(f"[失敗] {os.path.basename(path)}  {n_rows} 筆  {secs:.2f}s  {err}")
+            continue
+        line = f"[完成] {os.path.basename(path)}  {n_rows} 筆  {secs:.2f}s  {size / 1024:.1f} KB"
+        if report:
+            line += _report_text(*report)
+            reports.append(report)
+        print(line)
+        total_size += size
+    print(f"共 {len(results)} 份（失敗 {failed}），總耗時 {wall:.2f}s，平行數 {max(1, args.workers)}")
+    if total_size:
+        line = f"總大小 {total_size / 1024:.1f} KB"
+        print(line)
+    if reports:
+        print("合計" + _report_text(*(sum(r[i] for r in reports) for i in range(4))))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
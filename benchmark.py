@@ -0,0 +1,339 @@
+"""PDF 產生流程的效能基準（命令列，不開 Tk 視窗）。
+
+    python benchmark.py -o bench.json                       # 20 / 1k / 10k / 100k 列
+    python benchmark.py --sizes 20 1000 --repeat 5
+    python benchmark.py --baseline bench.json -o new.json   # 與舊結果比較，變慢超過門檻時回傳 1
+
+合成資料含長顏色清單、中文備註、分數類別，接近實際明細。
+每項取 repeat 次中最快的一次（另記中位數），輸出 JSON 以便留存與比較。
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import pdf_generator as pg
+from fraction_text import pretty_fraction_text
+from record_store import RecordStore
+from row_index import RowFilter, RowIndex
+from wage_record import RECORD_KEYS, WageRecord
+
+DEFAULT_SIZES: Tuple[int, ...] = (20, 1000, 10000, 100000)
+DEFAULT_THRESHOLD = 0.15   # 比基準慢 15% 以上視為退步
+MIN_REGRESSION_S = 0.001   # 差距小於 1ms 的不算（小資料量的計時雜訊）
+
+_COLORS = ("黑", "白", "紅", "藍", "綠", "黃", "紫", "橘", "灰", "深藍", "淺灰", "酒紅", "卡其", "米白")
+_TYPES = ("領片", "袖口", "下擺", "門襟", "電腦領", "波浪領", "腰頭", "魚骨領", "雙面領",
+          '16⅛×3/8"', '12又16分之1乘8分之3英吋', "3/8×12公分", "領片（加長）特殊規格")
+_REMARKS = ("", "", "", "勾1次", "勾2次 冷凍", "大尺寸", "立彬倒紗",
+            "以下為冷凍，交期延後三天並另行通知客戶確認", "勾3次 大尺寸 顏色需對色後再生產")
+
+
+# ======================== 合成資料 ========================
+def make_records(n: int, seed: int = 1) -> List[WageRecord]:
+    """n 筆接近實際的資料（固定亂數種子，每次相同）。"""
+    rnd = random.Random(seed)
+    records = []
+    for _ in range(n):
+        if rnd.random() < 0.3:
+            color = "、".join(rnd.sample(_COLORS, rnd.randint(4, len(_COLORS))))
+        else:
+            color = str(rnd.randint(1, 12))
+        records.append(WageRecord(
+            month=str(rnd.randint(1, 12)), date=str(rnd.randint(1, 31)),
+            order=f"{rnd.choice('ABCDEFGH')}{rnd.randint(10000, 99999)}",
+            type=rnd.choice(_TYPES), color=color,
+            quantity=rnd.randint(1, 2000), unit_price=rnd.choice((0.8, 1.15, 1.5, 2.25, 3.0, 4.5)),
+            weight=rnd.choice((None, round(rnd.uniform(0.1, 30), 2))),
+            remark=rnd.choice(_REMARKS),
+        ))
+    return records
+
+def _new_pdf() -> pg.StatementPDF:
+    pdf = pg.StatementPDF(format="A4", unit="mm")
+    pdf.set_auto_page_break(auto=False)
+    pg.ensure_fonts(pdf)
+    return pdf
+
+
+# ======================== 各項基準 ========================
+# 每項：setup(records) -> 要計時的函式。
+# 函式回傳處理的項目數（換算每項耗時），或 (項目數, 自行量測的秒數)：只計其中一段時使用。
+Run = Callable[[], Union[int, Tuple[int, float]]]
+Bench = Callable[[List[WageRecord]], Run]
+
+def bench_wrap_lines(records: List[WageRecord]) -> Run:
+    pdf = _new_pdf()
+    w_color, w_remark = pg.COL_WIDTHS[3], pg.COL_WIDTHS[8]
+    texts = [(r.color, w_color) for r in records] + [(r.remark, w_remark) for r in records]
+
+    def run() -> int:
+        pdf.set_font(pg.MAIN_FONT_NAME, '', 9)
+        for text, w in texts:
+            pg._wrap_lines(pdf, text, w)
+        return len(texts)
+    return run
+
+def bench_fit_font_size(records: List[WageRecord]) -> Run:
+    pdf = _new_pdf()
+    w = pg.COL_WIDTHS[2]
+    texts = [(pg.to_ascii_fractions(r.type), pg.MAIN_FONT_NAME) if pg.contains_cjk(r.type)
+             else (r.type, pg.FRACTION_FONT_NAME) for r in records]
+
+    def run() -> int:
+        for text, family in texts:
+            pg._fit_font_size(pdf, text, w, family, 10)
+        return len(texts)
+    return run
+
+def bench_measure_row_height(records: List[WageRecord]) -> Run:
+    pdf = _new_pdf()
+    amounts = pg.record_amounts(records)
+    rows = [pg._row_cells(r, a) for r, a in zip(records, amounts)]
+
+    def run() -> int:
+        for row in rows:
+            pg._measure_row_height(pdf, pg.COL_WIDTHS, row, pg.LINE_H)
+        return len(rows)
+    return run
+
+def bench_render_pages(records: List[WageRecord]) -> Run:
+    """只計繪製（_render_one_pdf_page），排版與分頁在計時外先做好。"""
+    amounts = pg.record_amounts(records)
+    totals = pg.totals_of(amounts)
+
+    def run() -> Tuple[int, float]:
+        pdf = _new_pdf()
+        plans = [pg._layout_row(pdf, pg._row_cells(r, a)) for r, a in zip(records, amounts)]
+        pages = pg.paginate([p.height for p in plans], pg._body_height(pdf))
+        t0 = time.perf_counter()
+        for idx, (start, end) in enumerate(pages, start=1):
+            pg._render_one_pdf_page(pdf, "儒鴻", "113", "5", plans[start:end], totals,
+                                    is_last=(idx == len(pages)), page_no=idx, page_count=len(pages))
+        return len(pages), time.perf_counter() - t0
+    return run
+
+def _render_to_temp(records: List[WageRecord], workers: int = 1) -> None:
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        pg.render_pdf("儒鴻", "113", "5", records, path, workers=workers)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+def bench_generate_pdf(records: List[WageRecord]) -> Run:
+    """generate_pdf 存檔對話框之後的完整流程（render_pdf：排版、繪製、輸出到檔案）；每輪先清空頁面快取。"""
+    def run() -> int:
+        pg.clear_page_cache()
+        _render_to_temp(records)
+        return len(records)
+    return run
+
+def bench_generate_pdf_parallel(records: List[WageRecord]) -> Run:
+    """同 generate_pdf，但以 CPU 核心數個子行程平行繪製頁面（行程池在暖身時建立）。"""
+    def run() -> int:
+        pg.clear_page_cache()
+        _render_to_temp(records, pg.default_workers())
+        return len(records)
+    return run
+
+def bench_regenerate_pdf(records: List[WageRecord]) -> Run:
+    """改一列後重新匯出：計時前先以原資料產生一次，只量第二次（頁面快取命中）。"""
+    edited = list(records)
+    mid = len(edited) // 2
+    edited[mid] = WageRecord.from_mapping({**edited[mid].as_dict(), "remark": "修正後備註"})
+
+    def run() -> Tuple[int, float]:
+        pg.clear_page_cache()
+        _render_to_temp(records)
+        t0 = time.perf_counter()
+        _render_to_temp(edited)
+        return len(records), time.perf_counter() - t0
+    return run
+
+def bench_number_to_chinese(records: List[WageRecord]) -> Run:
+    amounts = [a * 37 for a in pg.record_amounts(records)]
+
+    def run() -> int:
+        for a in amounts:
+            pg.number_to_chinese(a)
+        return len(amounts)
+    return run
+
+def bench_pretty_fraction_text(records: List[WageRecord]) -> Run:
+    """每輪先清空 LRU 快取：量到的是首次轉換 + 重複類別命中快取的實際情況。"""
+    texts = [r.type for r in records]
+
+    def run() -> int:
+        pretty_fraction_text.cache_clear()
+        for t in texts:
+            pretty_fraction_text(t)
+        return len(texts)
+    return run
+
+def bench_search_index(records: List[WageRecord]) -> Run:
+    """表格搜尋列：每種條件查一次（含結果排序）；索引在計時外建好。每項耗時需遠小於一個畫面（16ms）。"""
+    index = RowIndex()
+    index.rebuild((i, [str(v) if v is not None else "" for v in (getattr(r, k) for k in RECORD_KEYS)])
+                  for i, r in enumerate(records))
+    sample = records[len(records) // 2]
+    filters = [
+        RowFilter(order=sample.order), RowFilter(type=sample.type),
+        RowFilter(month=sample.month), RowFilter(month=sample.month, days=(1, 15)),
+        RowFilter(color=sample.color[:1]), RowFilter(remark="勾"),
+        RowFilter(type=sample.type, color=sample.color[:1], days=(10, 20)),
+    ]
+
+    def run() -> int:
+        for flt in filters:
+            index.search(flt)
+        return len(filters)
+    return run
+
+def bench_restore_sheet(records: List[WageRecord]) -> Run:
+    """啟動時還原上次的明細表：開啟資料庫檔（含未併回的 -wal）並載入整張明細表。"""
+    tmp = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, tmp, True)
+    path = os.path.join(tmp, "records.db")
+    store = RecordStore(path)
+    store.add_many(("儒鴻", "113", "5"), [r.as_dict() for r in records])
+    store.set_last_sheet(("儒鴻", "113", "5"))
+    # 不呼叫 close()：-wal 留著，與當機後重新開啟的情況相同
+    store.conn.close()
+
+    def run() -> int:
+        reopened = RecordStore(path)
+        rows = reopened.sheet(reopened.last_sheet())
+        reopened.conn.close()
+        return len(rows)
+    return run
+
+BENCHMARKS: Dict[str, Bench] = {
+    "wrap_lines": bench_wrap_lines,
+    "fit_font_size": bench_fit_font_size,
+    "measure_row_height": bench_measure_row_height,
+    "render_one_pdf_page": bench_render_pages,
+    "generate_pdf": bench_generate_pdf,
+    "generate_pdf_parallel": bench_generate_pdf_parallel,
+    "regenerate_pdf": bench_regenerate_pdf,
+    "number_to_chinese": bench_number_to_chinese,
+    "pretty_fraction_text": bench_pretty_fraction_text,
+    "search_index": bench_search_index,
+    "restore_sheet": bench_restore_sheet,
+}
+
+
+# ======================== 執行 ========================
+def _time(run: Run) -> Tuple[float, int]:
+    t0 = time.perf_counter()
+    out = run()
+    elapsed = time.perf_counter() - t0
+    if isinstance(out, tuple):
+        return out[1], out[0]
+    return elapsed, out
+
+def run_benchmarks(sizes: Sequence[int], repeat: int = 3,
+                   only: Optional[Sequence[str]] = None, log=print) -> List[Dict]:
+    """依序執行各項基準；每項先暖身一次（字寬快取、字型度量），再量 repeat 次。
+    大資料量的完整產生只量一次（字型已在較小的資料量暖身過）。"""
+    names = list(only) if only else list(BENCHMARKS)
+    results: List[Dict] = []
+    for n in sizes:
+        records = make_records(n)
+        for name in names:
+            run = BENCHMARKS[name](records)
+            # 大資料量只量一次，避免整套跑太久
+            reps = 1 if n >= 100000 and name in ("generate_pdf", "generate_pdf_parallel", "regenerate_pdf", "render_one_pdf_page") else repeat
+            if reps > 1:
+                _time(run)
+            times, items = [], 0
+            for _ in range(reps):
+                secs, items = _time(run)
+                times.append(secs)
+            best = min(times)
+            results.append({
+                "name": name, "rows": n, "items": items, "repeat": reps,
+                "best_s": round(best, 6), "median_s": round(statistics.median(times), 6),
+                "per_item_us": round(best / max(items, 1) * 1e6, 3),
+            })
+            log(f"{name:<22} {n:>7} 列  {best:9.4f}s  （每項 {results[-1]['per_item_us']:.2f} µs）")
+    return results
+
+def _meta() -> Dict:
+    import fpdf
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fpdf": getattr(fpdf, "__version__", ""),
+    }
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float) -> List[Dict]:
+    """與基準比較同名同列數的項目，回傳變慢超過 threshold（且超過 MIN_REGRESSION_S）的項目。"""
+    base = {(r["name"], r["rows"]): r["best_s"] for r in baseline}
+    regressions = []
+    for r in results:
+        old = base.get((r["name"], r["rows"]))
+        if not old:
+            continue
+        change = (r["best_s"] - old) / old
+        r["baseline_s"] = old
+        r["change"] = round(change, 4)
+        if change > threshold and r["best_s"] - old > MIN_REGRESSION_S:
+            regressions.append(r)
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="PDF 產生流程效能基準")
+    parser.add_argument("-o", "--output", help="結果 JSON 檔（預設只印在畫面上）")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="資料列數")
+    parser.add_argument("--repeat", type=int, default=3, help="每項重複次數（取最快）")
+    parser.add_argument("--only", nargs="+", choices=tuple(BENCHMARKS), help="只跑指定項目")
+    parser.add_argument("--baseline", help="比較用的舊結果 JSON")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"比基準慢多少視為退步（預設 {DEFAULT_THRESHOLD:.0%}）")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)["results"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"讀取基準失敗：{e}", file=sys.stderr)
+            return 2
+
+    results = run_benchmarks(args.sizes, max(1, args.repeat), args.only)
+    report = {"meta": _meta(), "results": results}
+
+    status = 0
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        print()
+        for r in results:
+            if "change" in r:
+                mark = "  ← 變慢" if r in regressions else ""
+                print(f"{r['name']:<22} {r['rows']:>7} 列  {r['baseline_s']:9.4f}s → {r['best_s']:9.4f}s"
+                      f"  {r['change']:+.1%}{mark}")
+        report["regressions"] = [{"name": r["name"], "rows": r["rows"], "change": r["change"]} for r in regressions]
+        if regressions:
+            print(f"\n{len(regressions)} 項比基準慢超過 {args.threshold:.0%}", file=sys.stderr)
+            status = 1
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""大量匯入：從 CSV / Excel / 剪貼簿一次匯入多列資料。
+
+驗證規則與 WageApp.add_row 相同（add_row 也改用這裡的 validate_rows），
+但一次檢查所有列、以欄為單位逐條規則處理，最後彙整成一份錯誤清單，
+不必每列跳一次訊息框。
+"""
+import csv
+import io
+import os
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+COLOR_MODES: Tuple[str, ...] = ("輸入數量", "輸入顏色")
+_RE_COLOR_SEP = re.compile(r"[,\s、]+")
+
+
+class RowError(NamedTuple):
+    line: int      # 來源列號（1 起算，含標題列）
+    title: str     # 訊息框標題（缺少資料 / 格式錯誤）
+    message: str
+
+
+# ======================== 讀取 ========================
+def _cell_text(v: Any) -> str:
+    """Excel 儲存格 → 字串；整數值的浮點數（5.0）去掉小數點。"""
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v).strip()
+
+def parse_text(text: str) -> List[List[str]]:
+    """剪貼簿文字 → 列。Excel 複製的是 Tab 分隔；沒有 Tab 時當作逗號分隔。"""
+    delimiter = "\t" if "\t" in text else ","
+    return [[_cell_text(c) for c in row] for row in csv.reader(io.StringIO(text), delimiter=delimiter)]
+
+def _read_xlsx(path: str) -> List[List[str]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("讀取 Excel 檔需要 openpyxl（pip install openpyxl），或先另存成 CSV。")
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        return [[_cell_text(c) for c in row] for row in wb.active.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+def read_file(path: str) -> List[List[str]]:
+    """讀取 .csv / .tsv / .txt / .xlsx。CSV 先試 UTF-8，再試 Excel 常用的 Big5（cp950）。"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        return _read_xlsx(path)
+    if ext not in (".csv", ".tsv", ".txt"):
+        raise ValueError(f"不支援的檔案格式：{ext or '（無副檔名）'}")
+    with open(path, "rb") as f:
+        raw = f.read()
+    for encoding in ("utf-8-sig", "cp950"):
+        try:
+            return parse_text(raw.decode(encoding))
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("無法辨識檔案編碼（請存成 UTF-8 或 Big5）。")
+
+
+# ======================== 驗證 ========================
+def align_rows(rows: List[List[str]], columns: Sequence[str]) -> Tuple[List[List[str]], List[int]]:
+    """依標題列對應欄位（沒有標題列時照欄位順序），去掉整列空白的列。
+
+    回傳 (依 columns 排列的列, 各列在來源中的列號)。
+    """
+    header = [c.strip() for c in rows[0]] if rows else []
+    if any(col in header for col in columns):
+        pos = [header.index(col) if col in header else None for col in columns]
+        body, first_line = rows[1:], 2
+    else:
+        # 第一欄是序號（直接從明細表複製）時跳過
+        skip = 1 if rows and len(rows[0]) == len(columns) + 1 else 0
+        pos = [i + skip for i in range(len(columns))]
+        body, first_line = rows, 1
+    aligned: List[List[str]] = []
+    lines: List[int] = []
+    for i, row in enumerate(body):
+        values = [(row[p] if p is not None and p < len(row) else "").strip() for p in pos]
+        if any(values):
+            aligned.append(values)
+            lines.append(first_line + i)
+    return aligned, lines
+
+def _is_int(val: str) -> bool:
+    try:
+        int(val); return True
+    except ValueError:
+        return False
+
+def _is_float(val: str) -> bool:
+    try:
+        float(val); return True
+    except ValueError:
+        return False
+
+def _color_display(raw: str, mode: str) -> Optional[str]:
+    """顏色欄兩種模式：數量（非負整數）或顏色名稱（以、串接）；格式不符回傳 None。"""
+    if mode == "輸入數量":
+        if not _is_int(raw) or int(raw) < 0:
+            return None
+        return str(int(raw))
+    parts = [p for p in _RE_COLOR_SEP.split(raw) if p]
+    return "、".join(parts) if parts else None
+
+def validate_rows(rows: List[List[str]], columns: Sequence[str], color_mode: str,
+                  lines: Optional[List[int]] = None) -> Tuple[List[List[str]], List[RowError]]:
+    """一次驗證所有列（已依 columns 排列），回傳 (通過的列（顏色已正規化）, 錯誤清單)。
+
+    規則依 add_row 原本的順序逐欄套用，每列只回報第一個錯誤。
+    """
+    if lines is None:
+        lines = list(range(1, len(rows) + 1))
+    col = {name: [row[i] for row in rows] for i, name in enumerate(columns)}
+    errors: Dict[int, RowError] = {}
+
+    def check(values: List[str], ok, title: str, message: str) -> None:
+        for i, v in enumerate(values):
+            if i not in errors and not ok(v):
+                errors[i] = RowError(lines[i], title, message)
+
+    check(col["月份"], bool, "缺少資料", "請選擇【月份】。")
+    check([d and o for d, o in zip(col["日期"], col["訂單號碼"])], bool,
+          "缺少資料", "請至少填寫【日期】與【訂單號碼】。")
+    colors = [_color_display(v, color_mode) for v in col["顏色(組)"]]
+    if color_mode == "輸入數量":
+        check(colors, lambda v: v is not None, "格式錯誤", "顏色輸入模式為【輸入數量】時，請輸入整數（例：3）。")
+    else:
+        check(colors, lambda v: v is not None, "格式錯誤", "請輸入至少一個顏色名稱（例：黑, 白, 紅）。")
+    check(col["數量(片)"], lambda v: v == "" or _is_int(v), "格式錯誤", "【數量(片)】需為整數。")
+    check(col["單價(元)"], lambda v: v == "" or _is_float(v), "格式錯誤", "【單價(元)】需為數字。")
+    check(col["重量(kg)"], lambda v: v == "" or _is_float(v), "格式錯誤", "【重量(kg)】需為數字。")
+
+    color_idx = list(columns).index("顏色(組)")
+    valid: List[List[str]] = []
+    for i, row in enumerate(rows):
+        if i in errors:
+            continue
+        row = list(row)
+        row[color_idx] = colors[i]
+        valid.append(row)
+    return valid, [errors[i] for i in sorted(errors)]
+
+def format_report(errors: List[RowError], limit: int = 15) -> str:
+    """錯誤清單 → 訊息框文字（超過 limit 筆只列前面幾筆）。"""
+    lines = [f"第 {e.line} 列：{e.message}" for e in errors[:limit]]
+    if len(errors) > limit:
+        lines.append(f"...（共 {len(errors)} 列有誤）")
+    return "\n".join(lines)
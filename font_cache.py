@@ -0,0 +1,209 @@
+"""字型度量快取：TTF 只解析一次，之後以 mmap 直接載入。
+
+FPDF.add_font(uni=True) 每次都要解析整個 TTF（NotoSansTC 約 7MB），
+這裡把解析結果（字型描述 + 每個字元的字寬表）存成版本化的快取檔，
+GUI 與批次產生共用同一個快取資料夾：
+
+    [MAGIC][header 長度 uint32][header JSON][對齊][字寬陣列]
+
+字寬陣列以 mmap + memoryview 直接當作 FPDF 的 cw 使用，不複製。
+TTF 內容變動或 CACHE_VERSION 改變時自動重建：快取記錄 TTF 的大小、mtime 與整個檔案的 sha256，
+大小與 mtime 都相同時直接沿用；任一不同就重算 sha256 比對，內容沒變只更新記錄的大小 / mtime
+（PyInstaller 每次解壓到新的暫存路徑、mtime 改變，也能命中同一份快取）。
+"""
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+CACHE_VERSION = 2
+MAGIC = b"WFC1"
+_HEADER_LEN = struct.Struct("<I")
+_HASH_BLOCK = 1 << 20
+
+# 同一行程內已載入的字型：ttf 絕對路徑 -> 字型資料
+_LOADED: Dict[str, Dict] = {}
+
+
+def cache_dir() -> str:
+    """快取資料夾：可用環境變數 WAGE_FONT_CACHE_DIR 指定。"""
+    env = os.environ.get("WAGE_FONT_CACHE_DIR")
+    if env:
+        return env
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "wage_pdf", "font_cache")
+
+
+def _file_stat(ttf_path: str) -> List[int]:
+    st = os.stat(ttf_path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _fingerprint(ttf_path: str) -> str:
+    """整個檔案的 sha256；不受解壓路徑或 mtime 影響。只在大小 / mtime 與快取不符時才計算。"""
+    h = hashlib.sha256()
+    with open(ttf_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_path(ttf_path: str) -> str:
+    name = os.path.splitext(os.path.basename(ttf_path))[0]
+    return os.path.join(cache_dir(), f"{name}.v{CACHE_VERSION}.fontcache")
+
+
+def _parse_ttf(ttf_path: str) -> Dict:
+    """與 FPDF.add_font(uni=True) 相同的度量解析。"""
+    from fpdf.ttfonts import TTFontFile
+
+    ttf = TTFontFile()
+    ttf.getMetrics(ttf_path)
+    desc = {
+        'Ascent': int(round(ttf.ascent, 0)),
+        'Descent': int(round(ttf.descent, 0)),
+        'CapHeight': int(round(ttf.capHeight, 0)),
+        'Flags': ttf.flags,
+        'FontBBox': "[%s %s %s %s]" % tuple(int(round(b, 0)) for b in ttf.bbox),
+        'ItalicAngle': int(ttf.italicAngle),
+        'StemV': int(round(ttf.stemV, 0)),
+        'MissingWidth': int(round(ttf.defaultWidth, 0)),
+    }
+    return {
+        'name': re.sub('[ ()]', '', ttf.fullName),
+        'type': 'TTF',
+        'desc': desc,
+        'up': round(ttf.underlinePosition),
+        'ut': round(ttf.underlineThickness),
+        'originalsize': os.path.getsize(ttf_path),
+        'cw': ttf.charWidths,
+    }
+
+
+def _write_cache(path: str, fingerprint: str, stat: List[int], font: Dict) -> None:
+    cw = font['cw']
+    typecode = 'H' if max(cw, default=0) <= 0xFFFF else 'I'
+    widths = array(typecode, cw)
+    meta = {k: v for k, v in font.items() if k != 'cw'}
+    header = {
+        "version": CACHE_VERSION,
+        "fingerprint": fingerprint,
+        "stat": stat,
+        "byteorder": sys.byteorder,
+        "typecode": typecode,
+        "count": len(widths),
+        "font": meta,
+    }
+    hdr = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    offset = len(MAGIC) + _HEADER_LEN.size + len(hdr)
+    pad = (-offset) % widths.itemsize
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 先寫暫存檔再改名，避免其他行程讀到寫一半的快取
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + _HEADER_LEN.pack(len(hdr)) + hdr + b"\0" * pad)
+            widths.tofile(f)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _read_cache(path: str) -> Tuple[Optional[Dict], Dict]:
+    """讀取快取，回傳 (字型資料, header)；版本不符或檔案損壞時字型資料為 None。
+    是否與 TTF 相符由呼叫端以 header 的 stat / fingerprint 判斷。"""
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None, {}
+    try:
+        if mm[:len(MAGIC)] != MAGIC:
+            raise ValueError("bad magic")
+        start = len(MAGIC) + _HEADER_LEN.size
+        (hdr_len,) = _HEADER_LEN.unpack(mm[len(MAGIC):start])
+        header = json.loads(mm[start:start + hdr_len].decode("utf-8"))
+        if header.get("version") != CACHE_VERSION or header.get("byteorder") != sys.byteorder:
+            raise ValueError("stale cache")
+        typecode = header["typecode"]
+        itemsize = array(typecode).itemsize
+        offset = start + hdr_len
+        offset += (-offset) % itemsize
+        cw = memoryview(mm)[offset:offset + header["count"] * itemsize].cast(typecode)
+        if len(cw) != header["count"]:
+            raise ValueError("truncated cache")
+    except (ValueError, KeyError, struct.error):
+        mm.close()
+        return None, {}
+    font = dict(header["font"])
+    font['cw'] = cw
+    return font, header
+
+
+def load_font(ttf_path: str) -> Dict:
+    """取得字型度量：行程內快取 → 磁碟快取 → 解析 TTF（並寫回快取）。"""
+    ttf_path = os.path.abspath(ttf_path)
+    font = _LOADED.get(ttf_path)
+    if font is not None:
+        return font
+    if not os.path.exists(ttf_path):
+        raise RuntimeError("TTF Font file not found: %s" % ttf_path)
+
+    stat = _file_stat(ttf_path)
+    path = _cache_path(ttf_path)
+    font, header = _read_cache(path)
+    fingerprint = None
+    if font is not None and header.get("stat") != stat:
+        fingerprint = _fingerprint(ttf_path)
+        if header.get("fingerprint") != fingerprint:
+            font = None         # TTF 內容變了
+        else:
+            # 內容相同、只有 mtime / 路徑不同：更新記錄，下次不必再算雜湊
+            try:
+                _write_cache(path, fingerprint, stat, font)
+            except OSError:
+                pass    # 例如 Windows 上快取檔仍被 mmap 開著；下次再算一次雜湊即可
+    if font is None:
+        font = _parse_ttf(ttf_path)
+        try:
+            _write_cache(path, fingerprint or _fingerprint(ttf_path), stat, font)
+        except OSError:
+            pass  # 快取資料夾無法寫入時仍可正常產生，只是下次要重新解析
+    font['ttffile'] = ttf_path
+    _LOADED[ttf_path] = font
+    return font
+
+
+def register_font(pdf, family: str, ttf_path: str) -> None:
+    """等同 pdf.add_font(family, '', ttf_path, uni=True)，但度量來自快取。"""
+    fontkey = family.lower()
+    if fontkey in pdf.fonts:
+        return
+    font = load_font(ttf_path)
+    if hasattr(pdf, 'str_alias_nb_pages'):
+        subset = list(range(0, 57))   # include numbers in the subset!
+    else:
+        subset = list(range(0, 32))
+    pdf.fonts[fontkey] = {
+        'i': len(pdf.fonts) + 1, 'type': font['type'],
+        'name': font['name'], 'desc': font['desc'],
+        'up': font['up'], 'ut': font['ut'],
+        'cw': font['cw'],
+        'ttffile': font['ttffile'], 'fontkey': fontkey,
+        'subset': subset, 'unifilename': None,
+    }
+    pdf.font_files[fontkey] = {'length1': font['originalsize'],
+                               'type': "TTF", 'ttffile': font['ttffile']}
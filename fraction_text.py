@@ -0,0 +1,108 @@
+"""類別欄的分數文字轉換（main.py 的類別鍵盤 / 匯入，與 pdf_generator 的類別欄共用）。
+
+- pretty_fraction_text：『A分之B』『B/A』→ 單字分數（⅛）或 ASCII 分數，並正規化乘號/單位
+- to_ascii_fractions：任意分數樣式 → ASCII（⅜→3/8，²⁄₉→2/9）
+
+兩者都是單趟掃描（一個正則 / 一張 translate 表），結果以 LRU 快取；
+同一種類別在整份明細、整批匯入中會重複出現上千次，只需轉換一次。
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+_CACHE_SIZE = 4096
+
+# 單字分數對照表（能對上就用它；對不上 fallback 成 ASCII num/den）
+_VULGAR: Dict[Tuple[int, int], str] = {
+    (1, 2): "½", (1, 3): "⅓", (2, 3): "⅔",
+    (1, 4): "¼", (3, 4): "¾",
+    (1, 5): "⅕", (2, 5): "⅖", (3, 5): "⅗", (4, 5): "⅘",
+    (1, 6): "⅙", (5, 6): "⅚",
+    (1, 7): "⅐",
+    (1, 8): "⅛", (3, 8): "⅜", (5, 8): "⅝", (7, 8): "⅞",
+    (1, 9): "⅑",
+    (1, 10): "⅒",
+}
+_VULGAR_CHARS = "".join(_VULGAR.values())
+
+# 符號正規化（單一 token → 取代字串）
+_SYMBOLS: Dict[str, str] = {
+    "乘以": "×", "乘": "×", "*": "×", "x": "×", "X": "×",
+    "．": ".", "。": ".",
+    "英吋": '"', "公分": "cm",
+}
+
+# 一次掃描：[整數又] + 分數（A分之B / B/A / 單字分數），或一個要正規化的符號。
+# B/A 後面若緊接「分之」，讓給後面的中文分數（與舊版先換中文分數的結果一致）。
+_TOKEN = re.compile(
+    r"(?:(?P<whole>\d+)又)?"
+    r"(?:(?P<cn_den>\d+)分之(?P<cn_num>\d+)"
+    r"|(?P<num>\d+)/(?P<den>\d+)(?!分之\d)"
+    rf"|(?P<vulgar>[{_VULGAR_CHARS}]))"
+    r"|(?P<sym>乘以|英吋|公分|[乘*xX．。])"
+)
+
+def _fraction(num: str, den: str) -> str:
+    return _VULGAR.get((int(num), int(den)), f"{num}/{den}")
+
+def _replace_token(m: re.Match) -> str:
+    sym = m.group("sym")
+    if sym is not None:
+        return _SYMBOLS[sym]
+    if m.group("cn_den") is not None:
+        frac = _fraction(m.group("cn_num"), m.group("cn_den"))
+    elif m.group("num") is not None:
+        frac = _fraction(m.group("num"), m.group("den"))
+    else:
+        frac = m.group("vulgar")
+    whole = m.group("whole")
+    if whole is None:
+        return frac
+    # 混合數：整數 + 單字分數相連（16⅛），整數 + ASCII 分數有空格（16 1/16）
+    return f"{whole}{frac}" if len(frac) == 1 else f"{whole} {frac}"
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def pretty_fraction_text(expr: str) -> str:
+    """將『A分之B』『B/A』轉成單字分數或 ASCII 分數；處理混合數與常見符號。
+    - 能對應者用單字分數（⅛、¼…）；否則 fallback 為 `B/A`
+    - `乘/乘以/*/x/X` → `×`，`英吋` → `"`，`公分` → `cm`，小數點正規為 `.`
+    - 混合數：整數 + 單字分數相連（16⅛），整數 + ASCII 分數有空格（16 1/16）
+    """
+    if not expr:
+        return expr
+    return _TOKEN.sub(_replace_token, "".join(expr.split()))
+
+
+# 分數樣式 → ASCII：單字分數、上下標數字、分數斜線、英吋/英呎符號，一張表一次轉完
+_ASCII_TABLE = str.maketrans({
+    **{ch: f"{num}/{den}" for (num, den), ch in _VULGAR.items()},
+    **{sup: str(i) for i, sup in enumerate("⁰¹²³⁴⁵⁶⁷⁸⁹")},
+    **{sub: str(i) for i, sub in enumerate("₀₁₂₃₄₅₆₇₈₉")},
+    "⁄": "/", "″": '"', "′": "'",
+})
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def to_ascii_fractions(s: str) -> str:
+    """將任意分數樣式轉為 ASCII：⅜→3/8，²⁄₉→2/9，⁄→/，以及將 ″/′ 轉為通用引號。"""
+    if not s:
+        return ""
+    return s.translate(_ASCII_TABLE)
+
+
+# ===================== 整欄轉換 =====================
+def _convert_column(values: Iterable[str], fn) -> List[str]:
+    """相同字串只轉一次；用未快取的版本，一次性的值不會擠掉 LRU 快取裡常用的類別。"""
+    seen: Dict[str, str] = {}
+    out: List[str] = []
+    for v in values:
+        r = seen.get(v)
+        if r is None:
+            r = seen[v] = fn(v)
+        out.append(r)
+    return out
+
+def pretty_fraction_column(values: Iterable[str]) -> List[str]:
+    return _convert_column(values, pretty_fraction_text.__wrapped__)
+
+def to_ascii_fractions_column(values: Iterable[str]) -> List[str]:
+    return _convert_column(values, to_ascii_fractions.__wrapped__)
@@ -0,0 +1,190 @@
+"""render_service 壓力測試：同時送出多個請求，回報延遲百分位（p50 / p90 / p99）與每秒請求數。
+
+    python load_test.py --spawn -n 200 -c 16                  # 自行啟動一個服務（測完關閉）
+    python load_test.py --url http://127.0.0.1:8765 -n 500 -c 32 --rows 300 --distinct 8
+
+--distinct 控制內容不同的請求種類：數量小於同時連線數時，會有相同內容的請求同時進行，
+可觀察合併（X-Coalesced）的效果；--distinct 0 表示每個請求內容都不同。
+資料由 benchmark.make_records 產生（固定亂數種子，每次結果可比較）。
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from benchmark import make_records
+
+_SPAWN_TIMEOUT_S = 60
+
+
+class Sample(NamedTuple):
+    seconds: float
+    status: int          # 0 = 連線失敗
+    coalesced: bool
+    size: int
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """nearest-rank 百分位（p 為 0~100）；空序列回傳 0。"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def make_payloads(kinds: int, rows: int) -> List[bytes]:
+    payloads = []
+    for i in range(kinds):
+        records = [r.as_dict() for r in make_records(rows, seed=i)]
+        body = {"customer": f"壓測客戶{i:03d}", "year": "113", "month": "5", "records": records}
+        payloads.append(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+    return payloads
+
+
+# ======================== 送出請求 ========================
+class _Client(threading.local):
+    conn: Optional[http.client.HTTPConnection] = None
+
+
+def run_load(url: str, payloads: List[bytes], requests: int, concurrency: int) -> List[Sample]:
+    """每個執行緒保持一條 keep-alive 連線；第 i 個請求使用 payloads[i % len(payloads)]。"""
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    local = _Client()
+
+    def one(i: int) -> Sample:
+        body = payloads[i % len(payloads)]
+        t0 = time.perf_counter()
+        try:
+            if local.conn is None:
+                local.conn = http.client.HTTPConnection(host, port, timeout=300)
+            local.conn.request("POST", "/render", body, {"Content-Type": "application/json"})
+            resp = local.conn.getresponse()
+            data = resp.read()
+            coalesced = resp.getheader("X-Coalesced") == "1"
+            if resp.getheader("Connection", "").lower() == "close":
+                local.conn.close()
+                local.conn = None
+            return Sample(time.perf_counter() - t0, resp.status, coalesced, len(data))
+        except (OSError, http.client.HTTPException):
+            if local.conn is not None:
+                local.conn.close()
+                local.conn = None
+            return Sample(time.perf_counter() - t0, 0, False, 0)
+
+    with ThreadPoolExecutor(concurrency) as ex:
+        return list(ex.map(one, range(requests)))
+
+
+def summarize(samples: List[Sample], wall_s: float) -> Dict:
+    ok = sorted(s.seconds for s in samples if s.status == 200)
+    return {
+        "requests": len(samples),
+        "ok": len(ok),
+        "status": dict(sorted(Counter(s.status for s in samples).items())),
+        "coalesced": sum(s.coalesced for s in samples),
+        "wall_s": round(wall_s, 3),
+        "req_per_s": round(len(samples) / wall_s, 2) if wall_s else 0.0,
+        "latency_ms": {name: round(percentile(ok, p) * 1000, 1)
+                       for name, p in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))},
+        "avg_pdf_bytes": round(sum(s.size for s in samples if s.status == 200) / len(ok)) if ok else 0,
+    }
+
+
+# ======================== 自行啟動服務 ========================
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def spawn_service(workers: Optional[int], max_pending: int) -> Tuple[subprocess.Popen, str]:
+    """啟動 render_service 子行程並等到 /health 有回應。"""
+    port = _free_port()
+    cmd = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_service.py"),
+           "--port", str(port), "--max-pending", str(max_pending)]
+    if workers:
+        cmd += ["-j", str(workers)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + _SPAWN_TIMEOUT_S
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"服務啟動失敗（結束代碼 {proc.returncode}）")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return proc, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("服務啟動逾時")
+
+def fetch_health(url: str) -> Dict:
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname or "127.0.0.1", parts.port or 80, timeout=10)
+    try:
+        conn.request("GET", "/health")
+        return json.loads(conn.getresponse().read().decode("utf-8"))
+    finally:
+        conn.close()
+
+
+# ======================== 命令列 ========================
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="render_service 壓力測試（延遲百分位）")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="服務位址，例如 http://127.0.0.1:8765")
+    target.add_argument("--spawn", action="store_true", help="自行啟動一個服務，測完關閉")
+    parser.add_argument("-n", "--requests", type=int, default=200, help="請求總數（預設 200）")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="同時連線數（預設 16）")
+    parser.add_argument("--rows", type=int, default=100, help="每份明細的資料筆數（預設 100）")
+    parser.add_argument("--distinct", type=int, default=4, help="內容不同的請求種類（0 = 全部不同；預設 4）")
+    parser.add_argument("--warmup", type=int, default=0, help="正式計時前先送出的請求數（不計入結果）")
+    parser.add_argument("-j", "--workers", type=int, help="--spawn 時服務的平行數（預設 CPU 核心數）")
+    parser.add_argument("--max-pending", type=int, default=64, help="--spawn 時服務的待處理上限（預設 64）")
+    parser.add_argument("-o", "--output", help="結果另存成 JSON")
+    args = parser.parse_args(argv)
+
+    proc = None
+    url = args.url
+    if args.spawn:
+        proc, url = spawn_service(args.workers, args.max_pending)
+    try:
+        payloads = make_payloads(args.distinct or args.requests, args.rows)
+        if args.warmup:
+            run_load(url, payloads, args.warmup, args.concurrency)
+        t0 = time.perf_counter()
+        samples = run_load(url, payloads, args.requests, args.concurrency)
+        report = summarize(samples, time.perf_counter() - t0)
+        report["config"] = {"url": url, "concurrency": args.concurrency, "rows": args.rows,
+                            "distinct": args.distinct}
+        report["server"] = fetch_health(url)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    lat = report["latency_ms"]
+    print(f"{report['requests']} 個請求（同時 {args.concurrency}，每份 {args.rows} 筆）"
+          f"  成功 {report['ok']}  合併 {report['coalesced']}  狀態 {report['status']}")
+    print(f"延遲 p50 {lat['p50']:.1f} ms  p90 {lat['p90']:.1f} ms  p99 {lat['p99']:.1f} ms  "
+          f"max {lat['max']:.1f} ms   {report['req_per_s']:.1f} 請求/秒")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0 if report["ok"] == report["requests"] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
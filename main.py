@@ -1,11 +1,26 @@
 
 ## `main.py`
+import time
+_STARTUP_T0 = time.perf_counter()   # 啟動計時起點：放在所有 import 之前
+
 import tkinter as tk
-from tkinter import ttk, messagebox
-from pdf_generator import generate_pdf, set_last_saved_dir
+from tkinter import ttk, messagebox, filedialog
+from fraction_text import pretty_fraction_column, pretty_fraction_text
+from bulk_import import COLOR_MODES, align_rows, format_report, parse_text, read_file, validate_rows
+from record_store import RecordStore, SheetKey
+from row_index import RowFilter, RowIndex, parse_days
+from virtual_table import VirtualTable
+from wage_record import RECORD_KEYS
+# pdf_generator / yearly_report（連同 fpdf 與字型）在第一次產生 PDF 時才載入，
+# 啟動時由 start_font_warm_up 在背景先載好；這裡不可在模組層 import
+import argparse
+import json
+import multiprocessing
 import os
-import re
-from typing import Dict, List, Tuple
+import platform
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 
 # ======================== 常數區 ========================
 CUSTOMERS: Tuple[str, ...] = ("廣銘", "傑展", "儒鴻", "慧聚", "陞勇", "合一", "昌鴻", "其他")
@@ -22,72 +37,41 @@ DATA_COLUMNS: Tuple[str, ...] = (
     "月份", "日期", "訂單號碼", "類別", "顏色(組)", "數量(片)", "單價(元)", "重量(kg)", "備註"
 )
 DISPLAY_COLUMNS: Tuple[str, ...] = ("序號",) + DATA_COLUMNS
+# 表格欄名 -> 資料鍵（record_store / pdf_generator 使用）
+COLUMN_KEYS: Dict[str, str] = dict(zip(DATA_COLUMNS, RECORD_KEYS))
+
+# 每隔多久把這段時間的輸入一次 fsync 到資料庫（見 RecordStore.sync）
+AUTOSAVE_SYNC_MS = 2000
+
+# 搜尋列：(RowFilter 欄位, 標籤, 寬度)
+SEARCH_FIELDS: Tuple[Tuple[str, str, int], ...] = (
+    ("order", "訂單號碼", 10), ("type", "類別", 8), ("month", "月份", 4),
+    ("days", "日期", 7), ("color", "顏色開頭", 8), ("remark", "備註開頭", 8),
+)
 
 INPUT_WIDTHS: Dict[str, int] = {
     "月份": 6, "日期": 6, "訂單號碼": 12, "類別": 10, "顏色(組)": 16,
     "數量(片)": 8, "單價(元)": 8, "重量(kg)": 8, "備註": 16,
 }
 
-# 單字分數對照表（能對上就用它；對不上 fallback 成 ASCII num/den）
-_VULGAR = {
-    (1, 2): "½", (1, 3): "⅓", (2, 3): "⅔",
-    (1, 4): "¼", (3, 4): "¾",
-    (1, 5): "⅕", (2, 5): "⅖", (3, 5): "⅗", (4, 5): "⅘",
-    (1, 6): "⅙", (5, 6): "⅚",
-    (1, 7): "⅐",
-    (1, 8): "⅛", (3, 8): "⅜", (5, 8): "⅝", (7, 8): "⅞",
-    (1, 9): "⅑",
-    (1, 10): "⅒",
-}
-_VULGAR_CHARS = "".join(_VULGAR.values())
-
-# 預編譯正則
-_RE_SPACE = re.compile(r"\s+")
-_RE_CN_FRACTION = re.compile(r"(\d+)(?:分之)(\d+)")  # A分之B -> (B,A)
-_RE_ASCII_FRACTION = re.compile(r"(\d+)\s*/\s*(\d+)") # B/A
-_RE_MIXED_VULGAR = re.compile(rf"(\d+)又([{_VULGAR_CHARS}])")
-_RE_MIXED_ASCII = re.compile(r"(\d+)又(\d+/\d+)")
-
 # ===================== 轉換工具 =====================
-def pretty_fraction_text(expr: str) -> str:
-    """將『A分之B』『B/A』轉成單字分數或 ASCII 分數；處理混合數與常見符號。
-    - 能對應者用單字分數（⅛、¼…）；否則 fallback 為 `B/A`
-    - `乘/乘以/*/x/X` → `×`，`英吋` → `"`，`公分` → `cm`，小數點正規為 `.`
-    - 混合數：整數 + 單字分數相連（16⅛），整數 + ASCII 分數有空格（16 1/16）
-    """
-    if not expr:
-        return expr
-
-    t = _RE_SPACE.sub("", expr)
-    t = (
-        t.replace("乘以", "×").replace("乘", "×")
-         .replace("*", "×").replace("x", "×").replace("X", "×")
-         .replace("．", ".").replace("。", ".")
-         .replace("英吋", '"')
-         .replace("公分", "cm")
-    )
-
-    def _repl_cn(m: re.Match) -> str:
-        den, num = m.group(1), m.group(2)
-        try:
-            key = (int(num), int(den))
-            return _VULGAR.get(key, f"{num}/{den}")
-        except Exception:
-            return f"{num}/{den}"
-
-    def _repl_ascii(m: re.Match) -> str:
-        num, den = m.group(1), m.group(2)
-        try:
-            key = (int(num), int(den))
-            return _VULGAR.get(key, f"{num}/{den}")
-        except Exception:
-            return f"{num}/{den}"
-
-    t = _RE_CN_FRACTION.sub(_repl_cn, t)
-    t = _RE_ASCII_FRACTION.sub(_repl_ascii, t)
-    t = _RE_MIXED_VULGAR.sub(r"\1\2", t)
-    t = _RE_MIXED_ASCII.sub(r"\1 \2", t)
-    return t
+def _fmt_num(v: Any) -> str:
+    """數值欄位顯示：None → 空白；整數值不帶小數點。
+    小數以 repr 表示（最短且可還原的寫法），不截位數：複製回輸入欄再新增時數值不變。"""
+    if v is None or v == "":
+        return ""
+    if isinstance(v, float):
+        text = repr(v)
+        return text[:-2] if text.endswith(".0") else text
+    return str(v)
+
+def record_to_values(rec: Dict[str, Any]) -> List[str]:
+    """資料 → 依 DATA_COLUMNS 排列的顯示字串。"""
+    return [_fmt_num(rec.get(COLUMN_KEYS[col])) for col in DATA_COLUMNS]
+
+def record_to_inputs(rec: Dict[str, Any]) -> Dict[str, str]:
+    """資料庫的一筆資料 → 輸入欄文字（欄名 -> 文字），直接由儲存的值轉換，不經過表格。"""
+    return {col: _fmt_num(rec.get(COLUMN_KEYS[col])) for col in DATA_COLUMNS}
 
 # ======================= 主 App =======================
 class WageApp:
@@ -107,12 +91,46 @@ class WageApp:
         self.inputs: Dict[str, tk.Widget] = {}
         self.color_mode = tk.StringVar(value="輸入數量")
 
+        # 資料以 SQLite 為準，表格只顯示目前這張明細表
+        self.store = RecordStore()
+        self.sheet_key: Optional[SheetKey] = None
+        # 搜尋用的記憶體索引，隨表格逐列更新
+        self.index = RowIndex()
+        self._filter_job: Optional[str] = None
+        root.protocol("WM_DELETE_WINDOW", self._on_close)
+
         self._build_top()
+        self._build_search()
         self._build_table()
         self._build_inputs()
         self._build_buttons()
         self._bind_shortcuts()
 
+        self._restore_last_sheet()
+        root.after(AUTOSAVE_SYNC_MS, self._periodic_sync)
+
+    def _on_close(self) -> None:
+        self.store.close()      # 併回主檔並清空 -wal
+        self.root.destroy()
+
+    def _periodic_sync(self) -> None:
+        """每隔幾秒把這段時間新增/刪除的列一次 fsync；沒有新寫入時不做事。"""
+        self.store.sync()
+        self.root.after(AUTOSAVE_SYNC_MS, self._periodic_sync)
+
+    def _restore_last_sheet(self) -> None:
+        """開啟上次顯示的明細表：每列輸入時已寫入資料庫，當機或直接關窗後重開即可接著輸入。"""
+        key = self.store.last_sheet()
+        if key is None:
+            return
+        customer, year, month = key
+        self.customer_entry.set(customer)
+        self.year_entry.delete(0, tk.END)
+        self.year_entry.insert(0, year)
+        self.month_combobox.set(month)
+        self.inputs["月份"].set(month)
+        self._sync_sheet()
+
     # ---------- UI Blocks ----------
     def _build_top(self) -> None:
         frame_top = tk.Frame(self.root)
@@ -131,45 +149,43 @@ class WageApp:
         self.month_combobox.grid(row=0, column=5)
         self.month_combobox.set("1")
 
+        # 客戶/年份/月份變更時載入對應的明細表
+        self.customer_entry.bind("<<ComboboxSelected>>", lambda e: self._sync_sheet())
+        self.customer_entry.bind("<FocusOut>", lambda e: self._sync_sheet())
+        self.year_entry.bind("<FocusOut>", lambda e: self._sync_sheet())
+        self.month_combobox.bind("<<ComboboxSelected>>", lambda e: self._sync_sheet())
+
+    def _build_search(self) -> None:
+        """搜尋列：條件一變就以記憶體索引篩選表格（見 row_index），不查資料庫。"""
+        frame = tk.Frame(self.root)
+        frame.pack(pady=(0, 2))
+        self.search_vars: Dict[str, tk.StringVar] = {}
+        for i, (key, label, width) in enumerate(SEARCH_FIELDS):
+            tk.Label(frame, text=label).grid(row=0, column=2 * i, padx=(8 if i else 0, 2))
+            var = tk.StringVar()
+            tk.Entry(frame, textvariable=var, width=width).grid(row=0, column=2 * i + 1)
+            var.trace_add("write", lambda *_: self._schedule_filter())
+            self.search_vars[key] = var
+        col = 2 * len(SEARCH_FIELDS)
+        tk.Button(frame, text="清除", command=self.clear_filter).grid(row=0, column=col, padx=(10, 4))
+        tk.Button(frame, text="匯出篩選結果", command=self.export_filtered).grid(row=0, column=col + 1, padx=4)
+        self.filter_label = tk.Label(frame, fg="#666666", text="")
+        self.filter_label.grid(row=0, column=col + 2, padx=6)
+
     def _build_table(self) -> None:
-        table_frame = tk.Frame(self.root)
-        table_frame.pack(padx=5, pady=5, fill="both", expand=True)
-
-        self.table = ttk.Treeview(table_frame, columns=DISPLAY_COLUMNS, show='headings')
-        ysb = ttk.Scrollbar(table_frame, orient="vertical", command=self.table.yview)
-        xsb = ttk.Scrollbar(table_frame, orient="horizontal", command=self.table.xview)
-        self.table.configure(yscrollcommand=ysb.set, xscrollcommand=xsb.set)
-
-        self.table.grid(row=0, column=0, sticky="nsew")
-        ysb.grid(row=0, column=1, sticky="ns")
-        xsb.grid(row=1, column=0, sticky="ew")
-        table_frame.grid_rowconfigure(0, weight=1)
-        table_frame.grid_columnconfigure(0, weight=1)
-
-        for col in DISPLAY_COLUMNS:
-            self.table.heading(col, text=col)
-            self.table.column(col, width=(70 if col == "序號" else 130), anchor="center")
-
-        # 滾輪
-        def _on_mousewheel(event):
-            if event.num == 4:
-                delta = 1
-            elif event.num == 5:
-                delta = -1
-            else:
-                delta = int(event.delta / 120)
-            self.table.yview_scroll(-delta, "units")
-        self.table.bind("<MouseWheel>", _on_mousewheel)
-        self.table.bind("<Button-4>", _on_mousewheel)
-        self.table.bind("<Button-5>", _on_mousewheel)
-        self.table.bind("<Shift-MouseWheel>", lambda e: self.table.xview_scroll(int(-e.delta/120), "units"))
+        # 虛擬表格：只有畫面看得到的列是 Treeview 項目，上萬筆也能即時捲動/刪除
+        self.table = VirtualTable(
+            self.root, DISPLAY_COLUMNS,
+            column_widths={col: (70 if col == "序號" else 130) for col in DISPLAY_COLUMNS},
+            row_height=40)
+        self.table.pack(padx=5, pady=5, fill="both", expand=True)
 
     def _build_inputs(self) -> None:
         frame_input = tk.Frame(self.root)
         frame_input.pack(pady=6)
 
         tk.Label(frame_input, text="顏色輸入模式").grid(row=0, column=0, padx=4, sticky="w")
-        mode_cb = ttk.Combobox(frame_input, textvariable=self.color_mode, values=("輸入數量", "輸入顏色"), width=10, state="readonly")
+        mode_cb = ttk.Combobox(frame_input, textvariable=self.color_mode, values=COLOR_MODES, width=10, state="readonly")
         mode_cb.grid(row=1, column=0, padx=4, sticky="w")
 
         # 欄位
@@ -232,8 +248,12 @@ class WageApp:
         frame_button.pack(pady=8)
         tk.Button(frame_button, text="新增資料列", command=self.add_row).pack(side='left', padx=10)
         tk.Button(frame_button, text="複製到輸入欄", command=self.copy_to_inputs).pack(side='left', padx=10)
+        tk.Button(frame_button, text="匯入檔案", command=self.import_file).pack(side='left', padx=10)
+        tk.Button(frame_button, text="貼上匯入", command=self.import_clipboard).pack(side='left', padx=10)
         tk.Button(frame_button, text="刪除選取列", command=self.delete_row, bg='red', fg='white').pack(side='left', padx=10)
         tk.Button(frame_button, text="產生 PDF", command=self.export_pdf, bg='green', fg='white').pack(side='left', padx=10)
+        tk.Button(frame_button, text="整月合併", command=self.export_month_packet).pack(side='left', padx=10)
+        tk.Button(frame_button, text="年度彙總", command=self.export_year_summary).pack(side='left', padx=10)
 
     def _bind_shortcuts(self) -> None:
         self.root.bind('<Return>', lambda event: self.add_row())
@@ -299,49 +319,106 @@ class WageApp:
             pass
         entry.focus_set()
 
+    # ---------- 明細表（客戶/年份/月份） ----------
+    def _current_sheet_key(self) -> Optional[SheetKey]:
+        key = (self.customer_entry.get().strip(), self.year_entry.get().strip(),
+               self.month_combobox.get().strip())
+        return key if all(key) else None
+
+    def _sync_sheet(self) -> None:
+        """上方欄位對應的明細表若與畫面不同，就從資料庫重新載入。"""
+        key = self._current_sheet_key()
+        if key is None or key == self.sheet_key:
+            return
+        old_key, shown = self.sheet_key, len(self.table)
+        if old_key is not None and shown and self.store.count(key) == 0:
+            if messagebox.askyesno(
+                    "切換明細表",
+                    f"{key[1]}年{key[2]}月份「{key[0]}」目前沒有資料。\n"
+                    f"要把畫面上的 {shown} 筆資料一起改到這張明細表嗎？\n（選「否」則顯示空白明細表）"):
+                self.store.move_sheet(old_key, key)
+        self.sheet_key = key
+        self.store.set_last_sheet(key)
+        self._reload_table()
+
+    def _reload_table(self) -> None:
+        items = [] if self.sheet_key is None else \
+            [(rec["id"], record_to_values(rec)) for rec in self.store.sheet(self.sheet_key)]
+        self.table.set_rows(items)
+        self.index.rebuild(items)
+        self._apply_filter()
+
+    # ---------- 搜尋 / 篩選 ----------
+    def _schedule_filter(self) -> None:
+        # 連續輸入時合併成一次篩選（閒置時執行）
+        if self._filter_job is None:
+            self._filter_job = self.root.after_idle(self._run_scheduled_filter)
+
+    def _run_scheduled_filter(self) -> None:
+        self._filter_job = None
+        self._apply_filter()
+
+    def _apply_filter(self, keep_position: bool = False) -> None:
+        text = {key: var.get() for key, var in self.search_vars.items()}
+        try:
+            days = parse_days(text["days"])
+        except ValueError as e:
+            self.filter_label.config(text=str(e), fg="#c00000"); return
+        # 類別與輸入時一樣正規化分數寫法（3/8 -> ⅜），才能與表格中的值相符
+        flt = RowFilter(order=text["order"], type=pretty_fraction_text(text["type"].strip()),
+                        month=text["month"], days=days, color=text["color"], remark=text["remark"])
+        ids = self.index.search(flt)
+        self.table.set_filter(ids, keep_position)
+        self.filter_label.config(
+            fg="#666666", text="" if ids is None else f"符合 {len(ids)} / {len(self.table)} 筆")
+
+    def _refresh_filter(self) -> None:
+        """新增/刪除列後重新套用目前的條件（畫面位置不變）。"""
+        if self.table.filtered is not None:
+            self._apply_filter(keep_position=True)
+
+    def clear_filter(self) -> None:
+        for var in self.search_vars.values():
+            var.set("")
+
+    def export_filtered(self) -> None:
+        """只把目前篩選出的列產生 PDF（合計也只計這些列）。"""
+        self._sync_sheet()
+        if self.sheet_key is None:
+            messagebox.showwarning("缺少資料", "請先填寫客戶名稱、年份與標題月份。"); return
+        if self.table.filtered is None:
+            messagebox.showwarning("沒有篩選", "請先在搜尋列輸入條件。"); return
+        ids = self.table.shown_ids()
+        if not ids:
+            messagebox.showwarning("沒有資料", "沒有符合條件的資料列。"); return
+
+        from pdf_generator import default_pdf_name, generate_pdf, set_last_saved_dir
+        set_last_saved_dir(self.last_saved_dir)
+        customer, year, month = self.sheet_key
+        name = os.path.splitext(default_pdf_name(customer, year, month))[0] + "_篩選.pdf"
+        generate_pdf(customer, year, month, self.store.records(ids), master=self.root, file_name=name)
+
     # ---------- 表格操作 ----------
     def add_row(self) -> None:
+        self._sync_sheet()
+        if self.sheet_key is None:
+            messagebox.showwarning("缺少資料", "請先填寫客戶名稱、年份與標題月份。"); return
+
         values = [self.inputs[col].get().strip() for col in DATA_COLUMNS]
 
-        if not values[DATA_COLUMNS.index("月份")]:
-            messagebox.showwarning("缺少資料", "請選擇【月份】。"); return
-        if not values[DATA_COLUMNS.index("日期")] or not values[DATA_COLUMNS.index("訂單號碼")]:
-            messagebox.showwarning("缺少資料", "請至少填寫【日期】與【訂單號碼】。"); return
+        # 必填欄、顏色兩種模式、數字欄（可空白）：與大量匯入共用同一套規則
+        valid, errors = validate_rows([values], DATA_COLUMNS, self.color_mode.get())
+        if errors:
+            messagebox.showwarning(errors[0].title, errors[0].message); return
+        values = valid[0]
 
-        # 顏色處理：兩種模式
-        color_raw = self.inputs["顏色(組)"].get().strip()
-        if self.color_mode.get() == "輸入數量":
-            try:
-                n = int(color_raw)
-                if n < 0: raise ValueError
-                color_display = str(n)
-            except ValueError:
-                messagebox.showwarning("格式錯誤", "顏色輸入模式為【輸入數量】時，請輸入整數（例：3）。"); return
-        else:
-            parts = [p for p in re.split(r"[,\s、]+", color_raw) if p]
-            if not parts:
-                messagebox.showwarning("格式錯誤", "請輸入至少一個顏色名稱（例：黑, 白, 紅）。"); return
-            color_display = "、".join(parts)
-        values[DATA_COLUMNS.index("顏色(組)")] = color_display
-
-        # 數字欄驗證（可空白）
-        def _num_ok(val: str, caster) -> bool:
-            if val == "": return True
-            try:
-                caster(val); return True
-            except Exception:
-                return False
-        if not _num_ok(values[DATA_COLUMNS.index("數量(片)")], int):
-            messagebox.showwarning("格式錯誤", "【數量(片)】需為整數。"); return
-        if not _num_ok(values[DATA_COLUMNS.index("單價(元)")], float):
-            messagebox.showwarning("格式錯誤", "【單價(元)】需為數字。"); return
-        if not _num_ok(values[DATA_COLUMNS.index("重量(kg)")], float):
-            messagebox.showwarning("格式錯誤", "【重量(kg)】需為數字。"); return
-
-        # 插入表格
-        next_idx = len(self.table.get_children()) + 1
-        display_values = [str(next_idx)] + values
-        self.table.insert('', 'end', values=display_values)
+        # 寫入資料庫，再顯示到表格（以資料庫 id 識別，序號由表格依位置產生）
+        rec = {COLUMN_KEYS[col]: v for col, v in zip(DATA_COLUMNS, values)}
+        rid = self.store.add(self.sheet_key, rec)
+        shown = record_to_values(self.store.get(rid))
+        self.table.append(rid, shown)
+        self.index.add(rid, shown)
+        self._refresh_filter()
 
         # 清空輸入欄，月份回填標題月份
         for widget in self.inputs.values():
@@ -357,11 +434,9 @@ class WageApp:
             messagebox.showwarning("未選取", "請先選取要刪除的資料列"); return
 
         lines: List[str] = []
-        for iid in selected:
-            vals = self.table.item(iid)['values']
-            row = {"序號": vals[0]}
-            for i, col in enumerate(DATA_COLUMNS, start=1):
-                row[col] = vals[i]
+        for rid in selected[:10]:
+            row = {"序號": self.table.row_number(rid)}
+            row.update(zip(DATA_COLUMNS, self.table.values(rid)))
             lines.append(
                 f"#{row['序號']}  月:{row.get('月份','')} 日:{row.get('日期','')}  "
                 f"訂單:{row.get('訂單號碼','')}  類別:{row.get('類別','')}  "
@@ -369,13 +444,73 @@ class WageApp:
                 f"單價:{row.get('單價(元)','')}  重量:{row.get('重量(kg)','')}  "
                 f"備註:{row.get('備註','')}"
             )
-        preview_text = "\n".join(lines[:10]) + (f"\n...（共 {len(lines)} 筆）" if len(lines) > 10 else "")
+        preview_text = "\n".join(lines) + (f"\n...（共 {len(selected)} 筆）" if len(selected) > 10 else "")
         if not messagebox.askyesno("確認刪除", f"即將刪除以下 {len(selected)} 筆資料：\n\n{preview_text}\n\n是否確定刪除？"):
             return
-        for iid in selected:
-            self.table.delete(iid)
-        for i, iid in enumerate(self.table.get_children(), start=1):
-            self.table.set(iid, "序號", str(i))
+        # 序號由位置即時計算，刪除後不必逐列重新編號
+        self.store.delete(selected)
+        self.table.delete(selected)
+        self.index.remove(selected)
+        self._refresh_filter()
+
+    # ---------- 大量匯入 ----------
+    def import_file(self) -> None:
+        """從 CSV / Excel 匯入多列（可有標題列，欄名同表格）。"""
+        path = filedialog.askopenfilename(
+            title="選擇要匯入的檔案",
+            filetypes=[("試算表", "*.xlsx *.csv *.tsv *.txt"), ("所有檔案", "*.*")],
+            initialdir=self.last_saved_dir)
+        if not path:
+            return
+        try:
+            rows = read_file(path)
+        except (OSError, ValueError, RuntimeError) as e:
+            messagebox.showerror("讀取失敗", str(e)); return
+        self._import_rows(rows, f"「{os.path.basename(path)}」")
+
+    def import_clipboard(self) -> None:
+        """匯入剪貼簿中從 Excel 複製的儲存格（Tab 分隔）。"""
+        try:
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            text = ""
+        if not text.strip():
+            messagebox.showwarning("剪貼簿是空的", "請先在 Excel 選取並複製要匯入的儲存格。"); return
+        self._import_rows(parse_text(text), "剪貼簿")
+
+    def _import_rows(self, rows: List[List[str]], source: str) -> None:
+        """一次驗證所有列、彙整錯誤，通過的列以單一交易寫入並一次更新表格。"""
+        self._sync_sheet()
+        if self.sheet_key is None:
+            messagebox.showwarning("缺少資料", "請先填寫客戶名稱、年份與標題月份。"); return
+
+        aligned, lines = align_rows(rows, DATA_COLUMNS)
+        if not aligned:
+            messagebox.showwarning("沒有資料", f"{source}沒有可匯入的資料列。"); return
+        valid, errors = validate_rows(aligned, DATA_COLUMNS, self.color_mode.get(), lines)
+        if errors:
+            report = format_report(errors)
+            if not valid:
+                messagebox.showerror("匯入失敗", f"{source}的 {len(errors)} 列資料都有誤：\n\n{report}"); return
+            if not messagebox.askyesno(
+                    "匯入檢查",
+                    f"{source}有 {len(errors)} 列資料有誤，將略過：\n\n{report}\n\n"
+                    f"是否匯入其餘 {len(valid)} 筆？"):
+                return
+
+        # 類別與鍵盤輸入一樣正規化分數寫法（整欄一次，同一種類別只轉換一次）
+        type_idx = DATA_COLUMNS.index("類別")
+        for values, nice in zip(valid, pretty_fraction_column([v[type_idx] for v in valid])):
+            values[type_idx] = nice
+
+        recs = [{COLUMN_KEYS[col]: v for col, v in zip(DATA_COLUMNS, values)} for values in valid]
+        ids = self.store.add_many(self.sheet_key, recs)
+        items = [(rec["id"], record_to_values(rec)) for rec in self.store.get_many(ids)]
+        self.table.extend(items)
+        self.index.add_many(items)
+        self._refresh_filter()
+        messagebox.showinfo("匯入完成", f"已從{source}匯入 {len(ids)} 筆資料。")
+
     def _set_widget_text(self, widget: tk.Widget, text: str) -> None:
         """通用：把文字塞進 Entry / Combobox。"""
         s = "" if text is None else str(text)
@@ -398,15 +533,13 @@ class WageApp:
             messagebox.showwarning("一次僅支援一列", "請只選取一列再執行『複製到輸入欄』")
             return
 
-        iid = sel[0]
-        values = self.table.item(iid)["values"]  # ["序號", 月份, 日期, 訂單號碼, 類別, 顏色(組), 數量(片), 單價(元), 重量(kg), 備註]
-        if not values or len(values) < 1 + len(self.inputs):
-            messagebox.showerror("資料錯誤", "選取列的資料格式不完整，無法複製。")
+        rec = self.store.get(sel[0])
+        if rec is None:
+            messagebox.showerror("資料錯誤", "找不到選取列的資料，無法複製。")
             return
 
-        # 跳過 index=0 的「序號」，其餘依 DATA_COLUMNS 順序寫回
-        data_values = values[1:]
-        for col_name, col_value in zip(DATA_COLUMNS, data_values):
+        # 依資料庫的值寫回（不用表格上的顯示字串）
+        for col_name, col_value in record_to_inputs(rec).items():
             widget = self.inputs.get(col_name)
             if widget is not None:
                 self._set_widget_text(widget, col_value)
@@ -423,36 +556,140 @@ class WageApp:
         month = self.month_combobox.get().strip()
         if not (customer and year and month):
             messagebox.showwarning("錯誤", "請填寫客戶名稱、年份與標題月份"); return
+        self._sync_sheet()
 
-        records = []
-        for row in self.table.get_children():
-            data = self.table.item(row)['values']
-            data_no_idx = data[1:]
-            try:
-                rec = {
-                    "month":      data_no_idx[DATA_COLUMNS.index("月份")],
-                    "date":       data_no_idx[DATA_COLUMNS.index("日期")],
-                    "order":      data_no_idx[DATA_COLUMNS.index("訂單號碼")],
-                    "type":       data_no_idx[DATA_COLUMNS.index("類別")],
-                    "color":      data_no_idx[DATA_COLUMNS.index("顏色(組)")],
-                    "quantity":   int(data_no_idx[DATA_COLUMNS.index("數量(片)")] or 0),
-                    "unit_price": float(data_no_idx[DATA_COLUMNS.index("單價(元)")] or 0),
-                    "weight":     data_no_idx[DATA_COLUMNS.index("重量(kg)")],
-                    "remark":     data_no_idx[DATA_COLUMNS.index("備註")],
-                }
-                records.append(rec)
-            except Exception:
-                messagebox.showerror("格式錯誤", f"有資料無法解析：{data}\n請檢查【數量/單價/重量】是否為數字。")
-                return
+        # 直接查資料庫（已是數值型別），空白數量/單價視為 0
+        records = self.store.sheet_records((customer, year, month))
 
         if not records:
             messagebox.showwarning("沒有資料", "請先新增至少一筆資料再產生 PDF。"); return
 
+        from pdf_generator import generate_pdf, set_last_saved_dir
         set_last_saved_dir(self.last_saved_dir)
-        generate_pdf(customer, year, month, records)
+        # 背景產生：存檔對話框關閉後即可繼續輸入資料
+        generate_pdf(customer, year, month, records, master=self.root)
 
+    def export_month_packet(self) -> None:
+        """上方年份/標題月份的所有客戶明細合併成一份 PDF（每位客戶一個書籤）。"""
+        year = self.year_entry.get().strip()
+        month = self.month_combobox.get().strip()
+        if not (year and month):
+            messagebox.showwarning("錯誤", "請填寫年份與標題月份"); return
+        self._sync_sheet()
+        sheets = self.store.year_sheets(year, month)
+        if not sheets:
+            messagebox.showwarning("沒有資料", f"{year} 年 {month} 月還沒有任何明細資料。"); return
+
+        from pdf_generator import generate_packet, set_last_saved_dir
+        set_last_saved_dir(self.last_saved_dir)
+        generate_packet(year, month, [(c, y, m, recs) for (c, y, m), recs in sheets], master=self.root)
 
-if __name__ == '__main__':
+    def export_year_summary(self) -> None:
+        """依上方年份產生年度彙總（客戶 / 類別 / 月份各一份 PDF）。"""
+        year = self.year_entry.get().strip()
+        if not year:
+            messagebox.showwarning("錯誤", "請填寫年份"); return
+        sheets = self.store.year_sheets(year)
+        if not sheets:
+            messagebox.showwarning("沒有資料", f"{year} 年還沒有任何明細資料。"); return
+        out_dir = filedialog.askdirectory(title="選擇彙總報表的輸出資料夾", initialdir=self.last_saved_dir)
+        if not out_dir:
+            return
+        from yearly_report import write_year_reports
+        try:
+            results = write_year_reports(year, sheets, out_dir)
+        except Exception as e:
+            messagebox.showerror("產生失敗", f"產生彙總報表時發生錯誤：\n{e}"); return
+        messagebox.showinfo("完成", f"已輸出至 {out_dir}：\n" + "\n".join(os.path.basename(p) for p, _ in results))
+
+
+# ==================== 啟動計時 / 字型預熱 ====================
+STARTUP_LOG_ENV = "WAGE_STARTUP_LOG"     # 啟動計時記錄檔（每次啟動一行 JSON；"-" 表示 stderr）
+
+class StartupReport:
+    """啟動各階段的時間點（秒，自 main.py 開始執行起算）；字型預熱完成後寫出一行 JSON。"""
+
+    def __init__(self, t0: float, log_path: Optional[str]) -> None:
+        self.t0 = t0
+        self.log_path = log_path
+        self.marks: Dict[str, float] = {}
+        self.error: Optional[str] = None
+
+    def mark(self, name: str) -> None:
+        self.marks[name] = round(time.perf_counter() - self.t0, 4)
+
+    def write(self) -> None:
+        if not self.log_path:
+            return
+        rec: Dict[str, Any] = {
+            "event": "startup",
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "frozen": bool(getattr(sys, "frozen", False)),   # PyInstaller 打包版
+            "executable": os.path.basename(sys.executable),
+            "python": platform.python_version(),
+            **{f"{k}_s": v for k, v in self.marks.items()},
+        }
+        if self.error:
+            rec["error"] = self.error
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        if self.log_path == "-":
+            if sys.stderr is not None:      # 無主控台的打包版沒有 stderr
+                sys.stderr.write(line)
+            return
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+def start_font_warm_up(report: StartupReport) -> threading.Event:
+    """背景載入 pdf_generator（fpdf）與字型，完成時設定回傳的 Event。不碰 Tk 物件。"""
+    done = threading.Event()
+
+    def run() -> None:
+        try:
+            import pdf_generator
+            report.mark("pdf_module")
+            pdf_generator.warm_up()
+            report.mark("fonts_ready")
+        except Exception as e:      # 預熱失敗不影響使用，第一次產生時會再載入
+            report.error = f"{type(e).__name__}: {e}"
+        finally:
+            done.set()
+            try:
+                report.write()
+            except OSError:
+                pass
+
+    threading.Thread(target=run, name="font-warm-up", daemon=True).start()
+    return done
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="工繳明細自動產生器")
+    parser.add_argument("--startup-report", metavar="LOG", default=os.environ.get(STARTUP_LOG_ENV),
+                        help=f"啟動計時附加到 LOG（每次一行 JSON；亦可用環境變數 {STARTUP_LOG_ENV}）")
+    parser.add_argument("--exit-when-ready", action="store_true", help="字型預熱完成後自動關閉（量測啟動時間用）")
+    args, _ = parser.parse_known_args(argv)
+
+    report = StartupReport(_STARTUP_T0, args.startup_report)
+    report.mark("imports")
     root = tk.Tk()
-    app = WageApp(root)
+    WageApp(root)
+    report.mark("app_built")
+
+    def on_first_window() -> None:
+        # 閒置回呼在版面配置與第一次繪製之後執行：此時視窗已出現
+        report.mark("first_window")
+        ready = start_font_warm_up(report)
+        if args.exit_when_ready:
+            def poll() -> None:
+                if ready.is_set():
+                    root.destroy()
+                else:
+                    root.after(50, poll)
+            poll()
+    root.after_idle(on_first_window)
     root.mainloop()
+
+
+if __name__ == '__main__':
+    # 打包後的執行檔以 spawn 啟動 PDF 繪製子行程，子行程不可再開主視窗
+    multiprocessing.freeze_support()
+    main()
@@ -1,12 +1,32 @@
 ## `pdf_generator.py`"weight":     data_no_idx[DATA_COLUMNS.index("重量(kg)")],   # ← 保留原字串（可能是空字串）
 from fpdf import FPDF
+from fpdf import fpdf as fpdf_module
+from fpdf.php import UTF8ToUTF16BE
+from fpdf.ttfonts import TTFontFile
 import sys
 import os
 import re
-from typing import List, Dict, Tuple
+import hashlib
+import math
+import multiprocessing
+import pickle
+import queue
+import tempfile
+import threading
+import zlib
+from array import array
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import BinaryIO, Callable, Deque, List, Dict, Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple
+
+from font_cache import register_font
+from fraction_text import to_ascii_fractions
+from render_trace import NULL_TRACE, NullTrace, open_trace
+from totals import Totals, column_amounts, tax_of, totals_of
+from wage_record import RecordLike, WageRecord, as_records
 
 # ======================== 設定區 ========================
-MAX_ROWS_PER_PDF = 20           # 每頁最多顯示筆數
 FONT_PATH = "NotoSansTC-Regular.ttf"   # CJK 主字型
 MAIN_FONT_NAME = "NotoSansTC"
 FRACTION_FONT_PATH = "DejaVuSans.ttf"  # 類別欄專用（支援 ⅜、¼…）
@@ -18,6 +38,9 @@ PER_COL_FONT_SIZE: Dict[str, int] = {
 }
 LINE_H = 7
 HEADER_H = 10
+LETTERHEAD_H = 16 + 6 + 6 + 2 + 14 + 10 + 2    # 抬頭（公司、地址、電話、標題、客戶）總高
+TOTALS_H = 3 * 10 + 10                          # 最後一頁合計區塊高度
+PAGE_BOTTOM_MARGIN = 10                         # 頁尾（頁碼）保留高度
 COL_WIDTHS: List[int] = [24, 26, 18, 28, 18, 18, 18, 20, 20]  # 總寬需為 190
 
 REPORT_TITLE_LEFT = "捷盛針織企業社"
@@ -38,13 +61,13 @@ def resource_path(relative_path: str) -> str:
         return os.path.abspath(relative_path)
 
 def ensure_fonts(pdf: FPDF) -> None:
-    """確保兩套字型已加入（重複加入會自動忽略）。"""
+    """確保兩套字型已加入（度量取自 font_cache 的持久快取；重複加入會自動忽略）。"""
     try:
-        pdf.add_font(MAIN_FONT_NAME, '', resource_path(FONT_PATH), uni=True)
+        register_font(pdf, MAIN_FONT_NAME, resource_path(FONT_PATH))
     except Exception:
         pass
     try:
-        pdf.add_font(FRACTION_FONT_NAME, '', resource_path(FRACTION_FONT_PATH), uni=True)
+        register_font(pdf, FRACTION_FONT_NAME, resource_path(FRACTION_FONT_PATH))
     except Exception:
         pass
 
@@ -79,140 +102,426 @@ def number_to_chinese(n: int | str) -> str:
     res = "".join(parts).rstrip("零")
     return res + " 元整"
 
-# ============= 判斷中文字 / 分數 ASCII 化 =============
+# ==================== 判斷中文字 ====================
 _CJK_RE = re.compile(r"[\u3400-\u9FFF\uF900-\uFAFF]")
-_SUP_TO_NORM = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹", "0123456789")
-_SUB_TO_NORM = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
-_VULGAR_TO_PAIR: Dict[str, Tuple[int, int]] = {
-    "½": (1,2), "⅓": (1,3), "⅔": (2,3),
-    "¼": (1,4), "¾": (3,4),
-    "⅕": (1,5), "⅖": (2,5), "⅗": (3,5), "⅘": (4,5),
-    "⅙": (1,6), "⅚": (5,6),
-    "⅐": (1,7),
-    "⅛": (1,8), "⅜": (3,8), "⅝": (5,8), "⅞": (7,8),
-    "⅑": (1,9), "⅒": (1,10),
-}
 
 def contains_cjk(s: str) -> bool:
     return bool(_CJK_RE.search(s or ""))
 
-def to_ascii_fractions(s: str) -> str:
-    """將任意分數樣式轉為 ASCII：⅜→3/8，²⁄₉→2/9，⁄→/，以及將 ″/′ 轉為通用引號。"""
-    if not s:
-        return ""
-    for ch, (num, den) in _VULGAR_TO_PAIR.items():
-        s = s.replace(ch, f"{num}/{den}")
-    s = s.translate(_SUP_TO_NORM).translate(_SUB_TO_NORM)
-    s = s.replace("⁄", "/")
-    s = s.replace("″", '"').replace("′", "'")
-    return s
+# ===================== 字寬快取 =====================
+# (字型, 字級) -> {字元: 寬度}；每個字元只向字型量測一次，之後直接查表累加
+_WIDTH_CACHE: Dict[Tuple[str, float], Dict[str, float]] = {}
+
+def _char_widths(pdf: FPDF) -> Dict[str, float]:
+    """取得目前字型/字級的字寬表（惰性建立、跨文件共用）。"""
+    key = (pdf.font_family, pdf.font_size_pt)
+    table = _WIDTH_CACHE.get(key)
+    if table is None:
+        table = _WIDTH_CACHE[key] = {}
+    return table
+
+def _char_width(pdf: FPDF, table: Dict[str, float], ch: str) -> float:
+    w = table.get(ch)
+    if w is None:
+        w = table[ch] = pdf.get_string_width(ch)
+    return w
+
+def _text_width(pdf: FPDF, text: str) -> float:
+    """等同 pdf.get_string_width，但逐字查表。"""
+    table = _char_widths(pdf)
+    return sum(_char_width(pdf, table, ch) for ch in text)
 
 # =================== 一般欄位繪製 ===================
 def _wrap_lines(pdf: FPDF, text: str, max_w: float, padding: float = 1.5) -> List[str]:
     text = "" if text is None else str(text)
     if not text:
         return [""]
-    lines, line = [], ""
+    table = _char_widths(pdf)
+    lines, line, line_w = [], "", 0.0
     limit = max_w - padding
     for ch in text:
-        if pdf.get_string_width(line + ch) <= limit:
-            line += ch
+        ch_w = _char_width(pdf, table, ch)
+        if line_w + ch_w <= limit:
+            line += ch; line_w += ch_w
         else:
-            lines.append(line); line = ch
+            lines.append(line); line = ch; line_w = ch_w
     lines.append(line)
     return lines
 
-def _draw_wrapped_cell(pdf: FPDF, w: float, h: float, text: str, line_h: float,
-                       align: str = "C", font_size: int = 10, font_family: str = MAIN_FONT_NAME) -> None:
+def _fit_font_size(pdf: FPDF, text: str, max_w: float,
+                   font_family: str, base_size: float, min_size: float = 8.0) -> float:
+    """在 base_size, base_size-0.5, … 中找出能讓 text 塞進 max_w 的最大字級（最小到 min_size）。
+    字寬與字級成正比，因此只在 base_size 量一次寬度，再以二分搜尋挑字級。"""
+    s = text or ""
+    base = float(base_size)
+    pdf.set_font(font_family, '', base)
+    base_w = _text_width(pdf, s)
+    # 留一點左右內距
+    limit = max_w - 1.5
+    # 候選字級 base - 0.5k，k = 0..last；last 為第一個 <= min_size 的字級
+    last = max(0, math.ceil((base - min_size) / 0.5))
+    lo, hi = 0, last
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if base_w * (base - 0.5 * mid) / base <= limit:
+            hi = mid
+        else:
+            lo = mid + 1
+    size = base - 0.5 * lo
+    pdf.set_font(font_family, '', size)
+    return size
+
+def _ellipsize(pdf: FPDF, s: str, limit: float) -> Tuple[str, float]:
+    """以目前字型把 s 截到 limit 內（加 …）；回傳 (文字, 寬度)。"""
+    text_w = _text_width(pdf, s)
+    if text_w <= limit:
+        return s, text_w
+    # 逐字累加寬度，找出可放下的最長前綴
+    table = _char_widths(pdf)
+    budget = limit - _char_width(pdf, table, "…")
+    cut, acc = 0, 0.0
+    for ch in s:
+        acc += _char_width(pdf, table, ch)
+        if acc > budget:
+            break
+        cut += 1
+    s = (s[:cut] + "…") if cut else ""
+    return s, _text_width(pdf, s)
+
+# ====================== 列版面規劃 ======================
+TABLE_HEADERS: Tuple[str, ...] = ("日期", "訂單號碼", "類別", "顏色(組)", "數量(片)", "單價", "重量(kg)", "金額", "備註")
+_RIGHT_ALIGN_COLS = frozenset(("數量(片)", "單價", "重量(kg)", "金額"))
+
+class CellPlan(NamedTuple):
+    """單一儲存格的排版結果：fit=True 為單行縮字（類別），否則為多行換行。"""
+    fit: bool
+    lines: List[str]      # 換行後各行；fit 時只有一行（已省略處理）
+    font_family: str
+    font_size: float
+    align: str
+    text_w: float         # fit 時的文字寬（水平對齊用）
+
+class RowPlan(NamedTuple):
+    cells: List[CellPlan]
+    height: float
+
+def _layout_row(pdf: FPDF, row: List[str], col_widths: List[int] = COL_WIDTHS,
+                line_h: float = LINE_H) -> RowPlan:
+    """一次算好整列：各欄換行/字級/省略與列高，量測與繪製共用。"""
+    cells: List[CellPlan] = []
+    max_lines = 1
+    for i, hname in enumerate(TABLE_HEADERS):
+        fs = PER_COL_FONT_SIZE.get(hname, 10)
+        w = col_widths[i]
+        text = row[i] or ""
+        if hname == "類別":
+            # 類別：單行顯示（自動縮字），列高以 1 行為準
+            # 字型策略：含中文→用主字型（分數轉 ASCII）；無中文→用分數字型
+            if contains_cjk(text):
+                family, text = MAIN_FONT_NAME, to_ascii_fractions(text)
+            else:
+                family = FRACTION_FONT_NAME
+            size = _fit_font_size(pdf, text, w, family, fs)
+            text, text_w = _ellipsize(pdf, text, w - 1.5)
+            cells.append(CellPlan(True, [text], family, size, "C", text_w))
+        else:
+            pdf.set_font(MAIN_FONT_NAME, '', fs)
+            lines = _wrap_lines(pdf, text, w)
+            align = "R" if hname in _RIGHT_ALIGN_COLS else "C"
+            cells.append(CellPlan(False, lines, MAIN_FONT_NAME, fs, align, 0.0))
+            max_lines = max(max_lines, len(lines))
+    return RowPlan(cells, max(max_lines * line_h, HEADER_H))
+
+def _measure_row_height(pdf: FPDF, col_widths, row, line_h) -> float:
+    return _layout_row(pdf, row, col_widths, line_h).height
+
+# =================== 一般欄位繪製 ===================
+def _draw_wrapped_cell(pdf: FPDF, w: float, h: float, cell: CellPlan, line_h: float) -> None:
     x0, y0 = pdf.get_x(), pdf.get_y()
     pdf.cell(w, h, "", border=1)
-    pdf.set_xy(x0, y0)
-    pdf.set_font(font_family, '', font_size)
-    lines = _wrap_lines(pdf, text or "", w)
+    pdf.set_font(cell.font_family, '', cell.font_size)
+    lines = cell.lines
     total_text_h = max(line_h * len(lines), line_h)
     y_text = y0 + max((h - total_text_h) / 2, 0)
     pdf.set_xy(x0, y_text)
     for i, ln in enumerate(lines):
-        pdf.multi_cell(w, line_h, ln, border=0, align=align)
+        pdf.multi_cell(w, line_h, ln, border=0, align=cell.align)
         if i < len(lines) - 1:
             pdf.set_x(x0)
     pdf.set_xy(x0 + w, y0)
-def _fit_font_size(pdf: FPDF, text: str, max_w: float,
-                   font_family: str, base_size: float, min_size: float = 8.0) -> float:
-    """把 font size 從 base_size 往下調，直到 text 寬度塞進 max_w 或到 min_size。"""
-    s = text or ""
-    size = float(base_size)
-    pdf.set_font(font_family, '', size)
-    # 留一點左右內距
-    limit = max_w - 1.5
-    while size > min_size and pdf.get_string_width(s) > limit:
-        size -= 0.5
-        pdf.set_font(font_family, '', size)
-    return size
 
-def _draw_fit_cell(pdf: FPDF, w: float, h: float, text: str,
-                   align: str = "C", base_size: int = 10, font_family: str = "NotoSansTC") -> None:
-    """單行顯示、必要時縮小字級；過長仍超寬時用省略號。"""
+def _draw_fit_cell(pdf: FPDF, w: float, h: float, cell: CellPlan) -> None:
+    """單行顯示（字級與省略已在排版時決定）。"""
     x0, y0 = pdf.get_x(), pdf.get_y()
     pdf.cell(w, h, "", border=1)
-
-    s = "" if text is None else str(text)
-    size = _fit_font_size(pdf, s, w, font_family, base_size)
-    pdf.set_font(font_family, '', size)
-    limit = w - 1.5
-    text_w = pdf.get_string_width(s)
-
-    # 若到最小字級仍太長，做省略（加 …）
-    if text_w > limit:
-        while s and pdf.get_string_width(s + "…") > limit:
-            s = s[:-1]
-        s = (s + "…") if s else s
-        text_w = pdf.get_string_width(s)
+    pdf.set_font(cell.font_family, '', cell.font_size)
+    text_w = cell.text_w
 
     # 水平對齊
-    if align == "R":
+    if cell.align == "R":
         x = x0 + max(w - text_w - 1.0, 0)
-    elif align == "C":
+    elif cell.align == "C":
         x = x0 + max((w - text_w) / 2, 0)
     else:
         x = x0 + 1.0
 
     # 垂直置中（FPDF 的 text 以基線為準，估一個舒適係數）
-    y = y0 + (h + size * 0.35) / 2.0
-    pdf.text(x, y, s)
+    y = y0 + (h + cell.font_size * 0.35) / 2.0
+    pdf.text(x, y, cell.lines[0])
 
     pdf.set_xy(x0 + w, y0)
 
-# ====================== 行高估算 ======================
-def _measure_row_height(pdf: FPDF, headers, col_widths, row, line_h):
-    max_lines = 1
-    for i, hname in enumerate(headers):
-        fs = PER_COL_FONT_SIZE.get(hname, 10)
-        cell_text = row[i] or ""
-        if hname == "類別":
-            # 類別：單行顯示（自動縮字），因此列高以 1 行為準
-            # 仍照你的字型策略：含中文→用主字型；無中文→用分數字型
-            if contains_cjk(cell_text):
-                pdf.set_font(MAIN_FONT_NAME, '', fs)
-            else:
-                pdf.set_font(FRACTION_FONT_NAME, '', fs)
-            lines = 1
+def _draw_row(pdf: FPDF, plan: RowPlan, col_widths: List[int] = COL_WIDTHS,
+              line_h: float = LINE_H) -> None:
+    x0, y0 = pdf.get_x(), pdf.get_y()
+    for w, cell in zip(col_widths, plan.cells):
+        if cell.fit:
+            _draw_fit_cell(pdf, w, plan.height, cell)
         else:
-            pdf.set_font(MAIN_FONT_NAME, '', fs)
-            lines = len(_wrap_lines(pdf, cell_text, col_widths[i]))
-        max_lines = max(max_lines, lines)
-    return max(max_lines * line_h, HEADER_H)
+            _draw_wrapped_cell(pdf, w, plan.height, cell, line_h)
+    pdf.set_xy(x0, y0 + plan.height)
 
 
-# ======================== 主渲染 ========================
-def _render_one_pdf_page(pdf: FPDF, customer: str, year: str, title_month: str,
-                         rows: List[Dict[str, str]], overall_totals=None, is_last: bool = False) -> None:
-    headers = ["日期", "訂單號碼", "類別", "顏色(組)", "數量(片)", "單價", "重量(kg)", "金額", "備註"]
-    col_widths = COL_WIDTHS[:]
+# ======================== 分頁 ========================
+def _row_cells(r: WageRecord, amount: int) -> List[str]:
+    """一列資料 → 各欄文字（日期合併；金額加「元」）。"""
+    return [
+        f"{r.month.strip()}/{r.date.strip()}", r.order, r.type, r.color, str(r.quantity),
+        f"{r.unit_price:.2f}", "" if r.weight is None else f"{r.weight:.2f}",
+        f"{amount}元", r.remark,
+    ]
+
+def _body_height(pdf: FPDF) -> float:
+    """每頁可放表格內容的高度（扣掉抬頭、表頭與頁尾）。"""
+    top = pdf.t_margin + LETTERHEAD_H + HEADER_H
+    return pdf.h - PAGE_BOTTOM_MARGIN - top
+
+def paginate(row_heights: List[float], body_h: float, totals_h: float = TOTALS_H) -> List[Tuple[int, int]]:
+    """依列高在繪製前決定分頁，回傳每頁的列範圍 [start, end)。
+    - 依可用高度裝填（不再固定每頁筆數）；單列超過整頁高度時獨佔一頁
+    - 最後一頁需保留合計區塊；放不下時把最後一列移到新的一頁與合計同頁
+    """
+    pages: List[Tuple[int, int]] = []
+    start, used = 0, 0.0
+    for i, h in enumerate(row_heights):
+        if i > start and used + h > body_h:
+            pages.append((start, i))
+            start, used = i, 0.0
+        used += h
+    end = len(row_heights)
+    if end > start and used + totals_h > body_h:
+        if end - start > 1:
+            pages.append((start, end - 1))
+            start = end - 1
+        else:
+            pages.append((start, end))
+            start = end
+    pages.append((start, end))
+    return pages
+
+# ================== 字型子集 / 壓縮 ==================
+# 解析過的整份字型表格：(ttf 路徑, 大小, mtime) -> _ParsedFont
+# makeSubset 每次都要讀整個 cmap / hmtx / loca（CJK 字型有數萬個字），與文件用到哪些字無關；
+# 同一行程內第一次解析後留下，之後的文件（內容不同也一樣）只做自己的子集，輸出與原本完全相同。
+class _ParsedFont(NamedTuple):
+    char_to_glyph: Dict[int, int]
+    max_uni_char: int
+    char_widths: List[int]
+    default_width: int
+    glyph_pos: List[int]
+
+_PARSED_FONTS: Dict[Tuple[str, int, int], _ParsedFont] = {}
+_PARSED_STATS: Counter = Counter()      # "parsed" / "reused"：各字型解析 / 沿用次數
+_SUBSET_LOCK = threading.Lock()
+
+class _SubsetList(list):
+    """字元清單（已去重排序），成員檢查改用集合；FPDF 寫字寬表時會對每個 cid 查一次。"""
+
+    def __init__(self, chars) -> None:
+        super().__init__(chars)
+        self._lookup = frozenset(self)
+
+    def __contains__(self, cid) -> bool:
+        return cid in self._lookup
+
+class _CachedTTF(TTFontFile):
+    """makeSubset 照原本流程切子集，只是整份字型的 cmap / hmtx / loca 改取 _PARSED_FONTS。"""
 
-    pdf.add_page(); ensure_fonts(pdf)
+    def __init__(self) -> None:
+        super().__init__()
+        self._parsed: Optional[_ParsedFont] = None
+        self._fresh: Dict = {}
 
-    # 抬頭
+    def makeSubset(self, file, subset):
+        st = os.stat(file)
+        key = (os.path.abspath(file), st.st_size, st.st_mtime_ns)
+        self._parsed = _PARSED_FONTS.get(key)
+        self._fresh = {}
+        stream = super().makeSubset(file, subset)
+        if self._parsed is None:
+            _PARSED_FONTS[key] = _ParsedFont(**self._fresh)
+            _PARSED_STATS["parsed"] += 1
+        else:
+            _PARSED_STATS["reused"] += 1
+        return stream
+
+    def _cmap(self, parse, offset, glyphToChar, charToGlyph) -> None:
+        if self._parsed is None:
+            parse(offset, glyphToChar, charToGlyph)
+            self._fresh.update(char_to_glyph=charToGlyph, max_uni_char=self.maxUniChar)
+            return
+        # glyphToChar 只給 getHMTX 用；hmtx 也取快取，不必填
+        charToGlyph.update(self._parsed.char_to_glyph)
+        self.maxUniChar = self._parsed.max_uni_char
+
+    def getCMAP4(self, unicode_cmap_offset, glyphToChar, charToGlyph):
+        self._cmap(super().getCMAP4, unicode_cmap_offset, glyphToChar, charToGlyph)
+
+    def getCMAP12(self, unicode_cmap_offset, glyphToChar, charToGlyph):
+        self._cmap(super().getCMAP12, unicode_cmap_offset, glyphToChar, charToGlyph)
+
+    def getHMTX(self, numberOfHMetrics, numGlyphs, glyphToChar, scale):
+        if self._parsed is None:
+            super().getHMTX(numberOfHMetrics, numGlyphs, glyphToChar, scale)
+            self._fresh.update(char_widths=self.charWidths, default_width=self.defaultWidth)
+        else:
+            self.charWidths, self.defaultWidth = self._parsed.char_widths, self._parsed.default_width
+
+    def getLOCA(self, indexToLocFormat, numGlyphs):
+        if self._parsed is None:
+            super().getLOCA(indexToLocFormat, numGlyphs)
+            self._fresh["glyph_pos"] = self.glyphPos
+        else:
+            self.glyphPos = self._parsed.glyph_pos
+
+def clear_subset_cache() -> None:
+    with _SUBSET_LOCK:
+        _PARSED_FONTS.clear()
+
+# ===================== 頁首樣板 =====================
+class StatementPDF(FPDF):
+    """FPDF 加上 Form XObject 樣板：每頁重複的頁首只寫入文件一次，各頁以 Do 引用。
+    內容串流一律壓縮（與 FPDF 預設相同）。compact=True（預設）時切字型子集沿用同一行程內
+    解析過的字型表格；compact=False 為 FPDF 原本的做法（每份文件重新解析整個字型）。兩者輸出相同。"""
+
+    def __init__(self, *args, compact: bool = True, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.compact = compact
+        self.templates: List[Dict] = []                 # {"content": 頁面指令, "n": 物件編號}
+        self.page_headers: Dict[Tuple, Tuple[int, float]] = {}  # 頁首 key -> (樣板編號, 結束 y)
+        self.bookmarks: List[Tuple[str, int, int, float]] = []  # (標題, 層級, 頁次, y(pt))
+        self.outlines_n = 0                             # 書籤根物件編號（沒有書籤為 0）
+
+    def begin_template(self) -> int:
+        """開始錄製：之後畫在目前頁面上的指令會收進樣板。"""
+        return len(self.pages[self.page])
+
+    def end_template(self, start: int) -> int:
+        """結束錄製：把錄到的指令移入新樣板，並在原位置改以樣板引用；回傳樣板編號。"""
+        content = self.pages[self.page][start:]
+        self.pages[self.page] = self.pages[self.page][:start]
+        self.templates.append({"content": content, "n": 0})
+        tpl_id = len(self.templates)
+        self.use_template(tpl_id)
+        return tpl_id
+
+    def use_template(self, tpl_id: int) -> None:
+        # Do 會自動保存/還原繪圖狀態，樣板內切換的字型不會影響頁面
+        self._out(f"q /TPL{tpl_id} Do Q")
+
+    def _putimages(self) -> None:
+        super()._putimages()
+        bbox = f"[0 0 {self.w_pt:.2f} {self.h_pt:.2f}]"
+        for tpl in self.templates:
+            data = tpl["content"]
+            if self.compress:
+                data = zlib.compress(data.encode("latin1"))
+                flt = "/Filter /FlateDecode "
+            else:
+                flt = ""
+            self._newobj()
+            self._out(f"<</Type /XObject /Subtype /Form /BBox {bbox} /Resources 2 0 R {flt}/Length {len(data)}>>")
+            self._putstream(data)
+            self._out("endobj")
+            tpl["n"] = self.n
+
+    def _putfonts(self) -> None:
+        # FPDF 每畫一個字就往 subset 加一次（大量重複）；寫出前先去重
+        for font in self.fonts.values():
+            if font.get('type') == 'TTF':
+                font['subset'] = _SubsetList(sorted(set(font['subset'])))
+        if not self.compact:
+            super()._putfonts()
+            return
+        # fpdf 於模組層級建立 TTFontFile，寫字型期間暫時換成沿用解析結果的版本
+        with _SUBSET_LOCK:
+            fpdf_module.TTFontFile = _CachedTTF
+            try:
+                super()._putfonts()
+            finally:
+                fpdf_module.TTFontFile = TTFontFile
+
+    def _putxobjectdict(self) -> None:
+        super()._putxobjectdict()
+        for i, tpl in enumerate(self.templates, start=1):
+            self._out(f"/TPL{i} {tpl['n']} 0 R")
+
+    # ---------- 書籤 ----------
+    def add_bookmark(self, title: str, level: int = 0, y: Optional[float] = None) -> None:
+        """在目前頁面加一個書籤（y 未指定時為目前位置）；level 1 掛在前一個 level 0 之下。"""
+        y = self.y if y is None else y
+        self.bookmarks.append((title, level, self.page, (self.h - y) * self.k))
+
+    def _putresources(self) -> None:
+        super()._putresources()
+        if self.bookmarks:
+            self._putoutlines()
+
+    def _putoutlines(self) -> None:
+        # 兩層：[(物件編號, 書籤, [(物件編號, 書籤), ...])]；子書籤預設收合
+        root = self.n + 1
+        tree: List[Tuple[int, Tuple, List[Tuple[int, Tuple]]]] = []
+        n = root
+        for bm in self.bookmarks:
+            n += 1
+            if bm[1] == 0 or not tree:
+                tree.append((n, bm, []))
+            else:
+                tree[-1][2].append((n, bm))
+
+        def put_item(num: int, bm: Tuple, parent: int, prev: int, nxt: int,
+                     children: Sequence[Tuple[int, Tuple]] = ()) -> None:
+            title, _level, page, y = bm
+            self._newobj()
+            self._out(f"<</Title ({self._escape(UTF8ToUTF16BE(title, True))}) /Parent {parent} 0 R")
+            if prev:
+                self._out(f"/Prev {prev} 0 R")
+            if nxt:
+                self._out(f"/Next {nxt} 0 R")
+            if children:
+                self._out(f"/First {children[0][0]} 0 R /Last {children[-1][0]} 0 R /Count -{len(children)}")
+            self._out(f"/Dest [{1 + 2 * page} 0 R /XYZ 0 {y:.2f} null]>>")
+            self._out("endobj")
+
+        self._newobj()
+        self._out(f"<</Type /Outlines /First {tree[0][0]} 0 R /Last {tree[-1][0]} 0 R /Count {len(tree)}>>")
+        self._out("endobj")
+        self.outlines_n = root
+        for i, (num, bm, children) in enumerate(tree):
+            put_item(num, bm, root, tree[i - 1][0] if i else 0,
+                     tree[i + 1][0] if i + 1 < len(tree) else 0, children)
+            for j, (cnum, cbm) in enumerate(children):
+                put_item(cnum, cbm, num, children[j - 1][0] if j else 0,
+                         children[j + 1][0] if j + 1 < len(children) else 0)
+
+    def _putcatalog(self) -> None:
+        super()._putcatalog()
+        if self.outlines_n:
+            self._out(f"/Outlines {self.outlines_n} 0 R")
+            self._out("/PageMode /UseOutlines")
+
+def _draw_letterhead(pdf: FPDF, title: str, subtitle: str) -> None:
+    """公司抬頭 + 標題 + 副標（客戶）；高度固定為 LETTERHEAD_H。"""
     pdf.set_font(MAIN_FONT_NAME, '', 20)
     pdf.cell(0, 16, REPORT_TITLE_LEFT, ln=True, align='C')
     pdf.set_font(MAIN_FONT_NAME, '', 10)
@@ -220,145 +529,811 @@ def _render_one_pdf_page(pdf: FPDF, customer: str, year: str, title_month: str,
     pdf.cell(0, 6, REPORT_TEL, ln=True, align='C')
     pdf.ln(2)
     pdf.set_font(MAIN_FONT_NAME, '', 16)
-    pdf.cell(0, 14, f"{year}年{title_month}月份工繳請款明細表", ln=True, align='C')
+    pdf.cell(0, 14, title, ln=True, align='C')
     pdf.set_font(MAIN_FONT_NAME, '', 12)
-    pdf.cell(0, 10, f"客戶：{customer}", ln=True)
+    pdf.cell(0, 10, subtitle, ln=True)
     pdf.ln(2)
 
-    # 表頭
+def _draw_table_header(pdf: FPDF, col_widths: Sequence[float], headers: Sequence[str]) -> None:
     pdf.set_font(MAIN_FONT_NAME, '', 10)
-    for i, h in enumerate(headers):
-        pdf.cell(col_widths[i], HEADER_H, h, border=1, align='C')
+    for w, h in zip(col_widths, headers):
+        pdf.cell(w, HEADER_H, h, border=1, align='C')
     pdf.ln()
 
-    # 內容
-    for rr in rows:
-        row = [
-            rr["date_str"], rr["order"], rr["type"], rr["color"], rr["quantity"],
-            rr["unit_price"], rr["weight"], rr["amount"], rr["remark"]
-        ]
-        row_h = _measure_row_height(pdf, headers, col_widths, row, LINE_H)
-
-        # 分頁控制
-        bottom_limit = pdf.h - pdf.b_margin
-        if pdf.get_y() + row_h > bottom_limit:
-            pdf.add_page(); ensure_fonts(pdf)
-            pdf.set_font(MAIN_FONT_NAME, '', 20)
-            pdf.cell(0, 16, REPORT_TITLE_LEFT, ln=True, align='C')
-            pdf.set_font(MAIN_FONT_NAME, '', 10)
-            pdf.cell(0, 6, REPORT_ADDR, ln=True, align='C')
-            pdf.cell(0, 6, REPORT_TEL, ln=True, align='C')
-            pdf.ln(2)
-            pdf.set_font(MAIN_FONT_NAME, '', 16)
-            pdf.cell(0, 14, f"{year}年{title_month}月份工繳請款明細表", ln=True, align='C')
-            pdf.set_font(MAIN_FONT_NAME, '', 12)
-            pdf.cell(0, 10, f"客戶：{customer}", ln=True)
-            pdf.ln(2)
-            pdf.set_font(MAIN_FONT_NAME, '', 10)
-            for i, h in enumerate(headers):
-                pdf.cell(col_widths[i], HEADER_H, h, border=1, align='C')
-            pdf.ln()
-
-        # 畫列
-        x0, y0 = pdf.get_x(), pdf.get_y()
-        for i, text in enumerate(row):
-            w = col_widths[i]
-            fs = PER_COL_FONT_SIZE.get(headers[i], 10)
-            if headers[i] == "類別":
-                if contains_cjk(text or ""):
-                    safe_text = to_ascii_fractions(text or "")
-                    _draw_fit_cell(pdf, w, row_h, safe_text, align="C", base_size=fs, font_family=MAIN_FONT_NAME)
-                else:
-                    _draw_fit_cell(pdf, w, row_h, text or "", align="C", base_size=fs, font_family=FRACTION_FONT_NAME)
-            else:
-                align = "R" if headers[i] in ["數量(片)", "單價", "重量(kg)", "金額"] else "C"
-                _draw_wrapped_cell(pdf, w, row_h, text or "", LINE_H, align=align, font_size=fs, font_family=MAIN_FONT_NAME)
-        pdf.set_xy(x0, y0 + row_h)
+def _draw_page_header(pdf: FPDF, customer: str, year: str, title_month: str) -> None:
+    """抬頭 + 表頭（唯一一份頁首畫法）。"""
+    _draw_letterhead(pdf, f"{year}年{title_month}月份工繳請款明細表", f"客戶：{customer}")
+    _draw_table_header(pdf, COL_WIDTHS, TABLE_HEADERS)
 
+def _stamp_template(pdf: StatementPDF, key: Tuple, draw: Callable[[], None]) -> None:
+    """每份文件第一次畫某個頁首時錄成樣板，之後的頁面直接引用。"""
+    # 固定起始字型，確保錄製前後與引用前後的字型狀態一致
+    pdf.set_font(MAIN_FONT_NAME, '', 10)
+    cached = pdf.page_headers.get(key)
+    if cached is None:
+        start = pdf.begin_template()
+        draw()
+        cached = pdf.page_headers[key] = (pdf.end_template(start), pdf.get_y())
+    else:
+        pdf.use_template(cached[0])
+    pdf.set_xy(pdf.l_margin, cached[1])
+
+def _stamp_page_header(pdf: StatementPDF, customer: str, year: str, title_month: str) -> None:
+    _stamp_template(pdf, (customer, year, title_month),
+                    lambda: _draw_page_header(pdf, customer, year, title_month))
+
+def _draw_totals(pdf: FPDF, totals: Tuple[int, int, int]) -> None:
+    """合計區塊（高度 TOTALS_H）：小計/稅/合計 + 中文大寫。"""
+    subtotal, tax, total = totals
+    pdf.set_font(MAIN_FONT_NAME, '', 12)
+    pdf.multi_cell(0, 10, f"小計：{subtotal} 元\n稅(5%)：{tax} 元\n合計：{total} 元", align='R')
+    pdf.set_x(10)
+    pdf.multi_cell(190, 10, f"新臺幣：{number_to_chinese(total)}", align='R')
+
+def _draw_page_no(pdf: FPDF, page_no: int, page_count: int) -> None:
+    pdf.set_font(MAIN_FONT_NAME, '', 9)
+    pdf.set_xy(pdf.l_margin, pdf.h - PAGE_BOTTOM_MARGIN)
+    pdf.cell(0, PAGE_BOTTOM_MARGIN - 2, f"第 {page_no} 頁／共 {page_count} 頁", align='C')
+
+# ======================== 主渲染 ========================
+def _begin_page(pdf: StatementPDF, customer: str, year: str, title_month: str,
+                bookmarks: Sequence[Tuple[str, int]] = ()) -> None:
+    pdf.add_page()
+    for title, level in bookmarks:
+        pdf.add_bookmark(title, level, y=0)
+    _stamp_page_header(pdf, customer, year, title_month)
+
+def _end_page(pdf: FPDF, overall_totals=None, is_last: bool = False,
+              page_no: int = 1, page_count: int = 1) -> None:
     # 結尾合計（最後一頁）
     if is_last and overall_totals is not None:
-        subtotal, tax, total = overall_totals
-        pdf.set_font(MAIN_FONT_NAME, '', 12)
-        pdf.multi_cell(0, 10, f"小計：{subtotal} 元\n稅(5%)：{tax} 元\n合計：{total} 元", align='R')
-        pdf.set_x(10)
-        pdf.multi_cell(190, 10, f"新臺幣：{number_to_chinese(total)}", align='R')
+        _draw_totals(pdf, overall_totals)
+
+    # 頁碼
+    _draw_page_no(pdf, page_no, page_count)
+
+def _render_one_pdf_page(pdf: StatementPDF, customer: str, year: str, title_month: str,
+                         rows: List[RowPlan], overall_totals=None, is_last: bool = False,
+                         page_no: int = 1, page_count: int = 1) -> None:
+    col_widths = COL_WIDTHS[:]
+
+    _begin_page(pdf, customer, year, title_month)
+
+    # 內容（分頁已由 paginate 決定，這裡只負責畫）
+    for plan in rows:
+        _draw_row(pdf, plan, col_widths, LINE_H)
+
+    _end_page(pdf, overall_totals, is_last, page_no, page_count)
+
+# ===================== 頁面快取 =====================
+# 同一行程內重複匯出（改一個字再輸出）時，內容沒變的頁面直接沿用上次畫好的指令：
+# - 列：內容雜湊 -> 列高。分頁只需要列高，命中的列不必重新排版
+# - 頁：雜湊(頁首、文件字型、起始繪圖狀態、各列雜湊) -> 該頁表格部分的指令、用到的字元、結束狀態
+# 頁首樣板、合計與頁碼每次照常繪製，所以總額或頁數改變不會讓其他頁失效。
+_ROW_CACHE_SIZE = 65536
+_PAGE_CACHE_SIZE = 512
+_ROW_HEIGHTS: "OrderedDict[bytes, float]" = OrderedDict()
+_PAGE_CACHE: "OrderedDict[bytes, _CachedPage]" = OrderedDict()
+_PAGE_CACHE_LOCK = threading.Lock()
+
+# 會影響之後繪製結果的 FPDF 狀態
+_STATE_ATTRS: Tuple[str, ...] = (
+    "font_family", "font_style", "font_size_pt", "underline", "x", "y", "lasth", "ws",
+    "line_width", "draw_color", "fill_color", "text_color", "color_flag",
+)
+
+class _CachedPage(NamedTuple):
+    content: str                                    # 頁首之後、合計之前的頁面指令
+    subset: Tuple[Tuple[str, Tuple[int, ...]], ...]  # (字型 key, 這段用到的字元)
+    end_state: Tuple
+
+def _digest(*parts: bytes) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part)
+    return h.digest()
+
+def _row_key(row: Sequence[str]) -> bytes:
+    return _digest("\x1f".join(row).encode("utf-8"))
+
+def _cache_get(cache: OrderedDict, key: bytes):
+    with _PAGE_CACHE_LOCK:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+def _cache_put(cache: OrderedDict, key: bytes, value, limit: int) -> None:
+    with _PAGE_CACHE_LOCK:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+def clear_page_cache() -> None:
+    with _PAGE_CACHE_LOCK:
+        _ROW_HEIGHTS.clear()
+        _PAGE_CACHE.clear()
+
+def _pdf_state(pdf: FPDF) -> Tuple:
+    return tuple(getattr(pdf, a) for a in _STATE_ATTRS)
+
+def _restore_state(pdf: FPDF, state: Tuple) -> None:
+    for a, v in zip(_STATE_ATTRS, state):
+        setattr(pdf, a, v)
+    if pdf.font_family:
+        pdf.current_font = pdf.fonts[pdf.font_family + pdf.font_style]
+        pdf.unifontsubset = pdf.current_font["type"] == "TTF"
+        pdf.font_size = pdf.font_size_pt / pdf.k
+
+def _layout_detached(pdf: FPDF, row: List[str]) -> RowPlan:
+    """繪製途中補排版：排版會切換字型（並寫進目前頁面），排完把頁面與狀態還原。"""
+    state = _pdf_state(pdf)
+    mark = len(pdf.pages[pdf.page])
+    plan = _layout_row(pdf, row)
+    pdf.pages[pdf.page] = pdf.pages[pdf.page][:mark]
+    _restore_state(pdf, state)
+    return plan
+
+def _document_key(pdf: FPDF, customer: str, year: str, month: str) -> bytes:
+    fonts = sorted((k, f["i"]) for k, f in pdf.fonts.items())
+    return repr((customer, year, month, fonts, pdf.w, pdf.h, COL_WIDTHS)).encode("utf-8")
+
+def _page_key(pdf: FPDF, doc_key: bytes, row_keys: Sequence[bytes]) -> bytes:
+    return _digest(doc_key, repr(_pdf_state(pdf)).encode("utf-8"), *row_keys)
+
+def _replay_rows(pdf: StatementPDF, cached: _CachedPage) -> None:
+    pdf.pages[pdf.page] += cached.content
+    for fontkey, chars in cached.subset:
+        pdf.fonts[fontkey]["subset"].extend(chars)
+    _restore_state(pdf, cached.end_state)
+
+def _capture_rows(pdf: StatementPDF, rows: List[RowPlan]) -> _CachedPage:
+    """畫表格列，並記下畫出的指令、用到的字元與結束狀態。"""
+    mark = len(pdf.pages[pdf.page])
+    used = {k: len(f["subset"]) for k, f in pdf.fonts.items() if f.get("type") == "TTF"}
+    for plan in rows:
+        _draw_row(pdf, plan, COL_WIDTHS, LINE_H)
+    subset = tuple((k, tuple(sorted(set(pdf.fonts[k]["subset"][n:]))))
+                   for k, n in used.items() if len(pdf.fonts[k]["subset"]) > n)
+    return _CachedPage(pdf.pages[pdf.page][mark:], subset, _pdf_state(pdf))
+
+def _draw_rows_cached(pdf: StatementPDF, doc_key: bytes, row_keys: Sequence[bytes],
+                      plans: Callable[[], List[RowPlan]],
+                      prepared: Optional[Dict[bytes, _CachedPage]] = None) -> bool:
+    """畫目前頁面的表格列；內容與起始狀態都相同的頁面直接沿用（prepared 為子行程預先畫好的頁面）。
+    回傳是否沿用。"""
+    key = _page_key(pdf, doc_key, row_keys)
+    cached = prepared.get(key) if prepared else None
+    if cached is not None:
+        _cache_put(_PAGE_CACHE, key, cached, _PAGE_CACHE_SIZE)
+    else:
+        cached = _cache_get(_PAGE_CACHE, key)
+    if cached is not None:
+        _replay_rows(pdf, cached)
+        return True
+    _cache_put(_PAGE_CACHE, key, _capture_rows(pdf, plans()), _PAGE_CACHE_SIZE)
+    return False
+
+def _row_height_cached(pdf: FPDF, row: List[str], key: bytes) -> Tuple[float, Optional[RowPlan]]:
+    """列高（快取命中時不排版）；有排版時一併回傳排版結果。"""
+    h = _cache_get(_ROW_HEIGHTS, key)
+    if h is not None:
+        return h, None
+    plan = _layout_row(pdf, row)
+    _cache_put(_ROW_HEIGHTS, key, plan.height, _ROW_CACHE_SIZE)
+    return plan.height, plan
+
+def _draw_statement_page(pdf: StatementPDF, customer: str, year: str, month: str, doc_key: bytes,
+                         row_keys: Sequence[bytes], plans: Callable[[], List[RowPlan]],
+                         totals: Totals, page_no: int, page_count: int) -> bool:
+    """畫一整頁明細（頁首、表格列、合計、頁碼）；回傳表格部分是否沿用快取。"""
+    _begin_page(pdf, customer, year, month)
+    hit = _draw_rows_cached(pdf, doc_key, row_keys, plans)
+    _end_page(pdf, totals, page_no == page_count, page_no, page_count)
+    return hit
 
 # ======================== 產出流程 ========================
-def generate_pdf(customer: str, year: str, month: str, records: List[Dict[str, str]]) -> None:
-    from tkinter import filedialog, messagebox
-
-    # 計算金額
-    for r in records:
-        qty = int(r.get("quantity") or 0)
-        price = float(r.get("unit_price") or 0)
-        r["amount"] = str(round(qty * price))
-    subtotal = sum(int(r["amount"]) for r in records)
-    tax = round(subtotal * 0.05)
-    total = subtotal + tax
-    totals_tuple = (subtotal, tax, total)
-
-    # 整理列資料（日期合併；金額加「元」）
-    normalized_rows: List[Dict[str, str]] = []
-    for r in records:
-        date_str = f"{str(r.get('month','')).strip()}/{str(r.get('date','')).strip()}"
-        w_raw = r.get("weight", "")
-        w_text = "" if (w_raw is None or str(w_raw).strip() == "") else f"{float(w_raw):.2f}"
-        normalized_rows.append({
-            "date_str": date_str,
-            "order": str(r.get("order", "")),
-            "type":  str(r.get("type", "")),
-            "color": str(r.get("color", "")),
-            "quantity": str(r.get("quantity", "")),
-            "unit_price": f"{float(r.get('unit_price', 0)):.2f}",
-            "weight": w_text,
-            "amount": str(r.get("amount", "")) + "元",
-            "remark": str(r.get("remark", "")),
-        })
+def default_pdf_name(customer: str, year: str, month: str) -> str:
+    return f"{year}年{month}月份_{customer}_工繳明細.pdf"
+
+def record_amounts(records: Sequence[WageRecord]) -> List[int]:
+    """各列金額（數量 × 單價，精確四捨五入到元），整欄一次計算。"""
+    return column_amounts([r.quantity for r in records], [r.unit_price for r in records])
+
+def compute_totals(records: Sequence[WageRecord]) -> Totals:
+    """回傳 (小計, 稅, 合計)；不修改傳入的資料。"""
+    return totals_of(record_amounts(records))
+
+class RenderCancelled(Exception):
+    """使用者在產生途中按下取消。"""
+
+# progress(已完成頁數, 總頁數)
+ProgressCallback = Callable[[int, int], None]
+_CANCEL_CHECK_ROWS = 256    # 排版時每幾列檢查一次取消
+
+def _check_cancel(cancel: Optional[threading.Event]) -> None:
+    if cancel is not None and cancel.is_set():
+        raise RenderCancelled()
+
+def build_pdf(customer: str, year: str, month: str,
+              records: Sequence[RecordLike], compact: bool = True,
+              progress: Optional[ProgressCallback] = None,
+              cancel: Optional[threading.Event] = None,
+              trace: NullTrace = NULL_TRACE) -> StatementPDF:
+    """排版並繪製整份明細，回傳尚未輸出的 PDF 物件。
+    progress 每畫完一頁呼叫一次；cancel 被設定時拋出 RenderCancelled；
+    trace 記錄各段耗時（見 render_trace）。"""
+    with trace.stage("normalize"):
+        records = as_records(records)
+        amounts = record_amounts(records)
+        totals_tuple = totals_of(amounts)
+
+    with trace.stage("font_load"):
+        pdf = StatementPDF(format="A4", unit="mm", compact=compact)
+        pdf.set_auto_page_break(auto=False)
+        ensure_fonts(pdf)
+    trace.watch_pdf(pdf)
+
+    # 排版 + 分頁（繪製前就決定好每頁放哪些列）；列高快取命中的列不排版
+    with trace.stage("layout"):
+        row_keys: List[bytes] = []
+        heights: List[float] = []
+        plans: Dict[int, RowPlan] = {}
+        for i, r in enumerate(records):
+            if i % _CANCEL_CHECK_ROWS == 0:
+                _check_cancel(cancel)
+            row = _row_cells(r, amounts[i])
+            key = _row_key(row)
+            h, plan = _row_height_cached(pdf, row, key)
+            if plan is not None:
+                plans[i] = plan
+            row_keys.append(key)
+            heights.append(h)
+        pages = paginate(heights, _body_height(pdf))
+    num_pages = len(pages)
+    trace.set(rows=len(records), pages=num_pages, laid_out_rows=len(plans))
+
+    def page_plans(start: int, end: int) -> List[RowPlan]:
+        return [plans[i] if i in plans else _layout_detached(pdf, _row_cells(records[i], amounts[i]))
+                for i in range(start, end)]
+
+    # 繪製；固定起始字型，第一頁開頭不受排版了哪些列影響
+    doc_key = _document_key(pdf, customer, year, month)
+    pdf.set_font(MAIN_FONT_NAME, '', 10)
+    cached_pages = 0
+    with trace.stage("draw"):
+        for idx, (start, end) in enumerate(pages, start=1):
+            _check_cancel(cancel)
+            if _draw_statement_page(pdf, customer, year, month, doc_key, row_keys[start:end],
+                                    lambda: page_plans(start, end), totals_tuple, idx, num_pages):
+                cached_pages += 1
+            if progress is not None:
+                progress(idx, num_pages)
+    trace.set(cached_pages=cached_pages)
+    return pdf
+
+def write_pdf_atomic(pdf: FPDF, save_path: str) -> int:
+    """先寫到同資料夾的暫存檔再改名，失敗或中斷都不會留下寫一半的 PDF；回傳檔案大小。"""
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".pdf.tmp",
+                                    dir=os.path.dirname(os.path.abspath(save_path)))
+    os.close(fd)
+    try:
+        pdf.output(tmp_path)
+        os.replace(tmp_path, save_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return os.path.getsize(save_path)
+
+# ===================== 平行繪製 =====================
+# 分頁後每頁的表格只取決於該頁的列與頁首，可分批交給子行程畫；
+# 子行程回傳與頁面快取相同的 (key, 表格部分)，主行程依序套用。key 含起始繪圖狀態，
+# 對不上時主行程自己畫，所以輸出與單一行程逐位元組相同。
+PARALLEL_MIN_PAGES = 32     # 少於此頁數不開子行程（啟動成本大於效益）
+_PAGES_PER_TASK = 8
+_TASKS_PER_WORKER = 3       # 每個子行程最多排隊幾批：預先讀入的頁數有上限，記憶體不隨頁數增加
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+# 各頁的列文字, 子行程畫好的頁面（None = 主行程自己畫）
+PageSource = Iterator[Tuple[List[List[str]], Optional[Dict[bytes, _CachedPage]]]]
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+def _render_pool(workers: int) -> ProcessPoolExecutor:
+    """共用的子行程池（spawn：Windows / 打包後的程式與 Linux 行為一致）；第一次需要時才建立。"""
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS != workers:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _POOL_WORKERS = workers
+        return _POOL
+
+def shutdown_render_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+
+def _render_pages_task(customer: str, year: str, month: str, first_page: int, page_count: int,
+                       pages_rows: List[List[List[str]]]) -> List[Tuple[bytes, _CachedPage]]:
+    """子行程：以與主行程相同的繪圖狀態畫一段連續頁面，回傳各頁 (快取 key, 表格部分)。"""
+    pdf = StatementPDF(format="A4", unit="mm")
+    pdf.set_auto_page_break(auto=False)
+    ensure_fonts(pdf)
+    doc_key = _document_key(pdf, customer, year, month)
+    pdf.set_font(MAIN_FONT_NAME, '', 10)
+    if first_page > 1:
+        # 前一頁只需頁首與頁碼：下一頁開始時的繪圖狀態由頁碼決定，與表格內容無關
+        _begin_page(pdf, customer, year, month)
+        _end_page(pdf, None, False, first_page - 1, page_count)
+    out = []
+    for idx, rows in enumerate(pages_rows, start=first_page):
+        _begin_page(pdf, customer, year, month)
+        key = _page_key(pdf, doc_key, [_row_key(row) for row in rows])
+        out.append((key, _capture_rows(pdf, [_layout_detached(pdf, row) for row in rows])))
+        _end_page(pdf, None, False, idx, page_count)
+    return out
+
+def _serial_pages(spill: BinaryIO, pages: Sequence[Tuple[int, int]]) -> PageSource:
+    for start, end in pages:
+        yield [pickle.load(spill) for _ in range(start, end)], None
+
+def _parallel_pages(pool: ProcessPoolExecutor, workers: int, spill: BinaryIO,
+                    customer: str, year: str, month: str,
+                    pages: Sequence[Tuple[int, int]]) -> PageSource:
+    """依序讀出各頁的列並分批送到子行程，按頁序交回；子行程失敗的批次交由主行程自己畫。"""
+    pending: Deque[Tuple[List[List[List[str]]], Optional[Future]]] = deque()
+    next_page = 0
+    try:
+        while next_page < len(pages) or pending:
+            while next_page < len(pages) and len(pending) < workers * _TASKS_PER_WORKER:
+                chunk = pages[next_page:next_page + _PAGES_PER_TASK]
+                rows = [[pickle.load(spill) for _ in range(start, end)] for start, end in chunk]
+                try:
+                    fut: Optional[Future] = pool.submit(
+                        _render_pages_task, customer, year, month, next_page + 1, len(pages), rows)
+                except RuntimeError:     # 行程池已損毀或關閉
+                    fut = None
+                pending.append((rows, fut))
+                next_page += len(chunk)
+            rows, fut = pending.popleft()
+            try:
+                prepared = dict(fut.result()) if fut is not None else None
+            except Exception:
+                prepared = None
+            for page_rows in rows:
+                yield page_rows, prepared
+    finally:
+        for _rows, fut in pending:
+            if fut is not None:
+                fut.cancel()
+
+# ===================== 串流輸出 =====================
+_STREAM_CHUNK = 4096        # 第一輪每次取多少筆計算金額
+
+class _FileBuffer:
+    """取代 FPDF.buffer：`buffer += s` 直接寫進檔案，len() 為已寫出的位元組數（xref 位移用）。"""
+    __slots__ = ("file", "size")
+
+    def __init__(self, file: BinaryIO) -> None:
+        self.file = file
+        self.size = 0
+
+    def __iadd__(self, s: str) -> "_FileBuffer":
+        data = s.encode("latin1")
+        self.file.write(data)
+        self.size += len(data)
+        return self
+
+    def __len__(self) -> int:
+        return self.size
+
+class StreamingStatementPDF(StatementPDF):
+    """每頁結束就把頁面物件寫進檔案並釋放內容，記憶體不隨頁數增加。
+    物件編號、內容與 FPDF 一次寫出的版本相同（第 n 頁為 1+2n / 2+2n 號物件）；不支援頁內連結。"""
+
+    def __init__(self, file: BinaryIO, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buffer = _FileBuffer(file)
+        self.flushed_pages = 0
+
+    def _page_size_pt(self) -> Tuple[float, float]:
+        if self.def_orientation == 'P':
+            return self.fw_pt, self.fh_pt
+        return self.fh_pt, self.fw_pt
+
+    def _endpage(self) -> None:
+        super()._endpage()
+        n = self.page
+        if n <= self.flushed_pages:
+            return
+        if self.flushed_pages == 0:
+            self._out('%PDF-' + self.pdf_version)
+        w_pt, h_pt = self._page_size_pt()
+        self._newobj()
+        self._out('<</Type /Page')
+        self._out('/Parent 1 0 R')
+        if n in self.orientation_changes:
+            self._out(f'/MediaBox [0 0 {h_pt:.2f} {w_pt:.2f}]')
+        self._out('/Resources 2 0 R')
+        if self.pdf_version > '1.3':
+            self._out('/Group <</Type /Group /S /Transparency /CS /DeviceRGB>>')
+        self._out(f'/Contents {self.n + 1} 0 R>>')
+        self._out('endobj')
+        content = self.pages[n]
+        if self.compress:
+            content = zlib.compress(content.encode("latin1"))
+        self._newobj()
+        self._out(f"<<{'/Filter /FlateDecode ' if self.compress else ''}/Length {len(content)}>>")
+        self._putstream(content)
+        self._out('endobj')
+        self.pages[n] = ""
+        self.flushed_pages = n
+        # FPDF 每畫一個字就記一次，長文件會無限增長；每頁去重一次
+        for font in self.fonts.values():
+            if font.get('type') == 'TTF':
+                font['subset'] = sorted(set(font['subset']))
+
+    def _putheader(self) -> None:
+        pass    # 檔頭已在第一頁寫出時寫入
+
+    def _putpages(self) -> None:
+        # 各頁已在 _endpage 寫出，這裡只剩頁面樹
+        nb = self.page
+        w_pt, h_pt = self._page_size_pt()
+        self.offsets[1] = len(self.buffer)
+        self._out('1 0 obj')
+        self._out('<</Type /Pages')
+        self._out('/Kids [' + ''.join(f'{3 + 2 * i} 0 R ' for i in range(nb)) + ']')
+        self._out(f'/Count {nb}')
+        self._out(f'/MediaBox [0 0 {w_pt:.2f} {h_pt:.2f}]')
+        self._out('>>')
+        self._out('endobj')
+
+def _layout_pass(pdf: FPDF, records: Iterable[RecordLike], spill: BinaryIO,
+                 cancel: Optional[threading.Event]) -> Tuple["array[float]", Totals]:
+    """第一輪：逐批計算金額與列高，各列文字依序寫進暫存檔；只留下列高與小計。"""
+    heights = array("d")
+    subtotal = 0
+    it = iter(records)
+    while True:
+        chunk = as_records(islice(it, _STREAM_CHUNK))
+        if not chunk:
+            break
+        _check_cancel(cancel)
+        amounts = record_amounts(chunk)
+        subtotal += sum(amounts)
+        for r, amount in zip(chunk, amounts):
+            row = _row_cells(r, amount)
+            pickle.dump(row, spill, pickle.HIGHEST_PROTOCOL)
+            heights.append(_row_height_cached(pdf, row, _row_key(row))[0])
+    tax = tax_of(subtotal)
+    return heights, Totals(subtotal, tax, subtotal + tax)
+
+# (客戶, 年份, 標題月份, 資料列)；資料列可為迭代器
+StatementJob = Tuple[str, str, str, Iterable[RecordLike]]
+
+def _stream_jobs(pdf: StreamingStatementPDF, jobs: Iterable[StatementJob], spill: BinaryIO,
+                 trace: NullTrace, progress: Optional[ProgressCallback],
+                 cancel: Optional[threading.Event], bookmarks: bool = False, workers: int = 1) -> None:
+    """把多份明細依序畫進同一份文件；每份有自己的頁首、頁碼與合計。
+    先替全部明細做第一輪（得到總頁數供進度顯示），再依序讀回繪製；
+    workers > 1 時，頁數達 PARALLEL_MIN_PAGES 的明細交給子行程平行繪製。"""
+    with trace.stage("layout"):
+        planned = []    # (客戶, 年份, 月份, 分頁, 合計)
+        rows = 0
+        for customer, year, month, records in jobs:
+            heights, totals = _layout_pass(pdf, records, spill, cancel)
+            planned.append((customer, year, month, paginate(heights, _body_height(pdf)), totals))
+            rows += len(heights)
+    total_pages = sum(len(pages) for _c, _y, _m, pages, _t in planned)
+    trace.set(rows=rows, pages=total_pages, statements=len(planned))
+    per_customer = Counter(job[0] for job in planned)
+
+    spill.seek(0)
+    done = 0
+    with trace.stage("draw"):
+        for n, (customer, year, month, pages, totals) in enumerate(planned):
+            doc_key = _document_key(pdf, customer, year, month)
+            pdf.set_font(MAIN_FONT_NAME, '', 10)
+            if workers > 1 and len(pages) >= PARALLEL_MIN_PAGES:
+                source = _parallel_pages(_render_pool(workers), workers, spill, customer, year, month, pages)
+            else:
+                source = _serial_pages(spill, pages)
+            for idx, (page_rows, prepared) in enumerate(source, start=1):
+                _check_cancel(cancel)
+                marks: List[Tuple[str, int]] = []
+                if bookmarks and idx == 1:
+                    if n == 0 or planned[n - 1][0] != customer:
+                        marks.append((customer, 0))
+                    if per_customer[customer] > 1:
+                        marks.append((f"{year}年{month}月", 1))
+                _begin_page(pdf, customer, year, month, marks)
+                _draw_rows_cached(pdf, doc_key, [_row_key(row) for row in page_rows],
+                                  lambda: [_layout_detached(pdf, row) for row in page_rows], prepared)
+                _end_page(pdf, totals, idx == len(pages), idx, len(pages))
+                done += 1
+                if progress is not None:
+                    progress(done, total_pages)
+
+def _write_streaming(save_path: str, compact: bool, kind: str, fields: Dict,
+                     draw: Callable[[StreamingStatementPDF, BinaryIO, NullTrace], None]) -> int:
+    """建立串流 PDF 寫到同資料夾的暫存檔，畫完再改名（失敗不留半份檔案）；回傳檔案大小。"""
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".pdf.tmp",
+                                    dir=os.path.dirname(os.path.abspath(save_path)))
+    try:
+        with os.fdopen(fd, "wb", buffering=1 << 16) as out, tempfile.TemporaryFile() as spill, \
+                open_trace(kind, compact=compact, path=save_path, **fields) as trace:
+            with trace.stage("font_load"):
+                pdf = StreamingStatementPDF(out, format="A4", unit="mm", compact=compact)
+                pdf.set_auto_page_break(auto=False)
+                ensure_fonts(pdf)
+            trace.watch_pdf(pdf)
+            draw(pdf, spill, trace)
+            with trace.stage("output"):
+                pdf.close()
+            trace.set(size_bytes=len(pdf.buffer))
+        os.replace(tmp_path, save_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return os.path.getsize(save_path)
+
+def stream_pdf(customer: str, year: str, month: str,
+               records: Iterable[RecordLike], save_path: str, compact: bool = True,
+               progress: Optional[ProgressCallback] = None,
+               cancel: Optional[threading.Event] = None, workers: int = 1) -> int:
+    """以固定記憶體輸出一份明細（records 可為任意迭代器，只讀一次），回傳檔案大小。
+    第一輪算列高與合計（總頁數、最後一頁合計要先知道），列文字暫存到磁碟；
+    第二輪逐頁讀回、繪製並立即寫出（workers > 1 時分批平行繪製）。輸出與 build_pdf + write_pdf_atomic 相同。"""
+    def draw(pdf: StreamingStatementPDF, spill: BinaryIO, trace: NullTrace) -> None:
+        _stream_jobs(pdf, [(customer, year, month, records)], spill, trace, progress, cancel, workers=workers)
+        _check_cancel(cancel)
+    return _write_streaming(save_path, compact, "stream_pdf",
+                            {"customer": customer, "year": year, "month": month, "workers": workers}, draw)
+
+def default_packet_name(year: str, month: str) -> str:
+    return f"{year}年{month}月份_工繳明細合併.pdf"
+
+def render_packet(jobs: Sequence[StatementJob], save_path: str, compact: bool = True,
+                  progress: Optional[ProgressCallback] = None,
+                  cancel: Optional[threading.Event] = None, workers: int = 1) -> int:
+    """多份明細（例如月底所有客戶）合併成一份 PDF，回傳檔案大小。
+    每份保有自己的頁碼與合計；字型只嵌入一次；每個客戶一個書籤（同客戶多份時下分年月）。
+    同一客戶的明細排在一起（依客戶第一次出現的順序，客戶內維持原順序）。"""
+    first_seen: Dict[str, int] = {}
+    jobs = sorted(jobs, key=lambda job: first_seen.setdefault(job[0], len(first_seen)))
+
+    def draw(pdf: StreamingStatementPDF, spill: BinaryIO, trace: NullTrace) -> None:
+        _stream_jobs(pdf, jobs, spill, trace, progress, cancel, bookmarks=True, workers=workers)
+        _check_cancel(cancel)
+    return _write_streaming(save_path, compact, "render_packet", {"jobs": len(jobs), "workers": workers}, draw)
+
+def render_pdf(customer: str, year: str, month: str,
+               records: Iterable[RecordLike], save_path: str, compact: bool = True,
+               progress: Optional[ProgressCallback] = None,
+               cancel: Optional[threading.Event] = None, workers: int = 1) -> int:
+    """不經 Tk 對話框，直接把一份明細輸出到 save_path（批次/命令列共用），回傳檔案大小（bytes）。
+    以 stream_pdf 逐頁寫出；發生錯誤時直接拋出例外，由呼叫端決定如何呈現。"""
+    return stream_pdf(customer, year, month, records, save_path, compact, progress, cancel, workers)
+
+def pdf_size(customer: str, year: str, month: str,
+             records: Sequence[RecordLike], compact: bool = True) -> int:
+    """只在記憶體中產生，回傳檔案大小（用來比較 compact 前後）。"""
+    with open_trace("pdf_size", customer=customer, year=year, month=month, compact=compact) as trace:
+        pdf = build_pdf(customer, year, month, records, compact, trace=trace)
+        with trace.stage("output"):
+            size = len(pdf.output(dest='S'))
+        trace.set(size_bytes=size)
+    return size
+
+def pdf_bytes(customer: str, year: str, month: str,
+              records: Sequence[RecordLike], compact: bool = True) -> bytes:
+    """只在記憶體中產生，回傳整份 PDF（render_service 回應用）。"""
+    with open_trace("pdf_bytes", customer=customer, year=year, month=month, compact=compact) as trace:
+        pdf = build_pdf(customer, year, month, records, compact, trace=trace)
+        with trace.stage("output"):
+            data = pdf.output(dest='S').encode("latin-1")
+        trace.set(size_bytes=len(data))
+    return data
+
+def warm_up() -> None:
+    """預先載入字型度量、字寬表與字型子集（GUI 啟動後於背景執行，第一次產生不必等）。
+    產生一份只有一列的明細並輸出到記憶體，走過與實際產生相同的路徑。"""
+    sample = WageRecord(month="1", date="0123456789", order="A0123456789", type="1/2",
+                        color="0123456789", quantity=1234567890, unit_price=0.5, weight=1.5, remark="-")
+    build_pdf("-", "0", "1", [sample]).output(dest='S')
+
+# ===================== 彙總報表 =====================
+SUMMARY_COL_WIDTHS: List[int] = [70, 25, 35, 40, 20]   # 總寬需為 190
+_SUMMARY_ALIGNS: Tuple[str, ...] = ("C", "R", "R", "R", "R")
+
+def _draw_summary_row(pdf: FPDF, cells: Sequence[str]) -> None:
+    """彙總表一列：單行；第一欄（客戶/類別/月份）與明細的類別欄相同，自動縮字 + 分數字型。"""
+    label = cells[0]
+    if contains_cjk(label):
+        family, label = MAIN_FONT_NAME, to_ascii_fractions(label)
+    else:
+        family = FRACTION_FONT_NAME
+    w0 = SUMMARY_COL_WIDTHS[0]
+    _fit_font_size(pdf, label, w0, family, 10)
+    label, _ = _ellipsize(pdf, label, w0 - 1.5)
+    pdf.cell(w0, HEADER_H, label, border=1, align='C')
+    pdf.set_font(MAIN_FONT_NAME, '', 10)
+    for w, text, align in zip(SUMMARY_COL_WIDTHS[1:], cells[1:], _SUMMARY_ALIGNS[1:]):
+        pdf.cell(w, HEADER_H, text, border=1, align=align)
+    pdf.ln()
+
+def build_summary_pdf(title: str, subtitle: str, headers: Sequence[str],
+                      rows: Sequence[Sequence[str]], totals: Tuple[int, int, int],
+                      compact: bool = True) -> StatementPDF:
+    """彙總報表（每列一組：名稱/筆數/數量/金額/占比），最後一頁附合計與中文大寫。"""
+    pdf = StatementPDF(format="A4", unit="mm", compact=compact)
+    pdf.set_auto_page_break(auto=False)
+    ensure_fonts(pdf)
+
+    def draw_header() -> None:
+        _draw_letterhead(pdf, title, subtitle)
+        _draw_table_header(pdf, SUMMARY_COL_WIDTHS, headers)
+
+    pages = paginate([HEADER_H] * len(rows), _body_height(pdf))
+    for idx, (start, end) in enumerate(pages, start=1):
+        pdf.add_page()
+        _stamp_template(pdf, ("summary", title, subtitle), draw_header)
+        for cells in rows[start:end]:
+            _draw_summary_row(pdf, cells)
+        if idx == len(pages):
+            _draw_totals(pdf, totals)
+        _draw_page_no(pdf, idx, len(pages))
+    return pdf
+
+# ===================== 背景產生（GUI） =====================
+class _BackgroundExport:
+    """在工作執行緒產生 PDF；主視窗照常操作，另開小視窗顯示進度並可取消。
+    工作執行緒不碰 Tk，只把進度/結果放進佇列，由主執行緒以 after() 輪詢。"""
+
+    POLL_MS = 50
+
+    def __init__(self, master, render: Callable[[ProgressCallback, threading.Event], int],
+                 save_path: str, description: str) -> None:
+        import tkinter as tk
+        from tkinter import ttk
+
+        self.master = master
+        self.save_path = save_path
+        self.cancel = threading.Event()
+        self.events: "queue.Queue[Tuple[str, object]]" = queue.Queue()
+
+        self.top = tk.Toplevel(master)
+        self.top.title("產生 PDF")
+        self.top.resizable(False, False)
+        self.top.protocol("WM_DELETE_WINDOW", self._on_cancel)
+        self.label = tk.Label(self.top, text=f"排版中…（{description}）", anchor="w")
+        self.label.pack(padx=12, pady=(10, 4), fill="x")
+        self.bar = ttk.Progressbar(self.top, length=320, mode="indeterminate")
+        self.bar.pack(padx=12, pady=4)
+        self.bar.start(15)
+        self.cancel_btn = tk.Button(self.top, text="取消", command=self._on_cancel)
+        self.cancel_btn.pack(pady=(4, 10))
+
+        self.thread = threading.Thread(target=self._work, args=(render,), daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+        self.master.after(self.POLL_MS, self._poll)
+
+    # ---------- 工作執行緒 ----------
+    def _work(self, render: Callable[[ProgressCallback, threading.Event], int]) -> None:
+        try:
+            size = render(lambda done, total: self.events.put(("progress", (done, total))), self.cancel)
+            self.events.put(("done", size))
+        except RenderCancelled:
+            self.events.put(("cancelled", None))
+        except Exception as e:
+            self.events.put(("error", e))
+
+    # ---------- 主執行緒 ----------
+    def _on_cancel(self) -> None:
+        self.cancel.set()
+        self.cancel_btn.config(state="disabled")
+        self.label.config(text="取消中…")
+
+    def _poll(self) -> None:
+        while True:
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                done, total = payload
+                if str(self.bar.cget("mode")) != "determinate":
+                    self.bar.stop()
+                    self.bar.config(mode="determinate", maximum=total)
+                self.bar.config(value=done)
+                if not self.cancel.is_set():
+                    self.label.config(text=f"繪製中… 第 {done} / {total} 頁")
+                continue
+            self.top.destroy()
+            if kind == "done":
+                _show_success(self.save_path, payload)
+            elif kind == "error":
+                _show_error(payload)
+            return
+        self.master.after(self.POLL_MS, self._poll)
+
+def _show_error(e: BaseException) -> None:
+    from tkinter import messagebox
+    if isinstance(e, OSError):
+        messagebox.showerror("輸出失敗", f"無法寫入 PDF：\n{e}")
+    else:
+        messagebox.showerror("產生失敗", f"產生 PDF 過程發生錯誤：\n{e}")
+
+def _show_success(save_path: str, size: int) -> None:
+    from tkinter import messagebox
+    try:
+        messagebox.showinfo("成功", f"PDF 已輸出：\n{save_path}\n（{size / 1024:.1f} KB）")
+        os.startfile(save_path)
+    except Exception:
+        pass
+
+def _ask_save_path(initialfile: str) -> str:
+    from tkinter import filedialog
 
-    # 存檔對話框
-    default_name = f"{year}年{month}月份_{customer}_工繳明細.pdf"
     save_path = filedialog.asksaveasfilename(
         defaultextension=".pdf",
         initialdir=last_saved_dir,
-        initialfile=default_name,
+        initialfile=initialfile,
         filetypes=[("PDF files", "*.pdf")]
     )
+    if save_path:
+        set_last_saved_dir(os.path.dirname(save_path))
+    return save_path
+
+def generate_pdf(customer: str, year: str, month: str, records: Sequence[RecordLike],
+                 master=None, file_name: Optional[str] = None) -> None:
+    """選擇存檔位置後產生 PDF。給 master（Tk 視窗）時改在背景執行緒產生並顯示進度。
+    file_name 為存檔對話框的預設檔名（預設為 default_pdf_name）。"""
+    # 存檔對話框
+    save_path = _ask_save_path(file_name or default_pdf_name(customer, year, month))
     if not save_path:
         return
-    set_last_saved_dir(os.path.dirname(save_path))
-
-    # 分頁
-    chunks = [normalized_rows[i:i + MAX_ROWS_PER_PDF] for i in range(0, len(normalized_rows), MAX_ROWS_PER_PDF)]
-    num_pages = max(1, len(chunks))
-
-    pdf = FPDF(format="A4", unit="mm")
-    pdf.set_auto_page_break(auto=False)
 
-    # 繪製
-    try:
-        for idx, rows_part in enumerate(chunks, start=1):
-            _render_one_pdf_page(
-                pdf=pdf,
-                customer=customer,
-                year=year,
-                title_month=month,
-                rows=rows_part,
-                overall_totals=totals_tuple,
-                is_last=(idx == num_pages)
-            )
-    except Exception as e:
-        messagebox.showerror("產生失敗", f"產生 PDF 過程發生錯誤：\n{e}")
+    if master is not None:
+        _BackgroundExport(
+            master,
+            lambda progress, cancel: render_pdf(customer, year, month, records, save_path,
+                                                progress=progress, cancel=cancel, workers=default_workers()),
+            save_path, f"{len(records)} 筆").start()
         return
 
-    # 輸出
     try:
-        pdf.output(save_path)
+        size = render_pdf(customer, year, month, records, save_path)
     except Exception as e:
-        messagebox.showerror("輸出失敗", f"無法寫入 PDF：\n{e}")
+        _show_error(e)
         return
+    _show_success(save_path, size)
 
-    try:
-        messagebox.showinfo("成功", f"PDF 已輸出：\n{save_path}")
-        os.startfile(save_path)
-    except Exception:
-        pass
\ No newline at end of file
+def generate_packet(year: str, month: str, jobs: Sequence[StatementJob], master) -> None:
+    """選擇存檔位置後，在背景把多份明細合併成一份 PDF（見 render_packet）。"""
+    save_path = _ask_save_path(default_packet_name(year, month))
+    if not save_path:
+        return
+    _BackgroundExport(
+        master,
+        lambda progress, cancel: render_packet(jobs, save_path, progress=progress, cancel=cancel,
+                                               workers=default_workers()),
+        save_path, f"{len(jobs)} 份明細").start()
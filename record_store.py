@@ -0,0 +1,241 @@
+"""工繳資料的 SQLite 儲存區：表格只是畫面，資料以這裡為準。
+
+每筆資料屬於一張明細表（客戶, 年份, 標題月份），
+數量/單價/重量以數值欄位儲存，匯出時直接查詢，不必再解析表格字串。
+
+寫入方式（當機 / 直接關窗都不會遺失已輸入的列）：
+- WAL 模式：每次新增/刪除只在 -wal 檔尾端附加，不改寫整個檔案；程式當掉時已提交的資料都在
+- synchronous=NORMAL：提交時不 fsync；由 sync() 定期一次 fsync 一批（GUI 每幾秒呼叫一次），
+  斷電最多遺失最後幾秒的輸入
+- sync() 同時把 -wal 併回主檔（checkpoint）；關閉時併完並清空 -wal，主檔即為完整快照
+- 上次顯示的明細表記在 settings，啟動時直接還原
+"""
+import json
+import os
+import sqlite3
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from wage_record import WageRecord
+
+# (客戶, 年份, 標題月份)
+SheetKey = Tuple[str, str, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id          INTEGER PRIMARY KEY,
+    customer    TEXT    NOT NULL,
+    year        TEXT    NOT NULL,
+    title_month TEXT    NOT NULL,
+    month       TEXT    NOT NULL DEFAULT '',
+    date        TEXT    NOT NULL DEFAULT '',
+    order_no    TEXT    NOT NULL DEFAULT '',
+    type        TEXT    NOT NULL DEFAULT '',
+    color       TEXT    NOT NULL DEFAULT '',
+    quantity    INTEGER,
+    unit_price  REAL,
+    weight      REAL,
+    remark      TEXT    NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_records_sheet ON records (customer, year, title_month, id);
+CREATE INDEX IF NOT EXISTS idx_records_order ON records (order_no);
+CREATE TABLE IF NOT EXISTS settings (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+_DATA_COLS = "month, date, order_no, type, color, quantity, unit_price, weight, remark"
+# IN (...) 一次查詢的 id 數（SQLite 預設參數上限 999）
+_ID_BATCH = 500
+# checkpoint 後 -wal 檔保留的大小上限（bytes），避免一次大量匯入後一直佔著空間
+_WAL_SIZE_LIMIT = 4 * 1024 * 1024
+_LAST_SHEET = "last_sheet"
+
+
+def default_db_path() -> str:
+    """資料庫位置：可用環境變數 WAGE_DB_PATH 指定。"""
+    env = os.environ.get("WAGE_DB_PATH")
+    if env:
+        return env
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "wage_pdf", "records.db")
+
+
+def _blank_to_none(v: Any, caster) -> Any:
+    if v is None or str(v).strip() == "":
+        return None
+    return caster(v)
+
+
+def _row_to_record(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "month": row["month"],
+        "date": row["date"],
+        "order": row["order_no"],
+        "type": row["type"],
+        "color": row["color"],
+        "quantity": row["quantity"],
+        "unit_price": row["unit_price"],
+        "weight": row["weight"],
+        "remark": row["remark"],
+    }
+
+
+class RecordStore:
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or default_db_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"PRAGMA journal_size_limit={_WAL_SIZE_LIMIT}")
+        self.conn.executescript(_SCHEMA)
+        self.dirty = False      # 上次 sync() 之後是否有寫入
+        self.written = False    # 這次開啟後是否寫入過（只讀取的命令列工具關閉時不必 checkpoint）
+
+    def _touch(self) -> None:
+        self.dirty = self.written = True
+
+    def close(self) -> None:
+        if self.written:
+            self.sync(compact=True)
+        self.conn.close()
+
+    def sync(self, compact: bool = False) -> None:
+        """把目前為止的寫入一次 fsync 並併回主檔（checkpoint）。
+        compact=True 時等候讀取結束並清空 -wal（關閉時使用）；沒有新寫入時不做事。"""
+        if not self.dirty and not compact:
+            return
+        self.conn.execute(f"PRAGMA wal_checkpoint({'TRUNCATE' if compact else 'PASSIVE'})")
+        self.dirty = False
+
+    # ---------- 寫入 ----------
+    def add(self, key: SheetKey, rec: Dict[str, Any]) -> int:
+        """新增一筆資料，回傳 id。空白的數量/單價/重量存為 NULL。"""
+        return self.add_many(key, [rec])[0]
+
+    def add_many(self, key: SheetKey, recs: Iterable[Dict[str, Any]]) -> List[int]:
+        ids: List[int] = []
+        with self.conn:
+            for rec in recs:
+                cur = self.conn.execute(
+                    f"INSERT INTO records (customer, year, title_month, {_DATA_COLS}) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*key,
+                     str(rec.get("month", "")), str(rec.get("date", "")),
+                     str(rec.get("order", "")), str(rec.get("type", "")),
+                     str(rec.get("color", "")),
+                     _blank_to_none(rec.get("quantity"), int),
+                     _blank_to_none(rec.get("unit_price"), float),
+                     _blank_to_none(rec.get("weight"), float),
+                     str(rec.get("remark", ""))),
+                )
+                ids.append(cur.lastrowid)
+        self._touch()
+        return ids
+
+    def delete(self, ids: Iterable[int]) -> None:
+        with self.conn:
+            self.conn.executemany("DELETE FROM records WHERE id = ?", ((int(i),) for i in ids))
+        self._touch()
+
+    def move_sheet(self, src: SheetKey, dst: SheetKey) -> int:
+        """把整張明細表改到另一個 (客戶, 年份, 標題月份)，回傳筆數。"""
+        with self.conn:
+            cur = self.conn.execute(
+                "UPDATE records SET customer = ?, year = ?, title_month = ? "
+                "WHERE customer = ? AND year = ? AND title_month = ?", (*dst, *src))
+        self._touch()
+        return cur.rowcount
+
+    # ---------- 設定 ----------
+    def set_last_sheet(self, key: SheetKey) -> None:
+        """記下目前顯示的明細表，下次啟動時還原。"""
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                              (_LAST_SHEET, json.dumps(list(key), ensure_ascii=False)))
+        self._touch()
+
+    def last_sheet(self) -> Optional[SheetKey]:
+        row = self.conn.execute("SELECT value FROM settings WHERE key = ?", (_LAST_SHEET,)).fetchone()
+        if row is None:
+            return None
+        try:
+            customer, year, month = json.loads(row[0])
+        except (ValueError, TypeError):
+            return None
+        return (str(customer), str(year), str(month))
+
+    # ---------- 查詢 ----------
+    def get(self, rid: int) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(f"SELECT id, {_DATA_COLS} FROM records WHERE id = ?", (int(rid),)).fetchone()
+        return _row_to_record(row) if row else None
+
+    def get_many(self, ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """多筆資料（依 id 排序）；分批查詢以免超過 SQLite 參數上限。"""
+        ids = [int(i) for i in ids]
+        out: List[Dict[str, Any]] = []
+        for start in range(0, len(ids), _ID_BATCH):
+            chunk = ids[start:start + _ID_BATCH]
+            rows = self.conn.execute(
+                f"SELECT id, {_DATA_COLS} FROM records "
+                f"WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            out.extend(_row_to_record(r) for r in rows)
+        out.sort(key=lambda r: r["id"])
+        return out
+
+    def sheet(self, key: SheetKey) -> List[Dict[str, Any]]:
+        """一張明細表的所有資料（依輸入順序）。"""
+        rows = self.conn.execute(
+            f"SELECT id, {_DATA_COLS} FROM records "
+            "WHERE customer = ? AND year = ? AND title_month = ? ORDER BY id", key)
+        return [_row_to_record(r) for r in rows]
+
+    def sheet_records(self, key: SheetKey) -> List[WageRecord]:
+        """匯出用：依欄位位置直接建立 WageRecord（空白數量/單價為 0）。"""
+        rows = self.conn.execute(
+            f"SELECT {_DATA_COLS} FROM records "
+            "WHERE customer = ? AND year = ? AND title_month = ? ORDER BY id", key)
+        return [WageRecord(month, date, order, type_, color, qty or 0, price or 0.0, weight, remark)
+                for month, date, order, type_, color, qty, price, weight, remark in rows]
+
+    def records(self, ids: Iterable[int]) -> List[WageRecord]:
+        """指定的多筆資料轉成 WageRecord（依 id 排序；匯出篩選結果用）。"""
+        return [WageRecord(r["month"], r["date"], r["order"], r["type"], r["color"],
+                           r["quantity"] or 0, r["unit_price"] or 0.0, r["weight"], r["remark"])
+                for r in self.get_many(ids)]
+
+    def year_sheets(self, year: str, title_month: Optional[str] = None) -> List[Tuple[SheetKey, List[WageRecord]]]:
+        """某年度所有明細表（依客戶、標題月份），年度彙總用；給 title_month 時只取該月（合併列印）。"""
+        where, params = "WHERE year = ?", [year]
+        if title_month is not None:
+            where += " AND title_month = ?"
+            params.append(title_month)
+        rows = self.conn.execute(
+            f"SELECT customer, title_month, {_DATA_COLS} FROM records "
+            f"{where} ORDER BY customer, CAST(title_month AS INTEGER), id", params)
+        sheets: List[Tuple[SheetKey, List[WageRecord]]] = []
+        for customer, title_month, month, date, order, type_, color, qty, price, weight, remark in rows:
+            key = (customer, year, title_month)
+            if not sheets or sheets[-1][0] != key:
+                sheets.append((key, []))
+            sheets[-1][1].append(
+                WageRecord(month, date, order, type_, color, qty or 0, price or 0.0, weight, remark))
+        return sheets
+
+    def count(self, key: SheetKey) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM records WHERE customer = ? AND year = ? AND title_month = ?",
+            key).fetchone()[0]
+
+    def by_order(self, order_no: str) -> List[Tuple[SheetKey, Dict[str, Any]]]:
+        rows = self.conn.execute(
+            f"SELECT customer, year, title_month, id, {_DATA_COLS} FROM records "
+            "WHERE order_no = ? ORDER BY id", (order_no,))
+        return [((r["customer"], r["year"], r["title_month"]), _row_to_record(r)) for r in rows]
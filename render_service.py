@@ -0,0 +1,365 @@
+"""本機 PDF 產生服務（HTTP，給出貨單、會計匯出等內部工具呼叫；不開 Tk 視窗、不需連網）。
+
+    python render_service.py                    # http://127.0.0.1:8765，平行數 = CPU 核心數
+    python render_service.py --port 9000 -j 2 --max-pending 32
+
+POST /render  內容為 JSON：
+    {"customer": "...", "year": "113", "month": "5", "records": [...], "compact": true}
+records 每筆欄位與 WageApp.export_pdf 相同（month, date, order, type, color, quantity,
+unit_price, weight, remark）。成功回傳 application/pdf；格式錯誤 400、資料過大 413、
+忙碌 503（附 Retry-After）、產生失敗 500，錯誤內容為 {"error": "..."}。
+GET /health   回傳處理中數量與累計統計（JSON）；行程池故障或重建中時 status 為 "degraded"，HTTP 503。
+
+- 產生在子行程中進行（CPU 密集，不卡住事件迴圈），同時最多 workers 份
+- 解析 JSON 與計算合併 key 在另一條執行緒中進行；內容上限 4 MB（約兩萬筆），
+  單次 json.loads 不會讓其他連線（含 /health）明顯卡住
+- 不同內容的待處理請求超過 max_pending 時直接回 503，不無限排隊
+- 客戶/年份/月份/資料完全相同、且同時進行中的請求只產生一次，結果共用（回應標頭 X-Coalesced: 1）
+- 子行程異常結束（記憶體不足、崩潰）時換一個新的行程池，受影響的請求重試一次
+"""
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import multiprocessing
+import signal
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+
+from pdf_generator import default_pdf_name, default_workers, pdf_bytes
+from wage_record import WageRecord
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY = 4 * 1024 * 1024       # 單一請求內容上限（bytes）
+_MAX_HEADERS = 100
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class RenderJob(NamedTuple):
+    customer: str
+    year: str
+    month: str
+    records: List[WageRecord]
+    compact: bool
+
+    def key(self) -> str:
+        """合併用的識別：以正規化後的資料計算（"10" 與 10 視為相同）。
+        逐筆累加雜湊，不一次序列化整份資料（在執行緒中計算時不長時間佔住 GIL）。"""
+        h = hashlib.sha256(json.dumps([self.customer, self.year, self.month, self.compact],
+                                      ensure_ascii=False).encode("utf-8"))
+        for r in self.records:
+            h.update(json.dumps(r.as_dict(), ensure_ascii=False).encode("utf-8"))
+        return h.hexdigest()
+
+
+def parse_job(body: bytes) -> RenderJob:
+    """檢查並轉換請求內容；格式不符拋出 HttpError(400)。"""
+    try:
+        data = json.loads(body.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HttpError(400, f"JSON 格式錯誤：{e}")
+    if not isinstance(data, dict):
+        raise HttpError(400, "內容需為 JSON 物件")
+    customer, year, month = (str(data.get(k) or "").strip() for k in ("customer", "year", "month"))
+    if not (customer and year and month):
+        raise HttpError(400, "請填寫 customer、year 與 month")
+    rows = data.get("records")
+    if not isinstance(rows, list) or not rows:
+        raise HttpError(400, "records 需為至少一筆資料的陣列")
+    try:
+        records = [WageRecord.from_mapping(r) for r in rows]
+    except (AttributeError, TypeError, ValueError) as e:
+        raise HttpError(400, f"資料格式錯誤：{e}")
+    return RenderJob(customer, year, month, records, bool(data.get("compact", True)))
+
+def _parse_with_key(body: bytes) -> Tuple[RenderJob, str]:
+    job = parse_job(body)
+    return job, job.key()
+
+def _render_body(body: bytes) -> bytes:
+    """子行程中執行：送過去的是原始內容（複製 bytes 很快），不必在主行程序列化上萬筆 WageRecord。"""
+    job = parse_job(body)
+    return pdf_bytes(job.customer, job.year, job.month, job.records, job.compact)
+
+
+# ======================== 產生 ========================
+def _ignore_sigint() -> None:
+    # Ctrl+C 由主行程處理；子行程不各自印出 KeyboardInterrupt
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class RenderService:
+    """子行程池 + 上限 + 相同請求合併。只在事件迴圈的執行緒中使用；鎖只用來避免同時重建行程池。"""
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.pool_generation = 0                         # 每重建一次行程池加 1
+        self.rebuilding = False
+        self.rebuild_lock: Optional[asyncio.Lock] = None
+        self.rebuild_task: Optional[asyncio.Future] = None   # /health 觸發的重建（保留參照以免被回收）
+        self.pending: Dict[str, asyncio.Future] = {}     # 合併 key -> 產生中的工作
+        self.running = 0
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.stats: Counter = Counter()
+        self.started = time.time()
+
+    def start(self) -> None:
+        self.slots = asyncio.Semaphore(self.workers)
+        self.rebuild_lock = asyncio.Lock()
+        self.pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_ignore_sigint)
+        # 預先啟動子行程並載入字型，第一個請求不必等
+        warm = [WageRecord(month="1", date="1/1", quantity=1, unit_price=1.0)]
+        for _ in range(self.workers):
+            pool.submit(pdf_bytes, "-", "0", "1", warm)
+        return pool
+
+    def pool_broken(self) -> bool:
+        # ProcessPoolExecutor 沒有公開的狀態查詢；_broken 在子行程異常結束時設定
+        return self.pool is None or bool(getattr(self.pool, "_broken", False))
+
+    async def _replace_pool(self, generation: int) -> None:
+        """換一個新的行程池。多個請求同時發現故障時只重建一次（generation 已變就表示別人換過了）。"""
+        async with self.rebuild_lock:
+            if generation != self.pool_generation:
+                return
+            self.rebuilding = True
+            try:
+                old, self.pool = self.pool, None
+                if old is not None:
+                    # 子行程都已結束，但 shutdown 仍需等管理執行緒收尾；放到執行緒以免卡住事件迴圈
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, functools.partial(old.shutdown, wait=True, cancel_futures=True))
+                self.pool = self._new_pool()
+                self.pool_generation += 1
+                self.stats["pool_restarts"] += 1
+            finally:
+                self.rebuilding = False
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    async def render(self, body: bytes, key: str) -> Tuple[bytes, bool]:
+        """body 為已檢查過的請求內容、key 為其 RenderJob.key()；回傳 (PDF, 是否與進行中的相同請求合併)。"""
+        task = self.pending.get(key)
+        coalesced = task is not None
+        if task is None:
+            if len(self.pending) >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise HttpError(503, "目前請求過多，請稍後再試", {"Retry-After": "1"})
+            task = asyncio.ensure_future(self._render(body))
+            self.pending[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+        else:
+            self.stats["coalesced"] += 1
+        # shield：某個用戶端斷線時，不取消其他人也在等的產生
+        return await asyncio.shield(task), coalesced
+
+    async def _render(self, body: bytes) -> bytes:
+        async with self.slots:
+            self.running += 1
+            try:
+                for attempt in range(2):
+                    # 重建中時等重建完成再送出
+                    if self.rebuilding or self.pool is None:
+                        async with self.rebuild_lock:
+                            pass
+                    generation = self.pool_generation
+                    try:
+                        return await asyncio.get_running_loop().run_in_executor(
+                            self.pool, _render_body, body)
+                    except BrokenProcessPool:
+                        # 子行程異常結束（可能是同一批的其他請求造成的）：換新的行程池後重試一次
+                        await self._replace_pool(generation)
+                        if attempt:
+                            raise
+            finally:
+                self.running -= 1
+
+    def _finished(self, key: str, task: asyncio.Future) -> None:
+        self.pending.pop(key, None)
+        if task.cancelled():
+            return
+        # 讀取一次例外：所有等待者都斷線時也不會出現 "exception was never retrieved"
+        self.stats["failed" if task.exception() is not None else "rendered"] += 1
+
+    def health(self) -> Dict:
+        degraded = self.rebuilding or self.pool_broken()
+        if degraded and not self.rebuilding:
+            # 沒有請求進來時也在這裡觸發重建，監控程式看得到恢復
+            self.rebuild_task = asyncio.ensure_future(self._replace_pool(self.pool_generation))
+        return {"status": "degraded" if degraded else "ok",
+                "workers": self.workers, "max_pending": self.max_pending,
+                "pending": len(self.pending), "running": self.running,
+                "uptime_s": round(time.time() - self.started, 1), **self.stats}
+
+
+# ======================== HTTP ========================
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    """讀一個 HTTP/1.1 請求；連線已關閉時回傳 None。只支援 Content-Length（不支援 chunked）。"""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "請求行格式錯誤")
+    headers: Dict[str, str] = {}
+    for _ in range(_MAX_HEADERS):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HttpError(400, "標頭過多")
+    body = b""
+    if method == "POST":
+        if "transfer-encoding" in headers or "content-length" not in headers:
+            raise HttpError(411, "需要 Content-Length")
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            raise HttpError(400, "Content-Length 格式錯誤")
+        if length > MAX_BODY:
+            raise HttpError(413, f"內容超過 {MAX_BODY // (1024 * 1024)} MB")
+        body = await reader.readexactly(length)
+    return method, target.split("?", 1)[0], headers, body
+
+def _response(status: int, body: bytes, content_type: str, headers: Dict[str, str], keep_alive: bool) -> bytes:
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+             f"Content-Type: {content_type}",
+             f"Content-Length: {len(body)}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+def _json_body(data: Dict) -> bytes:
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+class RenderServer:
+    def __init__(self, service: RenderService) -> None:
+        self.service = service
+        # 解析只用一條執行緒：多條同時解析會互搶 GIL，事件迴圈反而分不到時間
+        self.parser = ThreadPoolExecutor(1, thread_name_prefix="parse")
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, bytes, str, Dict[str, str]]:
+        if path == "/health":
+            if method != "GET":
+                raise HttpError(405, "請使用 GET")
+            health = self.service.health()
+            status = 200 if health["status"] == "ok" else 503
+            return status, _json_body(health), "application/json; charset=utf-8", {}
+        if path != "/render":
+            raise HttpError(404, "只支援 /render 與 /health")
+        if method != "POST":
+            raise HttpError(405, "請使用 POST")
+        # 大的 JSON 解析要數十毫秒以上，放到執行緒以免卡住其他連線
+        job, key = await asyncio.get_running_loop().run_in_executor(self.parser, _parse_with_key, body)
+        t0 = time.perf_counter()
+        try:
+            data, coalesced = await self.service.render(body, key)
+        except HttpError:
+            raise
+        except Exception as e:
+            raise HttpError(500, f"產生失敗：{type(e).__name__}: {e}")
+        name = default_pdf_name(job.customer, job.year, job.month)
+        return 200, data, "application/pdf", {
+            "Content-Disposition": f"attachment; filename=\"statement.pdf\"; filename*=UTF-8''{quote(name)}",
+            "X-Coalesced": "1" if coalesced else "0",
+            "X-Render-Ms": f"{(time.perf_counter() - t0) * 1000:.1f}",
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """一條連線可連續送多個請求（keep-alive）；出錯或用戶端要求時關閉。"""
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    req = await _read_request(reader)
+                    if req is None:
+                        break
+                    method, path, headers, body = req
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    status, payload, ctype, extra = await self.dispatch(method, path, body)
+                except HttpError as e:
+                    status, payload, ctype, extra = (e.status, _json_body({"error": str(e)}),
+                                                     "application/json; charset=utf-8", e.headers)
+                    # 內容沒讀完的錯誤（411 / 413 / 格式錯誤）之後無法接著讀下一個請求
+                    keep_alive = keep_alive and status not in (400, 411, 413)
+                writer.write(_response(status, payload, ctype, extra, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass    # 用戶端中途斷線、或請求行 / 標頭超過 StreamReader 上限
+        finally:
+            writer.close()
+
+
+async def serve(host: str, port: int, workers: int, max_pending: int) -> None:
+    service = RenderService(workers, max_pending)
+    service.start()
+    server = await asyncio.start_server(RenderServer(service).handle, host, port)
+    print(f"PDF 產生服務：http://{host}:{port}/render（平行 {service.workers}，"
+          f"最多 {service.max_pending} 份待處理），Ctrl+C 結束", flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass    # Windows：Ctrl+C 以 KeyboardInterrupt 結束
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        service.close()
+
+
+# ======================== 命令列 ========================
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="本機 PDF 產生服務（HTTP）")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"監聽位址（預設 {DEFAULT_HOST}，只接受本機連線）")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"連接埠（預設 {DEFAULT_PORT}）")
+    parser.add_argument("-j", "--workers", type=int, default=default_workers(), help="同時產生的份數（預設 CPU 核心數）")
+    parser.add_argument("--max-pending", type=int, default=16,
+                        help="待處理（產生中 + 排隊）的不同請求上限，超過回 503（預設 16）")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_pending))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"無法啟動服務：{e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""PDF 產生的分段計時 / 剖析（預設關閉）。
+
+以環境變數開啟（子行程會繼承，批次產生的每個工作行程都會記錄）：
+
+    WAGE_PDF_TRACE=render.jsonl    # 每份 PDF 寫一行 JSON；"-" 或 "1" 表示印到 stderr
+    WAGE_PDF_TRACE_MEMORY=0        # 不量記憶體峰值（tracemalloc 會拖慢各段計時）
+    WAGE_PDF_PROFILE=剖析資料夾      # 每份 PDF 另以 cProfile 存一份 .prof（pstats / snakeviz 可讀）
+
+或在程式 / 命令列中呼叫 enable()（batch_export --trace / --profile）。
+
+每行 JSON 含：各段秒數（font_load / normalize / layout / draw / output）、列數、頁數、
+get_string_width 呼叫次數（字寬快取未命中數）、記憶體峰值、檔案大小與結果（ok / cancelled / error）。
+關閉時 open_trace 回傳 NULL_TRACE，各段只是一個空的 with，不影響產生速度。
+"""
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from itertools import count
+from typing import Any, Dict, Iterator, Optional
+
+TRACE_ENV = "WAGE_PDF_TRACE"
+MEMORY_ENV = "WAGE_PDF_TRACE_MEMORY"
+PROFILE_ENV = "WAGE_PDF_PROFILE"
+
+STAGES = ("font_load", "normalize", "layout", "draw", "output")
+
+_WRITE_LOCK = threading.Lock()
+_PROFILE_SEQ = count(1)
+_NULL_STAGE = nullcontext()
+
+
+def enable(log_path: Optional[str] = None, profile_dir: Optional[str] = None,
+           memory: bool = True) -> None:
+    """開啟記錄（寫入環境變數，之後建立的子行程也會沿用）。"""
+    if log_path:
+        os.environ[TRACE_ENV] = log_path
+        os.environ[MEMORY_ENV] = "1" if memory else "0"
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+        os.environ[PROFILE_ENV] = os.path.abspath(profile_dir)
+
+
+# ======================== 記錄物件 ========================
+class NullTrace:
+    """關閉時使用：所有方法都不做事。"""
+
+    enabled = False
+
+    def stage(self, name: str):
+        return _NULL_STAGE
+
+    def watch_pdf(self, pdf) -> None:
+        pass
+
+    def set(self, **fields: Any) -> None:
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+class RenderTrace(NullTrace):
+    """一次產生的記錄：各段耗時累加（同名段可進入多次），結束時輸出一行 JSON。"""
+
+    enabled = True
+
+    def __init__(self, kind: str, fields: Dict[str, Any]) -> None:
+        self.kind = kind
+        self.fields = dict(fields)
+        self.stages: Dict[str, float] = {}
+        self.string_width_calls = 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t0
+
+    def watch_pdf(self, pdf) -> None:
+        """計算 get_string_width 呼叫次數（只包這一個 PDF 物件，不影響其他文件）。"""
+        measure = pdf.get_string_width
+
+        def counted(s):
+            self.string_width_calls += 1
+            return measure(s)
+        pdf.get_string_width = counted
+
+    def set(self, **fields: Any) -> None:
+        self.fields.update(fields)
+
+    def record(self, status: str, total_s: float, peak: Optional[int],
+               profile_path: Optional[str]) -> Dict[str, Any]:
+        rec: Dict[str, Any] = {
+            "event": "pdf_render",
+            "kind": self.kind,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "pid": os.getpid(),
+            "thread": threading.current_thread().name,
+            **self.fields,
+            "status": status,
+            "total_s": round(total_s, 6),
+            "stages_s": {name: round(self.stages[name], 6)
+                         for name in STAGES + tuple(sorted(set(self.stages) - set(STAGES)))
+                         if name in self.stages},
+            "string_width_calls": self.string_width_calls,
+        }
+        if peak is not None:
+            rec["peak_memory_bytes"] = peak
+        if profile_path:
+            rec["profile"] = profile_path
+        return rec
+
+
+# ======================== 開始 / 結束 ========================
+def _write_line(target: str, rec: Dict[str, Any]) -> None:
+    line = json.dumps(rec, ensure_ascii=False) + "\n"
+    with _WRITE_LOCK:
+        if target in ("-", "1"):
+            sys.stderr.write(line)
+            sys.stderr.flush()
+            return
+        # 一行一次寫入（append），多個行程寫同一個檔也不會交錯
+        with open(target, "a", encoding="utf-8") as f:
+            f.write(line)
+
+def _start_profile() -> Optional[cProfile.Profile]:
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:
+        # 已有其他剖析器在執行（例如另一個執行緒的產生），這份不剖析
+        return None
+    return prof
+
+@contextmanager
+def open_trace(kind: str, **fields: Any) -> Iterator[NullTrace]:
+    """包住一次產生；未開啟時直接給 NULL_TRACE。"""
+    log_target = os.environ.get(TRACE_ENV)
+    profile_dir = os.environ.get(PROFILE_ENV)
+    if not log_target and not profile_dir:
+        yield NULL_TRACE
+        return
+
+    trace = RenderTrace(kind, fields)
+    measure_memory = bool(log_target) and os.environ.get(MEMORY_ENV, "1") != "0"
+    own_tracemalloc = measure_memory and not tracemalloc.is_tracing()
+    if own_tracemalloc:
+        tracemalloc.start()
+    elif measure_memory:
+        tracemalloc.reset_peak()
+    prof = _start_profile() if profile_dir else None
+
+    status = "ok"
+    t0 = time.perf_counter()
+    try:
+        yield trace
+    except BaseException as e:
+        status = "cancelled" if type(e).__name__ == "RenderCancelled" else "error"
+        trace.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        total = time.perf_counter() - t0
+        profile_path = None
+        if prof is not None:
+            prof.disable()
+            profile_path = os.path.join(profile_dir, f"{kind}_{os.getpid()}_{next(_PROFILE_SEQ):04d}.prof")
+            prof.dump_stats(profile_path)
+        peak = None
+        if measure_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            if own_tracemalloc:
+                tracemalloc.stop()
+        if log_target:
+            _write_line(log_target, trace.record(status, total, peak, profile_path))
@@ -0,0 +1,237 @@
+"""明細表的記憶體索引：搜尋 / 篩選時不必逐列比對。
+
+- 訂單號碼、類別：雜湊索引（值 -> id 集合），完全相符
+- (月份, 日期)：排序索引，可查某月、某日或日期區間
+- 顏色、備註：排序索引，以二分搜尋找出某個開頭的所有值
+新增 / 刪除列時逐列更新（add / remove），不必重建；一次大量增刪時改為整批合併。
+載入明細表（rebuild）時只記下資料，第一次搜尋才建立索引：沒用到搜尋時不增加載入時間。
+資料列為表格的顯示值（依 RECORD_KEYS 順序）；比對忽略前後空白與英文大小寫。
+"""
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from wage_record import RECORD_KEYS
+
+_MONTH, _DATE, _ORDER, _TYPE, _COLOR, _REMARK = (
+    RECORD_KEYS.index(k) for k in ("month", "date", "order", "type", "color", "remark"))
+_BULK = 64                      # 一次增刪超過此筆數時整批重排，不逐筆插入/刪除
+_MAX_CHAR = "\U0010ffff"
+_NUMBER_RE = re.compile(r"(\d+)\D*$")    # 最後一組數字："12"、"5/12"、"12日" -> 12
+
+
+def normalize(s: object) -> str:
+    if not isinstance(s, str):
+        s = "" if s is None else str(s)
+    return s.strip().casefold()
+
+def day_number(s: object) -> int:
+    """月份 / 日期欄的數字；沒有數字時為 -1（只在不限日期時列出）。"""
+    s = normalize(s)
+    if s.isdigit():
+        return int(s)
+    m = _NUMBER_RE.search(s)
+    return int(m.group(1)) if m else -1
+
+def parse_days(text: str) -> Optional[Tuple[int, int]]:
+    """日期條件："12" 或 "10-15"（亦可用 ~）；空白為不限。格式不符拋出 ValueError。"""
+    text = text.strip()
+    if not text:
+        return None
+    parts = re.split(r"\s*[-~～]\s*", text)
+    if len(parts) > 2 or not all(p.isdigit() for p in parts):
+        raise ValueError(f"日期請輸入單日（12）或區間（10-15）：{text}")
+    first, last = int(parts[0]), int(parts[-1])
+    return (first, last) if first <= last else (last, first)
+
+
+class RowFilter(NamedTuple):
+    """篩選條件；空字串 / None 表示不限。多個條件同時成立才列出。"""
+    order: str = ""
+    type: str = ""
+    month: str = ""
+    days: Optional[Tuple[int, int]] = None
+    color: str = ""          # 開頭
+    remark: str = ""         # 開頭
+
+    def is_empty(self) -> bool:
+        return not (self.order.strip() or self.type.strip() or self.month.strip()
+                    or self.days or self.color.strip() or self.remark.strip())
+
+
+class _RowKeys(NamedTuple):
+    order: str
+    type: str
+    date: Tuple[int, int, int]      # (月份, 日期, id)
+    color: Tuple[str, int]
+    remark: Tuple[str, int]
+
+
+class RowIndex:
+    def __init__(self) -> None:
+        self._clear()
+
+    def _clear(self) -> None:
+        self._pending: Optional[Dict[int, Sequence[str]]] = None   # 尚未建立索引的資料（id -> 顯示值）
+        self.keys: Dict[int, _RowKeys] = {}
+        self.by_order: Dict[str, Set[int]] = {}
+        self.by_type: Dict[str, Set[int]] = {}
+        self.dates: List[Tuple[int, int, int]] = []
+        self.colors: List[Tuple[str, int]] = []
+        self.remarks: List[Tuple[str, int]] = []
+        self.months: Dict[int, int] = {}    # 月份 -> 筆數（不限月份查日期時逐月查）
+
+    def __len__(self) -> int:
+        return len(self.keys) + (len(self._pending) if self._pending is not None else 0)
+
+    # ---------- 更新 ----------
+    @staticmethod
+    def _row_keys(rid: int, values: Sequence[str]) -> _RowKeys:
+        return _RowKeys(normalize(values[_ORDER]), normalize(values[_TYPE]),
+                        (day_number(values[_MONTH]), day_number(values[_DATE]), rid),
+                        (normalize(values[_COLOR]), rid), (normalize(values[_REMARK]), rid))
+
+    def _hash_add(self, k: _RowKeys, rid: int) -> None:
+        for table, value in ((self.by_order, k.order), (self.by_type, k.type)):
+            ids = table.get(value)
+            if ids is None:
+                table[value] = {rid}
+            else:
+                ids.add(rid)
+        month = k.date[0]
+        self.months[month] = self.months.get(month, 0) + 1
+
+    def _hash_remove(self, k: _RowKeys, rid: int) -> None:
+        for table, value in ((self.by_order, k.order), (self.by_type, k.type)):
+            ids = table[value]
+            ids.discard(rid)
+            if not ids:
+                del table[value]
+        month = k.date[0]
+        self.months[month] -= 1
+        if not self.months[month]:
+            del self.months[month]
+
+    def rebuild(self, items: Iterable[Tuple[int, Sequence[str]]]) -> None:
+        """整批換掉（載入另一張明細表）；索引在第一次搜尋時才建立。"""
+        self._clear()
+        self._pending = {int(rid): values for rid, values in items}
+
+    def _ensure_built(self) -> None:
+        if self._pending is not None:
+            items, self._pending = self._pending, None
+            self._add_bulk(list(items.items()))
+
+    def add(self, rid: int, values: Sequence[str]) -> None:
+        rid = int(rid)
+        if self._pending is not None:
+            self._pending[rid] = values
+            return
+        if rid in self.keys:
+            self.remove([rid])
+        k = self.keys[rid] = self._row_keys(rid, values)
+        self._hash_add(k, rid)
+        insort(self.dates, k.date)
+        insort(self.colors, k.color)
+        insort(self.remarks, k.remark)
+
+    def add_many(self, items: Iterable[Tuple[int, Sequence[str]]]) -> None:
+        items = [(int(rid), values) for rid, values in items]
+        if len(items) <= _BULK:
+            for rid, values in items:
+                self.add(rid, values)
+            return
+        if self._pending is not None:
+            self._pending.update(items)
+            return
+        self.remove([rid for rid, _ in items if rid in self.keys])
+        self._add_bulk(items)
+
+    def _add_bulk(self, items: List[Tuple[int, Sequence[str]]]) -> None:
+        """大量加入（呼叫端保證 id 不重複）：區域變數展開迴圈，排序索引最後一次排序。"""
+        keys, by_order, by_type, months = self.keys, self.by_order, self.by_type, self.months
+        dates, colors, remarks = self.dates, self.colors, self.remarks
+        for rid, values in items:
+            k = keys[rid] = self._row_keys(rid, values)
+            ids = by_order.get(k.order)
+            if ids is None:
+                by_order[k.order] = {rid}
+            else:
+                ids.add(rid)
+            ids = by_type.get(k.type)
+            if ids is None:
+                by_type[k.type] = {rid}
+            else:
+                ids.add(rid)
+            months[k.date[0]] = months.get(k.date[0], 0) + 1
+            dates.append(k.date)
+            colors.append(k.color)
+            remarks.append(k.remark)
+        # 已排序的串列 + 新的一批：sort 以合併方式處理，比逐筆 insort 快
+        dates.sort()
+        colors.sort()
+        remarks.sort()
+
+    def remove(self, rids: Iterable[int]) -> None:
+        rids = [int(r) for r in rids]
+        if self._pending is not None:
+            for rid in rids:
+                self._pending.pop(rid, None)
+            return
+        gone = {rid for rid in rids if rid in self.keys}
+        if not gone:
+            return
+        removed = [(rid, self.keys.pop(rid)) for rid in gone]
+        for rid, k in removed:
+            self._hash_remove(k, rid)
+        if len(removed) > _BULK:
+            self.dates = [d for d in self.dates if d[2] not in gone]
+            self.colors = [c for c in self.colors if c[1] not in gone]
+            self.remarks = [r for r in self.remarks if r[1] not in gone]
+            return
+        for _, k in removed:
+            for lst, key in ((self.dates, k.date), (self.colors, k.color), (self.remarks, k.remark)):
+                del lst[bisect_left(lst, key)]
+
+    # ---------- 查詢 ----------
+    @staticmethod
+    def _prefix(lst: List[Tuple[str, int]], prefix: str) -> List[int]:
+        lo = bisect_left(lst, (prefix,))
+        hi = bisect_left(lst, (prefix + _MAX_CHAR,))
+        return [rid for _, rid in lst[lo:hi]]
+
+    def _date_range(self, month: Optional[int], days: Optional[Tuple[int, int]]) -> List[int]:
+        months = [month] if month is not None else sorted(self.months)
+        first, last = days if days else (None, None)
+        out: List[int] = []
+        for m in months:
+            lo = bisect_left(self.dates, (m,) if first is None else (m, first))
+            hi = bisect_left(self.dates, (m + 1,) if last is None else (m, last + 1))
+            out.extend(d[2] for d in self.dates[lo:hi])
+        return out
+
+    def search(self, flt: RowFilter) -> Optional[List[int]]:
+        """符合條件的 id（遞增）；沒有任何條件時回傳 None（不篩選）。"""
+        if flt.is_empty():
+            return None
+        self._ensure_built()
+        parts: List[Iterable[int]] = []
+        if flt.order.strip():
+            parts.append(self.by_order.get(normalize(flt.order), ()))
+        if flt.type.strip():
+            parts.append(self.by_type.get(normalize(flt.type), ()))
+        if flt.month.strip() or flt.days:
+            month = day_number(flt.month) if flt.month.strip() else None
+            parts.append(self._date_range(month, flt.days))
+        if flt.color.strip():
+            parts.append(self._prefix(self.colors, normalize(flt.color)))
+        if flt.remark.strip():
+            parts.append(self._prefix(self.remarks, normalize(flt.remark)))
+        # 由最小的結果開始取交集
+        parts.sort(key=len)
+        result = set(parts[0])
+        for part in parts[1:]:
+            if not result:
+                break
+            result.intersection_update(part)
+        return sorted(result)
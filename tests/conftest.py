@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _font_cache_dir(tmp_path_factory):
+    # 字型快取放在暫存資料夾，不動到使用者的快取
+    os.environ["WAGE_FONT_CACHE_DIR"] = str(tmp_path_factory.mktemp("font_cache"))
+
+
+@pytest.fixture
+def font_dir(monkeypatch):
+    """產生 PDF 需要的字型：NotoSansTC-Regular.ttf 不在版本庫內，
+    放在專案資料夾或以 WAGE_FONT_DIR 指定；找不到時略過該測試。"""
+    folder = os.environ.get("WAGE_FONT_DIR", ROOT)
+    if not os.path.exists(os.path.join(folder, "NotoSansTC-Regular.ttf")):
+        pytest.skip("找不到 NotoSansTC-Regular.ttf（可用 WAGE_FONT_DIR 指定所在資料夾）")
+    # pdf_generator 以目前資料夾尋找字型
+    monkeypatch.chdir(folder)
+    return folder
@@ -0,0 +1,69 @@
+import os
+import shutil
+import struct
+
+from fpdf.ttfonts import TTFontFile
+
+import font_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _widen_all_glyphs(ttf_path: str) -> None:
+    """把 hmtx 表（位於檔案中段，不在首尾 64KB 內）的每個字寬加 100，檔案大小不變。"""
+    ttf = TTFontFile()
+    ttf.getMetrics(ttf_path)
+    hhea = ttf.tables['hhea']['offset']
+    hmtx = ttf.tables['hmtx']['offset']
+    with open(ttf_path, "r+b") as f:
+        f.seek(hhea + 34)
+        (count,) = struct.unpack(">H", f.read(2))
+        f.seek(hmtx)
+        data = bytearray(f.read(count * 4))
+        for i in range(0, len(data), 4):
+            (aw,) = struct.unpack_from(">H", data, i)
+            struct.pack_into(">H", data, i, aw + 100)
+        f.seek(hmtx)
+        f.write(data)
+
+
+def _reload(ttf_path: str):
+    font_cache._LOADED.clear()
+    return font_cache.load_font(ttf_path)
+
+
+def test_cache_rebuilds_when_ttf_changes_in_the_middle(tmp_path):
+    ttf_path = str(tmp_path / "DejaVuSans.ttf")
+    shutil.copyfile(os.path.join(ROOT, "DejaVuSans.ttf"), ttf_path)
+    before = _reload(ttf_path)['cw'][ord('A')]
+
+    size = os.path.getsize(ttf_path)
+    _widen_all_glyphs(ttf_path)
+    st = os.stat(ttf_path)
+    os.utime(ttf_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert os.path.getsize(ttf_path) == size
+
+    after = _reload(ttf_path)['cw'][ord('A')]
+    assert after != before
+    assert after == font_cache._parse_ttf(ttf_path)['cw'][ord('A')]
+
+
+def test_cache_survives_new_mtime_when_content_is_same(tmp_path, monkeypatch):
+    ttf_path = str(tmp_path / "DejaVuSans.ttf")
+    shutil.copyfile(os.path.join(ROOT, "DejaVuSans.ttf"), ttf_path)
+    expected = _reload(ttf_path)['cw'][ord('A')]
+
+    # 模擬 PyInstaller 重新解壓：內容相同、mtime 不同 → 以雜湊比對後沿用快取，不重新解析
+    st = os.stat(ttf_path)
+    os.utime(ttf_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def no_parse(path):
+        raise AssertionError("內容沒變不應重新解析 TTF")
+    monkeypatch.setattr(font_cache, "_parse_ttf", no_parse)
+    assert _reload(ttf_path)['cw'][ord('A')] == expected
+
+    # 記錄已更新為新的 mtime：之後不必再算雜湊
+    def no_hash(path):
+        raise AssertionError("大小 / mtime 相同時不應計算雜湊")
+    monkeypatch.setattr(font_cache, "_fingerprint", no_hash)
+    assert _reload(ttf_path)['cw'][ord('A')] == expected
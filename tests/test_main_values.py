@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("tkinter")
+
+from bulk_import import validate_rows
+from main import COLUMN_KEYS, DATA_COLUMNS, _fmt_num, record_to_inputs
+from record_store import RecordStore
+
+KEY = ("甲", "113", "5")
+
+
+@pytest.mark.parametrize("value, text", [
+    (12.345678, "12.345678"), (1234567.5, "1234567.5"), (2.0, "2"), (0.1, "0.1"), (None, ""), (7, "7"),
+])
+def test_fmt_num_keeps_every_digit(value, text):
+    assert _fmt_num(value) == text
+
+
+def test_copy_to_inputs_round_trip_keeps_stored_values():
+    store = RecordStore(":memory:")
+    rec = {"month": "5", "date": "5/1", "order": "A1", "type": "T", "color": "3",
+           "quantity": 1234567, "unit_price": 12.345678, "weight": 1234567.5, "remark": ""}
+    rid = store.add(KEY, rec)
+    original = store.get(rid)
+
+    # 複製到輸入欄 → 驗證 → 再新增（與 add_row 相同的流程）
+    inputs = record_to_inputs(original)
+    valid, errors = validate_rows([[inputs[col] for col in DATA_COLUMNS]], DATA_COLUMNS, "輸入數量")
+    assert errors == []
+    again = store.get(store.add(KEY, {COLUMN_KEYS[col]: v for col, v in zip(DATA_COLUMNS, valid[0])}))
+
+    for field in ("quantity", "unit_price", "weight"):
+        assert again[field] == original[field]
+    assert again["unit_price"] == 12.345678
+    assert again["weight"] == 1234567.5
+    store.close()
@@ -0,0 +1,37 @@
+import re
+
+import pdf_generator
+from wage_record import WageRecord
+
+
+def _rows(texts):
+    return [WageRecord(month="5", date=f"5/{i + 1}", order=f"A{i}", type="T", color=text,
+                       quantity=i + 1, unit_price=2.5, remark=text)
+            for i, text in enumerate(texts)]
+
+
+def _strip_date(data: bytes) -> bytes:
+    return re.sub(rb"/CreationDate \(D:\d+\)", b"", data)
+
+
+def test_font_tables_are_reused_across_different_statements(font_dir):
+    pdf_generator.clear_subset_cache()
+    before = dict(pdf_generator._PARSED_STATS)
+
+    first = pdf_generator.pdf_bytes("甲", "113", "5", _rows(["紅", "藍"]))
+    second = pdf_generator.pdf_bytes("乙", "113", "6", _rows(["黑灰", "咖啡", "米白"]))
+
+    parsed = pdf_generator._PARSED_STATS["parsed"] - before.get("parsed", 0)
+    reused = pdf_generator._PARSED_STATS["reused"] - before.get("reused", 0)
+    # 兩套字型各解析一次，第二份（用字不同）全部沿用
+    assert parsed == 2
+    assert reused == 2
+    assert first.startswith(b"%PDF") and second.startswith(b"%PDF")
+
+
+def test_compact_output_matches_stock_fpdf(font_dir):
+    rows = _rows(["紅", "深藍", "⅜ 灰"])
+    stock = pdf_generator.pdf_bytes("甲", "113", "5", rows, compact=False)
+    pdf_generator.pdf_bytes("乙", "113", "5", _rows(["綠", "黃"]))     # 先畫過別份
+    cached = pdf_generator.pdf_bytes("甲", "113", "5", rows, compact=True)
+    assert _strip_date(cached) == _strip_date(stock)
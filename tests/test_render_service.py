@@ -0,0 +1,65 @@
+import asyncio
+import json
+import os
+import signal
+
+from render_service import RenderService, parse_job
+
+_BODY = json.dumps({"customer": "甲", "year": "113", "month": "5",
+                    "records": [{"month": "5", "date": "5/1", "order": "A1", "type": "T",
+                                 "quantity": 10, "unit_price": 2.5}]}, ensure_ascii=False).encode("utf-8")
+
+
+async def _wait_broken(service, timeout=10.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not service.pool_broken():
+        assert loop.time() < deadline, "行程池沒有偵測到子行程結束"
+        await asyncio.sleep(0.05)
+
+
+def test_service_recovers_after_a_worker_is_killed(font_dir):
+    async def scenario():
+        service = RenderService(workers=1, max_pending=4)
+        service.start()
+        try:
+            key = parse_job(_BODY).key()
+            first, _ = await service.render(_BODY, key)
+            assert first.startswith(b"%PDF")
+
+            for pid in list(service.pool._processes):
+                os.kill(pid, signal.SIGKILL)
+            await _wait_broken(service)
+            assert service.health()["status"] == "degraded"
+
+            # 重試一次：換新的行程池後照常產生
+            again, _ = await service.render(_BODY, key)
+            assert again.startswith(b"%PDF")
+            health = service.health()
+            assert health["status"] == "ok"
+            assert health["pool_restarts"] >= 1
+            assert health.get("failed", 0) == 0
+        finally:
+            service.close()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_requests_rebuild_the_pool_once(font_dir):
+    async def scenario():
+        service = RenderService(workers=2, max_pending=8)
+        service.start()
+        try:
+            bodies = [_BODY.replace(b'"113"', b'"%d"' % (110 + i)) for i in range(4)]
+            await asyncio.gather(*(service.render(b, parse_job(b).key()) for b in bodies))
+            for pid in list(service.pool._processes):
+                os.kill(pid, signal.SIGKILL)
+            await _wait_broken(service)
+
+            results = await asyncio.gather(*(service.render(b, parse_job(b).key()) for b in bodies))
+            assert all(pdf.startswith(b"%PDF") for pdf, _ in results)
+            assert service.stats["pool_restarts"] == 1
+        finally:
+            service.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,53 @@
+import json
+import os
+
+import watch_folder
+from watch_folder import FolderWatcher
+
+_process_file = watch_folder.process_file
+
+
+def crashing_process_file(path, out_dir, default_year="", compact=True):
+    # 模擬子行程被系統砍掉（記憶體不足 / 崩潰）
+    if "boom" in os.path.basename(path):
+        os._exit(9)
+    return _process_file(path, out_dir, default_year, compact)
+
+
+def _write_input(folder, name, customer):
+    rows = [{"customer": customer, "year": "113", "month": "5", "date": "5/1", "order": "A1",
+             "type": "T", "color": "紅", "quantity": 10, "unit_price": 2.5}]
+    with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False)
+
+
+def test_worker_crash_only_quarantines_the_crashing_file(tmp_path, monkeypatch, font_dir):
+    monkeypatch.setattr(watch_folder, "process_file", crashing_process_file)
+    in_dir, out_dir = tmp_path / "in", tmp_path / "out"
+    in_dir.mkdir()
+    for name, customer in (("a.json", "甲"), ("boom.json", "乙"), ("c.json", "丙")):
+        _write_input(str(in_dir), name, customer)
+    watcher = FolderWatcher(str(in_dir), str(out_dir), str(in_dir / "done"), str(in_dir / "quarantine"),
+                            str(out_dir / "status.json"), workers=2, log=lambda *a: None)
+
+    failed = watcher.run(interval=0.05, once=True)
+
+    assert failed == 1
+    assert sorted(os.listdir(in_dir / "done")) == ["a.json", "c.json"]
+    assert sorted(os.listdir(in_dir / "quarantine")) == ["boom.json", "boom.json.error.txt"]
+    assert os.listdir(in_dir / ".processing") == []
+    pdfs = sorted(n for n in os.listdir(out_dir) if n.endswith(".pdf"))
+    assert pdfs == ["113年5月份_丙_工繳明細.pdf", "113年5月份_甲_工繳明細.pdf"]
+    assert watcher.stats["pool_restarts"] >= 1
+
+
+def test_leftover_processing_files_are_rendered_on_start(tmp_path, font_dir):
+    in_dir, out_dir = tmp_path / "in", tmp_path / "out"
+    (in_dir / ".processing").mkdir(parents=True)
+    _write_input(str(in_dir / ".processing"), "123_a.json", "甲")
+    watcher = FolderWatcher(str(in_dir), str(out_dir), str(in_dir / "done"), str(in_dir / "quarantine"),
+                            str(out_dir / "status.json"), workers=1, log=lambda *a: None)
+
+    assert watcher.run(interval=0.05, once=True) == 0
+    assert os.listdir(in_dir / "done") == ["a.json"]
+    assert os.listdir(in_dir / ".processing") == []
@@ -0,0 +1,252 @@
+"""虛擬捲動表格：資料放在記憶體模型，Treeview 只保留畫面看得到的那幾列。
+
+一整年的資料有上萬列時，ttk.Treeview 每列都是一個 Tk 項目，新增/刪除/重新編號
+都要逐列和 Tk 往返。這裡改成：
+- 模型：依 id 排序的 id 清單 + id -> 顯示值；序號在畫面上才由位置算出
+- 畫面：固定數量的「槽位」項目，捲動時只改寫槽位的內容
+- 刪除一批列只動到模型（二分搜尋定位、整段刪除）與畫面上看得到的槽位
+- 篩選（set_filter）只換掉要顯示的 id 清單，序號仍是在整張明細表中的位置
+"""
+import tkinter as tk
+from bisect import bisect_left
+from tkinter import ttk
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+
+class VirtualTable(tk.Frame):
+    def __init__(self, master, columns: Sequence[str], column_widths: Dict[str, int], row_height: int = 40,
+                 heading_height: int = 36, **kwargs) -> None:
+        super().__init__(master, **kwargs)
+        self.columns = tuple(columns)
+        self.row_height = row_height
+        self.heading_height = heading_height
+
+        # 模型
+        self.ids: List[int] = []            # 依 id 遞增（= 輸入順序）
+        self.rows: Dict[int, List[str]] = {}
+        self.selected: Set[int] = set()
+        self.filtered: Optional[List[int]] = None   # 篩選中要顯示的 id（遞增）；None = 全部
+
+        # 畫面
+        self.top = 0                         # 第一個可見列在模型中的位置
+        self.slots: List[str] = []           # 槽位 iid
+        self.slot_ids: Dict[str, int] = {}   # 槽位 iid -> 目前顯示的資料 id
+        self._rendering = False
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show='headings', selectmode="extended")
+        self.ysb = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        xsb = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=xsb.set)
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.ysb.grid(row=0, column=1, sticky="ns")
+        xsb.grid(row=1, column=0, sticky="ew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        for col in self.columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=column_widths.get(col, 130), anchor="center")
+
+        self.tree.bind("<Configure>", lambda e: self._render())
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", self._on_mousewheel)
+        self.tree.bind("<Button-5>", self._on_mousewheel)
+        self.tree.bind("<Shift-MouseWheel>", lambda e: self.tree.xview_scroll(int(-e.delta/120), "units"))
+        self.tree.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda e: self._on_arrow(1))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self._visible_count()))
+        self.tree.bind("<Next>", lambda e: self.scroll(self._visible_count()))
+
+    # ---------- 模型操作 ----------
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def set_rows(self, items: Iterable[Tuple[int, List[str]]]) -> None:
+        """整批換掉資料（例如載入另一張明細表）。"""
+        self.rows = {int(rid): list(values) for rid, values in items}
+        self.ids = sorted(self.rows)
+        self.selected.clear()
+        self.filtered = None
+        self.top = 0
+        self._render()
+
+    def append(self, rid: int, values: List[str], see: bool = True) -> None:
+        rid = int(rid)
+        self.rows[rid] = list(values)
+        if not self.ids or rid > self.ids[-1]:
+            self.ids.append(rid)
+        else:
+            self.ids.insert(bisect_left(self.ids, rid), rid)
+        if see:
+            self.see(rid)
+        else:
+            self._render()
+
+    def extend(self, items: Iterable[Tuple[int, List[str]]]) -> None:
+        """一次加入多列，只重畫一次畫面（大量匯入用）。"""
+        added = []
+        for rid, values in items:
+            rid = int(rid)
+            self.rows[rid] = list(values)
+            added.append(rid)
+        if not added:
+            return
+        added.sort()
+        if not self.ids or added[0] > self.ids[-1]:
+            self.ids.extend(added)
+        else:
+            self.ids = sorted(self.rows)
+        self.see(added[-1])
+
+    def delete(self, rids: Iterable[int]) -> None:
+        """刪除多列：逐一二分搜尋定位，相鄰的合併成一段刪除。"""
+        positions = []
+        for rid in rids:
+            rid = int(rid)
+            if self.rows.pop(rid, None) is not None:
+                positions.append(bisect_left(self.ids, rid))
+            self.selected.discard(rid)
+        positions.sort(reverse=True)
+        i = 0
+        while i < len(positions):
+            end = positions[i]
+            start = end
+            while i + 1 < len(positions) and positions[i + 1] == start - 1:
+                i += 1
+                start -= 1
+            del self.ids[start:end + 1]
+            i += 1
+        if self.filtered is not None:
+            self.filtered = [rid for rid in self.filtered if rid in self.rows]
+        self._render()
+
+    def values(self, rid: int) -> List[str]:
+        return self.rows[int(rid)]
+
+    def row_number(self, rid: int) -> int:
+        """序號（1 起算），依目前位置即時計算。"""
+        return bisect_left(self.ids, int(rid)) + 1
+
+    def selection(self) -> List[int]:
+        """選取的資料 id（依表格順序）。"""
+        return sorted(self.selected)
+
+    def selection_set(self, rids: Iterable[int]) -> None:
+        self.selected = {int(r) for r in rids if int(r) in self.rows}
+        self._render()
+
+    # ---------- 篩選 ----------
+    def _view(self) -> List[int]:
+        return self.ids if self.filtered is None else self.filtered
+
+    def set_filter(self, rids: Optional[Iterable[int]], keep_position: bool = False) -> None:
+        """只顯示 rids（需為遞增）；None 取消篩選。看不到的列同時取消選取，避免誤刪。"""
+        self.filtered = None if rids is None else [int(r) for r in rids if int(r) in self.rows]
+        if self.filtered is not None:
+            self.selected.intersection_update(self.filtered)
+        if not keep_position:
+            self.top = 0
+        self._render()
+
+    def shown_ids(self) -> List[int]:
+        """目前顯示的 id（篩選結果或全部，依表格順序）。"""
+        return list(self._view())
+
+    # ---------- 捲動 ----------
+    def _visible_count(self) -> int:
+        height = self.tree.winfo_height()
+        return max(1, (height - self.heading_height) // self.row_height)
+
+    def _max_top(self) -> int:
+        return max(0, len(self._view()) - self._visible_count())
+
+    def scroll(self, delta: int) -> None:
+        self.top = min(max(0, self.top + delta), self._max_top())
+        self._render()
+
+    def see(self, rid: int) -> None:
+        pos = bisect_left(self._view(), int(rid))
+        n = self._visible_count()
+        if pos < self.top:
+            self.top = pos
+        elif pos >= self.top + n:
+            self.top = pos - n + 1
+        self.top = min(max(0, self.top), self._max_top())
+        self._render()
+
+    def _on_scrollbar(self, *args) -> None:
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self._view()))
+            self.scroll(0)
+        elif args[0] == "scroll":
+            step = self._visible_count() if args[2] == "pages" else 1
+            self.scroll(int(args[1]) * step)
+
+    def _on_mousewheel(self, event) -> str:
+        if event.num == 4:
+            delta = 1
+        elif event.num == 5:
+            delta = -1
+        else:
+            delta = int(event.delta / 120)
+        self.scroll(-delta)
+        return "break"
+
+    def _on_arrow(self, step: int) -> str:
+        """上下鍵：移動單一選取，超出畫面時捲動模型。"""
+        view = self._view()
+        if not view:
+            return "break"
+        focus = self.slot_ids.get(self.tree.focus())
+        pos = bisect_left(view, focus) if focus is not None else self.top - step
+        pos = min(max(0, pos + step), len(view) - 1)
+        self.selected = {view[pos]}
+        self.see(view[pos])
+        slot = self.slots[pos - self.top]
+        self.tree.focus(slot)
+        return "break"
+
+    # ---------- 畫面 ----------
+    def _on_select(self, _evt=None) -> None:
+        if self._rendering:
+            return
+        # 只更新畫面上可見的部分；捲出畫面的選取保留在 self.selected
+        visible = set(self.slot_ids.values())
+        chosen = {self.slot_ids[s] for s in self.tree.selection() if s in self.slot_ids}
+        self.selected = (self.selected - visible) | chosen
+
+    def _render(self) -> None:
+        """只改寫可見槽位：Tk 呼叫次數與畫面列數成正比，與資料量無關。"""
+        self._rendering = True
+        try:
+            view = self._view()
+            total = len(view)
+            self.top = min(max(0, self.top), max(0, total - 1))
+            window = view[self.top:self.top + self._visible_count()]
+
+            # 槽位數量跟著可見列數增減
+            while len(self.slots) < len(window):
+                self.slots.append(self.tree.insert('', 'end', iid=f"slot{len(self.slots)}"))
+            while len(self.slots) > len(window):
+                self.tree.delete(self.slots.pop())
+
+            self.slot_ids.clear()
+            chosen = []
+            for i, (slot, rid) in enumerate(zip(self.slots, window)):
+                self.slot_ids[slot] = rid
+                # 篩選時序號取自整張明細表的位置（與 PDF 的列序一致）
+                no = self.top + i + 1 if self.filtered is None else bisect_left(self.ids, rid) + 1
+                self.tree.item(slot, values=[str(no)] + self.rows[rid])
+                if rid in self.selected:
+                    chosen.append(slot)
+            self.tree.selection_set(chosen)
+            self.tree.yview_moveto(0)
+
+            if total:
+                self.ysb.set(self.top / total, min(1.0, (self.top + len(window)) / total))
+            else:
+                self.ysb.set(0.0, 1.0)
+        finally:
+            self._rendering = False
@@ -0,0 +1,62 @@
+"""工繳資料列：main.py / record_store / pdf_generator / batch_export 共用的精簡型別。
+
+每列以 __slots__ 物件保存（不帶 __dict__），數量/單價/重量在建立時就轉好型別，
+之後排版、計算金額都直接讀屬性，不必再查欄名、反覆轉型，也不會改動呼叫端的資料。
+"""
+from typing import Any, Iterable, List, Mapping, Optional, Tuple, Union
+
+# 資料鍵（與 WageApp 的 DATA_COLUMNS 順序相同）
+RECORD_KEYS: Tuple[str, ...] = (
+    "month", "date", "order", "type", "color", "quantity", "unit_price", "weight", "remark"
+)
+
+
+def _text(v: Any) -> str:
+    return "" if v is None else str(v)
+
+def _optional_float(v: Any) -> Optional[float]:
+    if v is None or str(v).strip() == "":
+        return None
+    return float(v)
+
+
+class WageRecord:
+    """一筆工繳資料。空白數量/單價視為 0，空白重量為 None。"""
+    __slots__ = RECORD_KEYS
+
+    def __init__(self, month: str = "", date: str = "", order: str = "", type: str = "",
+                 color: str = "", quantity: int = 0, unit_price: float = 0.0,
+                 weight: Optional[float] = None, remark: str = "") -> None:
+        self.month = month
+        self.date = date
+        self.order = order
+        self.type = type
+        self.color = color
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.weight = weight
+        self.remark = remark
+
+    @classmethod
+    def from_mapping(cls, m: Mapping[str, Any]) -> "WageRecord":
+        """由 dict（JSON / CSV / 舊版呼叫端）建立；只讀取，不修改傳入的 dict。"""
+        get = m.get
+        return cls(
+            _text(get("month")), _text(get("date")), _text(get("order")),
+            _text(get("type")), _text(get("color")),
+            int(get("quantity") or 0), float(get("unit_price") or 0),
+            _optional_float(get("weight")), _text(get("remark")),
+        )
+
+    def as_dict(self) -> dict:
+        return {k: getattr(self, k) for k in RECORD_KEYS}
+
+    def __repr__(self) -> str:
+        return "WageRecord(" + ", ".join(f"{k}={getattr(self, k)!r}" for k in RECORD_KEYS) + ")"
+
+
+RecordLike = Union[WageRecord, Mapping[str, Any]]
+
+def as_records(records: Iterable[RecordLike]) -> List[WageRecord]:
+    """WageRecord 原樣使用；dict 轉成新的 WageRecord（呼叫端的 dict 不會被改動）。"""
+    return [r if isinstance(r, WageRecord) else WageRecord.from_mapping(r) for r in records]
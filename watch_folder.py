@@ -0,0 +1,389 @@
+"""監看資料夾：文書人員丟進來的資料檔自動轉成 PDF（常駐執行，不開 Tk 視窗）。
+
+    python watch_folder.py 共用資料夾 -o 輸出 -j 2
+    python watch_folder.py 共用資料夾 -o 輸出 --once      # 處理目前的檔案後結束（排程用）
+
+資料檔格式與 batch_export 相同（.json / .csv，每個客戶/月份一份 PDF）。
+- 檔案大小與修改時間連續兩次掃描都沒變才處理（避免讀到還在寫入的檔案），
+  處理前先移進 .processing/ 佔用，同名的新檔不會互相覆蓋
+- 以內容雜湊（sha256）判斷重複：處理過或正在排隊的內容不再產生，直接歸檔
+- 成功：輸入檔移到 done/；失敗：移到 quarantine/，旁邊附 <檔名>.error.txt
+- 子行程異常結束（記憶體不足、崩潰）時換一個新的行程池：當時處理中的檔案重新排隊並逐一單獨處理，
+  只有單獨處理仍使子行程結束的檔案才隔離；其他檔案照常產生
+- 一個檔案內的多份 PDF 先寫到輸出資料夾內的暫存資料夾，全部成功才移到輸出資料夾；
+  中途失敗不會留下部分 PDF，重新處理時也不會重複
+- 佇列長度、處理中數量與處理速度寫在狀態檔（預設 輸出/watch_status.json）
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from batch_export import group_jobs, load_records
+from pdf_generator import default_pdf_name, render_pdf
+
+INPUT_EXTS = (".json", ".csv")
+PROCESSING_DIR = ".processing"
+LEDGER_NAME = ".watch_ledger.jsonl"     # 已完成的內容雜湊（放在輸出資料夾）
+_RATE_WINDOW_S = 600                     # 狀態檔的近期速度以最近 10 分鐘計
+
+
+class FileResult(NamedTuple):
+    outputs: List[Tuple[str, int]]   # [(PDF 路徑, 檔案大小)]
+    rows: int
+    seconds: float
+    error: Optional[str]             # 失敗時為錯誤訊息（含 traceback）
+
+
+class Claimed(NamedTuple):
+    path: str        # .processing/ 內的路徑
+    name: str        # 原始檔名
+    digest: str      # 內容 sha256
+
+
+# ======================== 子行程 ========================
+def _ignore_sigint() -> None:
+    # Ctrl+C 會送給整個行程群組；由主行程決定何時停止，處理中的檔案不中斷
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def process_file(path: str, out_dir: str, default_year: str = "", compact: bool = True) -> FileResult:
+    """讀一個資料檔並產生其中每個客戶/月份的 PDF；錯誤不拋出，改放在結果裡。
+    全部 PDF 都產生成功才一起移到 out_dir，失敗時輸出資料夾維持原狀。"""
+    t0 = time.perf_counter()
+    outputs: List[Tuple[str, int]] = []
+    rows = 0
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=out_dir)
+    try:
+        jobs = group_jobs(load_records(path), default_year)
+        if not jobs:
+            raise ValueError("檔案內沒有資料")
+        staged: List[Tuple[str, str, int]] = []     # (暫存路徑, 輸出路徑, 檔案大小)
+        for customer, year, month, records in jobs:
+            name = default_pdf_name(customer, year, month)
+            tmp_path = os.path.join(staging, name)
+            staged.append((tmp_path, os.path.join(out_dir, name),
+                           render_pdf(customer, year, month, records, tmp_path, compact=compact)))
+            rows += len(records)
+        for tmp_path, save_path, size in staged:
+            os.replace(tmp_path, save_path)
+            outputs.append((save_path, size))
+    except Exception:
+        return FileResult(outputs, rows, time.perf_counter() - t0, traceback.format_exc())
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return FileResult(outputs, rows, time.perf_counter() - t0, None)
+
+
+# ======================== 檔案處理 ========================
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _unique_path(folder: str, name: str) -> str:
+    """folder/name；已存在時改為 name (2).ext、name (3).ext …"""
+    base, ext = os.path.splitext(name)
+    path, n = os.path.join(folder, name), 2
+    while os.path.exists(path):
+        path, n = os.path.join(folder, f"{base} ({n}){ext}"), n + 1
+    return path
+
+def _write_json_atomic(path: str, data: Dict) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+class FolderWatcher:
+    """單一主迴圈：掃描 → 佔用 → 排隊 → 交給行程池 → 收結果 → 歸檔 / 隔離 → 更新狀態檔。"""
+
+    def __init__(self, in_dir: str, out_dir: str, done_dir: str, quarantine_dir: str,
+                 status_path: str, workers: int = 1, default_year: str = "", compact: bool = True,
+                 log=print) -> None:
+        self.in_dir = in_dir
+        self.out_dir = out_dir
+        self.done_dir = done_dir
+        self.quarantine_dir = quarantine_dir
+        self.processing_dir = os.path.join(in_dir, PROCESSING_DIR)
+        self.status_path = status_path
+        self.ledger_path = os.path.join(out_dir, LEDGER_NAME)
+        self.workers = max(1, workers)
+        self.default_year = default_year
+        self.compact = compact
+        self.log = log
+        for d in (out_dir, done_dir, quarantine_dir, self.processing_dir):
+            os.makedirs(d, exist_ok=True)
+
+        self.done_hashes: Set[str] = self._load_ledger()
+        self.queue: Deque[Claimed] = deque()
+        self.in_flight: Dict[Future, Claimed] = {}
+        self.suspects: Set[str] = set()    # 子行程異常結束時正在處理的檔案（內容雜湊）；之後單獨處理
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.seen: Dict[str, Tuple[int, int]] = {}      # 檔名 -> (大小, mtime)；等待穩定
+        self.stopping = False
+        self.stopped = False
+        self.started = time.time()
+        self.stats = {"processed": 0, "failed": 0, "duplicates": 0, "pdfs": 0, "rows": 0, "render_s": 0.0,
+                      "pool_restarts": 0}
+        self.recent: Deque[Tuple[float, int]] = deque()  # (完成時間, 筆數)
+        self.last: Optional[Dict] = None
+
+    # ---------- 已完成紀錄 ----------
+    def _load_ledger(self) -> Set[str]:
+        hashes: Set[str] = set()
+        try:
+            with open(self.ledger_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        hashes.add(json.loads(line)["sha256"])
+                    except (ValueError, KeyError):
+                        continue    # 寫到一半的最後一行
+        except FileNotFoundError:
+            pass
+        return hashes
+
+    def _record_done(self, job: Claimed, result: FileResult) -> None:
+        self.done_hashes.add(job.digest)
+        entry = {"sha256": job.digest, "input": job.name, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "outputs": [os.path.basename(p) for p, _ in result.outputs]}
+        with open(self.ledger_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    # ---------- 掃描 / 佔用 ----------
+    def _is_input(self, name: str) -> bool:
+        return (name.lower().endswith(INPUT_EXTS)
+                and not name.startswith((".", "~$")))
+
+    def scan(self) -> None:
+        """大小與修改時間連續兩次相同的檔案才佔用（移進 .processing/）並排隊。"""
+        current: Dict[str, Tuple[int, int]] = {}
+        with os.scandir(self.in_dir) as it:
+            for entry in it:
+                if not entry.is_file() or not self._is_input(entry.name):
+                    continue
+                st = entry.stat()
+                current[entry.name] = (st.st_size, st.st_mtime_ns)
+        for name, sig in current.items():
+            if self.seen.get(name) == sig:
+                self._claim(os.path.join(self.in_dir, name), name)
+        self.seen = {n: s for n, s in current.items() if os.path.exists(os.path.join(self.in_dir, n))}
+
+    def recover(self) -> None:
+        """上次中斷時還在 .processing/ 的檔案重新排隊。"""
+        for name in sorted(os.listdir(self.processing_dir)):
+            path = os.path.join(self.processing_dir, name)
+            original = name.split("_", 1)[1] if "_" in name else name
+            self._enqueue(Claimed(path, original, file_digest(path)))
+
+    def _claim(self, path: str, name: str) -> None:
+        claimed = os.path.join(self.processing_dir, f"{time.time_ns()}_{name}")
+        try:
+            os.replace(path, claimed)
+        except OSError as e:      # 被其他程式鎖住或已被移走：下次掃描再試
+            self.log(f"[略過] {name}：{e}")
+            return
+        self._enqueue(Claimed(claimed, name, file_digest(claimed)))
+
+    def _enqueue(self, job: Claimed) -> None:
+        busy = {j.digest for j in self.queue} | {j.digest for j in self.in_flight.values()}
+        if job.digest in self.done_hashes or job.digest in busy:
+            self.stats["duplicates"] += 1
+            os.replace(job.path, _unique_path(self.done_dir, job.name))
+            self.log(f"[重複] {job.name}：內容與已處理的檔案相同，不重新產生")
+            return
+        self.queue.append(job)
+
+    # ---------- 行程池 ----------
+    def _start_pool(self) -> None:
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_ignore_sigint)
+
+    def _restart_pool(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+        self.stats["pool_restarts"] += 1
+        self._start_pool()
+
+    def submit(self) -> None:
+        # 最多 workers 個同時處理，其餘留在佇列（狀態檔可看到排隊數）；可疑的檔案單獨處理
+        while self.queue and len(self.in_flight) < self.workers:
+            if any(j.digest in self.suspects for j in self.in_flight.values()):
+                return
+            job = self.queue[0]
+            if job.digest in self.suspects and self.in_flight:
+                return
+            try:
+                fut = self.pool.submit(process_file, job.path, self.out_dir, self.default_year, self.compact)
+            except BrokenProcessPool:
+                # 處理中的工作會在 collect 收到同樣的錯誤並換新行程池；沒有處理中的就直接換
+                if not self.in_flight:
+                    self._restart_pool()
+                    continue
+                return
+            self.queue.popleft()
+            self.in_flight[fut] = job
+
+    def collect(self, timeout: float) -> None:
+        if not self.in_flight:
+            time.sleep(timeout)
+            return
+        done, _ = wait(list(self.in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+        broken = False
+        for fut in done:
+            if isinstance(fut.exception(), BrokenProcessPool):
+                broken = True
+                continue
+            job = self.in_flight.pop(fut)
+            try:
+                result = fut.result()
+            except Exception:
+                result = FileResult([], 0, 0.0, traceback.format_exc())
+            self._finish(job, result)
+        if broken:
+            self._pool_broken()
+
+    def _pool_broken(self) -> None:
+        """子行程異常結束：整個行程池都不能再用。處理中的檔案無法得知是哪一個造成的，
+        只有單獨處理的那一個才隔離，其餘重新排在佇列最前面、之後逐一單獨處理。"""
+        jobs = list(self.in_flight.values())
+        self.in_flight.clear()
+        self._restart_pool()
+        if len(jobs) == 1 and jobs[0].digest in self.suspects:
+            job = jobs[0]
+            self._finish(job, FileResult([], 0, 0.0, "BrokenProcessPool: 處理此檔案時子行程異常結束"
+                                                      "（記憶體不足或程式崩潰）\n"))
+            return
+        self.log(f"[重試] 子行程異常結束，{len(jobs)} 個處理中的檔案重新排隊逐一處理")
+        for job in reversed(jobs):
+            self.suspects.add(job.digest)
+            self.queue.appendleft(job)
+
+    def _finish(self, job: Claimed, result: FileResult) -> None:
+        self.suspects.discard(job.digest)
+        now = time.time()
+        self.last = {"input": job.name, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                     "ok": result.error is None, "rows": result.rows, "seconds": round(result.seconds, 3)}
+        if result.error is not None:
+            self.stats["failed"] += 1
+            target = _unique_path(self.quarantine_dir, job.name)
+            os.replace(job.path, target)
+            with open(target + ".error.txt", "w", encoding="utf-8") as f:
+                f.write(f"檔案：{job.name}\nsha256：{job.digest}\n時間：{self.last['time']}\n\n{result.error}")
+            self.log(f"[失敗] {job.name}  已移到 {os.path.basename(self.quarantine_dir)}/"
+                     f"  {result.error.strip().splitlines()[-1]}")
+            return
+        self._record_done(job, result)
+        os.replace(job.path, _unique_path(self.done_dir, job.name))
+        self.stats["processed"] += 1
+        self.stats["pdfs"] += len(result.outputs)
+        self.stats["rows"] += result.rows
+        self.stats["render_s"] += result.seconds
+        self.recent.append((now, result.rows))
+        self.log(f"[完成] {job.name}  {len(result.outputs)} 份 PDF  {result.rows} 筆  {result.seconds:.2f}s")
+
+    # ---------- 狀態檔 ----------
+    def write_status(self) -> None:
+        now = time.time()
+        while self.recent and now - self.recent[0][0] > _RATE_WINDOW_S:
+            self.recent.popleft()
+        window = min(_RATE_WINDOW_S, max(now - self.started, 1e-9))
+        status = {
+            "state": "stopped" if self.stopped else ("stopping" if self.stopping else "running"),
+            "pid": os.getpid(),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now)),
+            "watch_dir": os.path.abspath(self.in_dir),
+            "workers": self.workers,
+            "queue_depth": len(self.queue),
+            "in_flight": len(self.in_flight),
+            "waiting_stable": len(self.seen),
+            **{k: (round(v, 3) if isinstance(v, float) else v) for k, v in self.stats.items()},
+            "files_per_min_recent": round(len(self.recent) / window * 60, 2),
+            "rows_per_s_recent": round(sum(r for _, r in self.recent) / window, 1),
+            "last": self.last,
+        }
+        _write_json_atomic(self.status_path, status)
+
+    # ---------- 主迴圈 ----------
+    def run(self, interval: float = 2.0, once: bool = False) -> int:
+        """持續監看；once=True 時處理完目前的檔案就結束。回傳本次失敗的檔案數。"""
+        self.recover()
+        self._start_pool()
+        try:
+            first = True
+            while not self.stopping:
+                self.scan()
+                if once and first:
+                    # 單次模式不等下一輪穩定檢查：再掃一次即可佔用
+                    self.scan()
+                first = False
+                self.submit()
+                self.write_status()
+                if once and not self.queue and not self.in_flight:
+                    break
+                self.collect(interval)
+            # 收尾：處理中的檔案做完，排隊中的留在 .processing/，下次啟動再處理
+            while self.in_flight:
+                self.collect(interval)
+        finally:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+        self.stopped = True
+        self.write_status()
+        return self.stats["failed"]
+
+
+# ======================== 命令列 ========================
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="監看資料夾，把放進來的資料檔自動產生工繳明細 PDF")
+    parser.add_argument("watch_dir", help="監看的資料夾（.json / .csv，格式同 batch_export）")
+    parser.add_argument("-o", "--out-dir", required=True, help="PDF 輸出資料夾")
+    parser.add_argument("-j", "--workers", type=int, default=2, help="同時處理的檔案數（預設 2）")
+    parser.add_argument("--done-dir", help="處理完成的輸入檔（預設：監看資料夾/done）")
+    parser.add_argument("--quarantine-dir", help="處理失敗的輸入檔與錯誤說明（預設：監看資料夾/quarantine）")
+    parser.add_argument("--status", help="狀態檔（預設：輸出資料夾/watch_status.json）")
+    parser.add_argument("--interval", type=float, default=2.0, help="掃描間隔秒數（預設 2）")
+    parser.add_argument("--year", default="", help="資料未含 year 欄位時使用的年份（民國）")
+    parser.add_argument("--once", action="store_true", help="處理目前的檔案後結束")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.watch_dir):
+        print(f"找不到資料夾：{args.watch_dir}", file=sys.stderr)
+        return 2
+    watcher = FolderWatcher(
+        args.watch_dir, args.out_dir,
+        done_dir=args.done_dir or os.path.join(args.watch_dir, "done"),
+        quarantine_dir=args.quarantine_dir or os.path.join(args.watch_dir, "quarantine"),
+        status_path=args.status or os.path.join(args.out_dir, "watch_status.json"),
+        workers=args.workers, default_year=args.year,
+    )
+
+    def stop(_signum, _frame) -> None:
+        watcher.stopping = True
+        print("收到停止訊號，處理中的檔案完成後結束…", file=sys.stderr)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    if not args.once:
+        print(f"監看 {os.path.abspath(args.watch_dir)}（每 {args.interval:g} 秒，平行 {watcher.workers}），Ctrl+C 結束")
+    failed = watcher.run(args.interval, args.once)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    # 打包後的執行檔以 spawn 啟動子行程，子行程不可再執行常駐迴圈
+    multiprocessing.freeze_support()
+    sys.exit(main())
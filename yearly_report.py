@@ -0,0 +1,146 @@
+"""年度彙總報表：依客戶 / 類別 / 月份統計一整年的工繳金額。
+
+    python yearly_report.py 113 -o 報表            # 從資料庫（與 GUI 共用）
+    python yearly_report.py 113 --input 全年.json   # 從 batch_export 格式的資料檔
+    python yearly_report.py 113 --by customer --by month
+
+金額以 totals 的精確十進位規則整欄計算；稅額以每張明細（客戶 × 標題月份）的小計計算後加總，
+與實際開出的請款明細一致。每個維度各輸出一份 PDF，合計附中文大寫。
+"""
+import argparse
+import os
+import sqlite3
+import sys
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from pdf_generator import build_summary_pdf, record_amounts, write_pdf_atomic
+from record_store import RecordStore, SheetKey
+from totals import Totals, tax_of
+from wage_record import WageRecord
+
+# 維度 -> 欄名
+DIMENSIONS: Dict[str, str] = {"customer": "客戶", "type": "類別", "month": "月份"}
+SUMMARY_HEADERS_TAIL: Tuple[str, ...] = ("筆數", "數量(片)", "金額(未稅)", "占比")
+
+# (客戶, 年份, 標題月份), 該張明細的資料
+Sheet = Tuple[SheetKey, List[WageRecord]]
+
+
+class GroupTotal(NamedTuple):
+    label: str
+    count: int       # 筆數
+    quantity: int    # 數量合計
+    amount: int      # 金額合計（未稅）
+
+
+def _month_order(label: str) -> Tuple[int, str]:
+    return (int(label), "") if label.isdigit() else (99, label)
+
+def summarize(sheets: Sequence[Sheet], by: str) -> Tuple[List[GroupTotal], Totals]:
+    """依維度分組加總，回傳 (各組, 全年合計)。月份依月排序，其餘依金額由大到小。"""
+    if by not in DIMENSIONS:
+        raise ValueError(f"不支援的維度：{by}")
+    groups: Dict[str, List[int]] = {}   # label -> [筆數, 數量, 金額]
+    subtotal = tax = 0
+    for (customer, _year, title_month), records in sheets:
+        amounts = record_amounts(records)
+        sheet_subtotal = sum(amounts)
+        subtotal += sheet_subtotal
+        tax += tax_of(sheet_subtotal)
+        if by == "type":
+            for r, amount in zip(records, amounts):
+                g = groups.setdefault(r.type.strip() or "（未填）", [0, 0, 0])
+                g[0] += 1
+                g[1] += r.quantity
+                g[2] += amount
+        else:
+            g = groups.setdefault(customer if by == "customer" else title_month, [0, 0, 0])
+            g[0] += len(records)
+            g[1] += sum(r.quantity for r in records)
+            g[2] += sheet_subtotal
+    result = [GroupTotal(label, *vals) for label, vals in groups.items()]
+    if by == "month":
+        result.sort(key=lambda g: _month_order(g.label))
+    else:
+        result.sort(key=lambda g: (-g.amount, g.label))
+    return result, Totals(subtotal, tax, subtotal + tax)
+
+def summary_rows(groups: Sequence[GroupTotal], by: str, subtotal: int) -> List[List[str]]:
+    rows = []
+    for g in groups:
+        label = f"{g.label}月" if by == "month" and g.label.isdigit() else g.label
+        share = f"{g.amount / subtotal * 100:.1f}%" if subtotal else "-"
+        rows.append([label, str(g.count), str(g.quantity), f"{g.amount}元", share])
+    return rows
+
+def summary_pdf_name(year: str, by: str) -> str:
+    return f"{year}年度_工繳彙總_依{DIMENSIONS[by]}.pdf"
+
+def render_summary(year: str, by: str, sheets: Sequence[Sheet], save_path: str,
+                   compact: bool = True) -> int:
+    """輸出一份彙總 PDF，回傳檔案大小（bytes）。"""
+    groups, totals = summarize(sheets, by)
+    label = DIMENSIONS[by]
+    pdf = build_summary_pdf(
+        title=f"{year}年度工繳彙總表（依{label}）",
+        subtitle=f"明細 {len(sheets)} 份，共 {sum(g.count for g in groups)} 筆",
+        headers=(label,) + SUMMARY_HEADERS_TAIL,
+        rows=summary_rows(groups, by, totals.subtotal),
+        totals=totals,
+        compact=compact,
+    )
+    return write_pdf_atomic(pdf, save_path)
+
+def write_year_reports(year: str, sheets: Sequence[Sheet], out_dir: str,
+                       dims: Sequence[str] = tuple(DIMENSIONS)) -> List[Tuple[str, int]]:
+    """每個維度輸出一份，回傳 [(檔案路徑, 檔案大小)]。"""
+    os.makedirs(out_dir, exist_ok=True)
+    out = []
+    for by in dims:
+        path = os.path.join(out_dir, summary_pdf_name(year, by))
+        out.append((path, render_summary(year, by, sheets, path)))
+    return out
+
+
+# ======================== 命令列 ========================
+def _sheets_from_file(path: str, year: str) -> List[Sheet]:
+    from batch_export import group_jobs, load_records
+    return [((c, y, m), recs) for c, y, m, recs in group_jobs(load_records(path), year) if y == year]
+
+def _sheets_from_db(db_path: Optional[str], year: str) -> List[Sheet]:
+    store = RecordStore(db_path)
+    try:
+        return store.year_sheets(year)
+    finally:
+        store.close()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="產生年度工繳彙總 PDF（依客戶 / 類別 / 月份）")
+    parser.add_argument("year", help="年份（民國，與明細表相同）")
+    parser.add_argument("-o", "--out-dir", default=".", help="PDF 輸出資料夾（預設：目前資料夾）")
+    parser.add_argument("--by", action="append", choices=tuple(DIMENSIONS),
+                        help="彙總維度，可重複指定（預設：全部）")
+    src = parser.add_mutually_exclusive_group()
+    src.add_argument("--input", help="改從資料檔讀取（batch_export 的 .json / .csv 格式）")
+    src.add_argument("--db", help="資料庫路徑（預設與 GUI 相同）")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.input:
+            sheets = _sheets_from_file(args.input, args.year)
+        else:
+            sheets = _sheets_from_db(args.db, args.year)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"讀取失敗：{e}", file=sys.stderr)
+        return 2
+    if not sheets:
+        print(f"{args.year} 年沒有資料。", file=sys.stderr)
+        return 1
+
+    for path, size in write_year_reports(args.year, sheets, args.out_dir, args.by or tuple(DIMENSIONS)):
+        print(f"[完成] {os.path.basename(path)}  {size / 1024:.1f} KB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())